@@ -0,0 +1,90 @@
+import math
+
+# Reproducción de un camino independiente de los frames: la posición avanza según el
+# tiempo transcurrido (pasos por segundo), no un paso por frame ni un sleep por paso.
+
+# Velocidad por defecto: un paso cada 0.6 s, como la animación original
+PASOS_POR_SEGUNDO = 1 / 0.6
+
+# Velocidad "instantánea": todo el camino en el primer frame
+INSTANTANEO = math.inf
+
+# Multiplicador del avance rápido
+FACTOR_AVANCE_RAPIDO = 10
+
+# Tope de tiempo por frame: tras una pausa larga (ventana modal, arrastre) no se saltan pasos
+DT_MAXIMO = 0.25
+
+
+def velocidad_desde_texto(texto, defecto=PASOS_POR_SEGUNDO):
+    """Convierte "3", "0.5" o "instantaneo" en pasos por segundo."""
+    if not texto:
+        return defecto
+    if texto.strip().lower() in ("instantaneo", "instantáneo", "inf"):
+        return INSTANTANEO
+    return float(texto)
+
+
+class Reproductor:
+    """Posición (fraccionaria) sobre un camino de `total` pasos."""
+
+    def __init__(self, total, velocidad=PASOS_POR_SEGUNDO):
+        self.total = total
+        self.velocidad = velocidad
+        self.posicion = 0.0          # 2.5 = a mitad de camino entre los pasos 2 y 3
+        self.pausado = False
+        self.avance_rapido = False
+        self._siguiente = 0          # primer paso que todavía no se entregó
+
+    def avanzar(self, dt):
+        """Avanza dt segundos y devuelve el range de pasos alcanzados en este frame."""
+        if not self.pausado and not self.terminado():
+            velocidad = self.velocidad * (FACTOR_AVANCE_RAPIDO if self.avance_rapido else 1)
+            if math.isinf(velocidad):
+                self.posicion = self.total - 1
+            else:
+                self.posicion = min(self.total - 1, self.posicion + min(dt, DT_MAXIMO) * velocidad)
+        alcanzados = range(self._siguiente, int(self.posicion) + 1)
+        self._siguiente = int(self.posicion) + 1
+        return alcanzados
+
+    def terminado(self):
+        return self.posicion >= self.total - 1
+
+    def paso_actual(self):
+        return int(self.posicion)
+
+    def interpolar(self, path):
+        """Posición (fila, col) fraccionaria entre el paso actual y el siguiente."""
+        i = int(self.posicion)
+        if i + 1 >= len(path):
+            return path[i]
+        t = self.posicion - i
+        (f0, c0), (f1, c1) = path[i], path[i + 1]
+        return (f0 + (f1 - f0) * t, c0 + (c1 - c0) * t)
+
+    def alternar_pausa(self):
+        self.pausado = not self.pausado
+
+    def alternar_avance_rapido(self):
+        self.avance_rapido = not self.avance_rapido
+
+    def cambiar_velocidad(self, factor):
+        if not math.isinf(self.velocidad):
+            self.velocidad = max(0.1, self.velocidad * factor)
+
+    def cambiar_total(self, total):
+        """El camino cambió de largo (replanificación); la posición actual se mantiene."""
+        self.total = total
+        self.posicion = min(self.posicion, total - 1)
+        self._siguiente = min(self._siguiente, int(self.posicion) + 1)
+
+    def saltar_al_final(self):
+        self.posicion = self.total - 1
+        self.pausado = False
+
+    def texto_velocidad(self):
+        if math.isinf(self.velocidad):
+            return "instantánea"
+        velocidad = self.velocidad * (FACTOR_AVANCE_RAPIDO if self.avance_rapido else 1)
+        return f"{velocidad:.1f} pasos/s" + (" (pausa)" if self.pausado else "")
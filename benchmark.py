@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from cuadricula import INICIO, META
+from busqueda import ESTRATEGIAS
+from generador_mundos import DISPOSICIONES, generar_mundo
+import indice_mundo  # registra la estrategia "BFS-Campo"
+import replanificacion  # registra la estrategia "D* Lite"
+
+# Benchmarks de búsqueda, preprocesamiento y clasificación. Los resultados se guardan
+# en JSON para comparar entre commits (python benchmark.py --comparar anterior.json)
+
+TAMANOS = [10, 64, 256, 1024, 4096]
+DENSIDADES = [0.1, 0.2, 0.3]
+TAMANOS_LOTE = [1, 4, 16, 32]
+
+TAMANOS_GENERADOR = [1024, 4096, 10000]
+
+# Por encima de este tamaño la búsqueda se mide una sola vez
+MAX_CELDAS_REPETIR = 256 * 256
+
+
+def mundo_aleatorio(n, densidad, semilla):
+    """Mundo con la densidad de obstáculos exacta y las esquinas libres."""
+    mundo = generar_mundo(n, densidad=densidad, semilla=semilla)
+    mundo[0, 0] = INICIO
+    mundo[n - 1, n - 1] = META
+    return mundo
+
+
+def bench_generador(tamanos, densidades, repeticiones, semilla=0):
+    """Tiempo de generar_mundo por tamaño, densidad y disposición (con y sin garantía de conexión)."""
+    filas = []
+    for n in tamanos:
+        for densidad in densidades:
+            for disposicion in DISPOSICIONES:
+                for conectados in (None, ((0, 0), (n - 1, n - 1))):
+                    tiempo, _ = medir(lambda: generar_mundo(n, densidad=densidad, disposicion=disposicion,
+                                                            semilla=semilla, conectados=conectados),
+                                      repeticiones)
+                    filas.append({"n": n, "densidad": densidad, "disposicion": disposicion,
+                                  "conectados": conectados is not None, "tiempo_s": tiempo})
+                    print(f"  generador {disposicion:<9} n={n:<5} densidad={densidad:.2f} "
+                          f"{'conectado ' if conectados else '          '}{tiempo * 1000:10.2f} ms")
+    return filas
+
+
+def medir(funcion, repeticiones):
+    """Mejor tiempo de varias repeticiones y el resultado de la última."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor, resultado
+
+
+def bench_busqueda(tamanos, densidades, estrategias, repeticiones, semilla=0):
+    filas = []
+    for n in tamanos:
+        for densidad in densidades:
+            mundo = mundo_aleatorio(n, densidad, semilla)
+            inicio, meta = (0, 0), (n - 1, n - 1)
+            reps = repeticiones if n * n <= MAX_CELDAS_REPETIR else 1
+            for nombre in estrategias:
+                buscar = ESTRATEGIAS[nombre]
+                estadisticas = {}
+
+                def correr():
+                    # BFS-Campo reutiliza el campo de la meta: se limpia para medir la búsqueda completa
+                    indice_mundo._indices.clear()
+                    return buscar(mundo, inicio, meta, n, estadisticas=estadisticas)
+
+                tiempo, (camino, obstaculos) = medir(correr, reps)
+
+                # La memoria se mide en una pasada aparte (tracemalloc frena la búsqueda)
+                tracemalloc.start()
+                correr()
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                filas.append({
+                    "estrategia": nombre, "n": n, "densidad": densidad,
+                    "tiempo_s": tiempo, "memoria_pico_bytes": pico,
+                    "nodos_expandidos": estadisticas.get("nodos_expandidos"),
+                    "longitud": len(camino) if camino else None,
+                    "obstaculos": obstaculos,
+                })
+                print(f"  busqueda {nombre:<9} n={n:<5} densidad={densidad:.2f} "
+                      f"{tiempo * 1000:10.2f} ms {pico / 1e6:8.2f} MB nodos={estadisticas.get('nodos_expandidos')}")
+    return filas
+
+
+def imagenes_dataset():
+    from imagenes import cargar_imagenes_dataset
+    return cargar_imagenes_dataset()
+
+
+def bench_preprocesamiento(rutas, repeticiones):
+    """Imágenes por segundo de cada etapa (la lectura se mide aparte de la ecualización)."""
+    import cv2
+    import preprocesamiento
+    from clasificador import CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID
+
+    grises = [cv2.imread(r, cv2.IMREAD_GRAYSCALE) for r in rutas]
+    grises = [g for g in grises if g is not None]
+    clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+
+    etapas = {
+        "imread_gris": lambda: [cv2.imread(r, cv2.IMREAD_GRAYSCALE) for r in rutas],
+        "equalizeHist": lambda: [cv2.equalizeHist(g) for g in grises],
+        "clahe": lambda: [clahe.apply(g) for g in grises],
+        "imread_mas_clahe": lambda: [clahe.apply(cv2.imread(r, cv2.IMREAD_GRAYSCALE)) for r in rutas],
+        # Las tres variantes de todo el dataset en el pool de hilos, partiendo de la caché vacía
+        "lote_paralelo": lambda: (preprocesamiento.cache.limpiar(), preprocesamiento.preprocesar_lote(rutas)),
+    }
+    filas = []
+    for etapa, funcion in etapas.items():
+        tiempo, _ = medir(funcion, repeticiones)
+        filas.append({"etapa": etapa, "imagenes": len(rutas), "tiempo_s": tiempo,
+                      "imagenes_por_s": len(rutas) / tiempo if tiempo else None})
+        print(f"  preprocesamiento {etapa:<17} {len(rutas) / tiempo:10.1f} img/s")
+    return filas
+
+
+def construir_clip_diminuto(directorio):
+    """Guarda en `directorio` un CLIP minúsculo con pesos al azar (para medir sin descargar nada)."""
+    from transformers import CLIPConfig, CLIPModel, CLIPTokenizer, CLIPImageProcessor, CLIPProcessor
+
+    # Vocabulario de caracteres sueltos, sin fusiones BPE
+    caracteres = [chr(c) for c in range(33, 127)] + list("áéíóúñ")
+    vocab = {}
+    for c in caracteres:
+        vocab[c] = len(vocab)
+    for c in caracteres:
+        vocab[c + "</w>"] = len(vocab)
+    vocab["<|startoftext|>"] = len(vocab)
+    vocab["<|endoftext|>"] = len(vocab)
+    ruta_vocab = os.path.join(directorio, "vocab.json")
+    ruta_merges = os.path.join(directorio, "merges.txt")
+    with open(ruta_vocab, "w", encoding="utf-8") as f:
+        json.dump(vocab, f)
+    with open(ruta_merges, "w", encoding="utf-8") as f:
+        f.write("#version: 0.2\n")
+
+    config = CLIPConfig(
+        text_config=dict(vocab_size=len(vocab), hidden_size=32, intermediate_size=37,
+                         num_hidden_layers=2, num_attention_heads=4, max_position_embeddings=77,
+                         bos_token_id=len(vocab) - 2, eos_token_id=len(vocab) - 1,
+                         pad_token_id=len(vocab) - 1),
+        vision_config=dict(image_size=32, patch_size=8, hidden_size=32, intermediate_size=37,
+                           num_hidden_layers=2, num_attention_heads=4),
+        projection_dim=16)
+    CLIPModel(config).save_pretrained(directorio)
+    procesador = CLIPImageProcessor(size={"shortest_edge": 32}, crop_size={"height": 32, "width": 32})
+    CLIPProcessor(image_processor=procesador,
+                  tokenizer=CLIPTokenizer(ruta_vocab, ruta_merges)).save_pretrained(directorio)
+    return directorio
+
+
+def bench_clasificador(rutas, tamanos_lote, modelo, repeticiones):
+    """Imágenes por segundo del codificador visual y de la clasificación completa, por tamaño de lote."""
+    import clasificador
+    from PIL import Image
+
+    clasificador.proveedor = clasificador.ProveedorModelo(modelo)
+    t0 = time.perf_counter()
+    clasificador.proveedor.obtener()
+    carga = time.perf_counter() - t0
+    print(f"  clasificador: modelo cargado en {carga:.2f}s")
+
+    imagenes = []
+    for ruta in rutas:
+        clahe_img = clasificador.preprocesar_clahe(ruta)
+        if clahe_img is not None:
+            imagenes.append(Image.fromarray(clahe_img).convert("RGB"))
+    clasificador.matriz_etiquetas(clasificador.CANDIDATE_LABELS)
+
+    filas = []
+    for lote in tamanos_lote:
+        def codificar():
+            for i in range(0, len(imagenes), lote):
+                clasificador.codificar_imagenes(imagenes[i:i + lote])
+
+        def clasificar():
+            # Sin caché en disco: mide lectura + CLAHE + modelo + puntuación
+            clasificador.clasificar_imagenes_en_lote(rutas, batch_size=lote, usar_cache=False)
+
+        t_codificar, _ = medir(codificar, repeticiones)
+        t_clasificar, _ = medir(clasificar, repeticiones)
+        filas.append({"batch_size": lote, "imagenes": len(rutas),
+                      "codificar_img_por_s": len(rutas) / t_codificar,
+                      "clasificar_img_por_s": len(rutas) / t_clasificar})
+        print(f"  clasificador lote={lote:<3} codificar {len(rutas) / t_codificar:8.1f} img/s, "
+              f"clasificar {len(rutas) / t_clasificar:8.1f} img/s")
+    return {"modelo": modelo, "carga_s": carga, "lotes": filas}
+
+
+def commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(actual, anterior):
+    """Imprime el cociente actual/anterior de los tiempos de búsqueda que coinciden (>1 = más lento)."""
+    previos = {(f["estrategia"], f["n"], f["densidad"]): f
+               for f in anterior.get("resultados", {}).get("busqueda", [])}
+    print(f"Comparación con {anterior.get('commit')}:")
+    for f in actual["resultados"].get("busqueda", []):
+        previo = previos.get((f["estrategia"], f["n"], f["densidad"]))
+        if previo and previo["tiempo_s"]:
+            cociente = f["tiempo_s"] / previo["tiempo_s"]
+            marca = "  ⚠️" if cociente > 1.2 else ""
+            print(f"  {f['estrategia']:<9} n={f['n']:<5} densidad={f['densidad']:.2f} x{cociente:.2f}{marca}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de búsqueda, preprocesamiento y clasificación")
+    parser.add_argument("--partes", nargs="+", default=["busqueda", "preprocesamiento", "clasificador"],
+                        choices=["generador", "busqueda", "preprocesamiento", "clasificador"])
+    parser.add_argument("--tamanos", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--densidades", type=float, nargs="+", default=DENSIDADES)
+    parser.add_argument("--estrategias", nargs="+", default=list(ESTRATEGIAS))
+    parser.add_argument("--lotes", type=int, nargs="+", default=TAMANOS_LOTE)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--modelo", default=None,
+                        help="modelo CLIP a medir (por defecto, uno diminuto construido en local)")
+    parser.add_argument("--salida", default=None, help="archivo JSON de resultados")
+    parser.add_argument("--comparar", default=None, help="JSON de una ejecución anterior")
+    args = parser.parse_args()
+
+    resultados = {}
+    if "generador" in args.partes:
+        print("Generador de mundos:")
+        resultados["generador"] = bench_generador(TAMANOS_GENERADOR, args.densidades, args.repeticiones)
+    if "busqueda" in args.partes:
+        print("Búsqueda:")
+        resultados["busqueda"] = bench_busqueda(args.tamanos, args.densidades, args.estrategias,
+                                                args.repeticiones)
+    if "preprocesamiento" in args.partes or "clasificador" in args.partes:
+        rutas = imagenes_dataset()
+    if "preprocesamiento" in args.partes:
+        print("Preprocesamiento:")
+        resultados["preprocesamiento"] = bench_preprocesamiento(rutas, args.repeticiones)
+    if "clasificador" in args.partes:
+        print("Clasificador:")
+        if args.modelo:
+            resultados["clasificador"] = bench_clasificador(rutas, args.lotes, args.modelo, args.repeticiones)
+        else:
+            with tempfile.TemporaryDirectory() as directorio:
+                modelo = construir_clip_diminuto(directorio)
+                resultados["clasificador"] = bench_clasificador(rutas, args.lotes, modelo, args.repeticiones)
+                resultados["clasificador"]["modelo"] = "clip-diminuto"
+
+    informe = {
+        "commit": commit_actual(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "numpy": np.__version__,
+        "resultados": resultados,
+    }
+    salida = args.salida or f"benchmark_{informe['commit'] or 'local'}.json"
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            comparar(informe, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
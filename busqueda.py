@@ -0,0 +1,369 @@
+import heapq
+from array import array
+from collections import deque
+
+from cuadricula import celdas_bloqueadas
+
+# Las búsquedas trabajan con índices planos (fila * n + columna) y un arreglo de
+# padres; el camino se reconstruye una sola vez al llegar a la meta.
+#
+# Todas comparten la firma f(mundo, inicio, meta, n, verbose=False, estadisticas=None)
+# y devuelven (camino, obstaculos_detectados). Si se pasa un dict en `estadisticas`,
+# se llena con "nodos_expandidos"; si además trae "orden_expansion" (un array("i")),
+# se anotan ahí las celdas expandidas en orden (para las trazas).
+
+# Registro de estrategias de búsqueda: nombre -> función (en orden de registro)
+ESTRATEGIAS = {}
+
+INFINITO = 2**31 - 1
+
+
+def registrar_estrategia(nombre):
+    """Decorador que agrega una búsqueda al registro con el nombre que verá la interfaz."""
+    def decorador(funcion):
+        ESTRATEGIAS[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def _guardar_estadisticas(estadisticas, nodos_expandidos):
+    if estadisticas is not None:
+        estadisticas["nodos_expandidos"] = nodos_expandidos
+
+
+def _orden_expansion(estadisticas):
+    return estadisticas.get("orden_expansion") if estadisticas is not None else None
+
+
+def reconstruir_camino(padres, meta, n):
+    """Sigue los padres desde la meta hasta el inicio y devuelve la lista de (fila, columna)."""
+    camino = []
+    actual = meta
+    while actual != -1:
+        camino.append(divmod(actual, n))
+        actual = padres[actual]
+    camino.reverse()
+    return camino
+
+
+def vecinos_planos(actual, n):
+    """Vecinos dentro de la cuadrícula en el orden abajo, arriba, derecha, izquierda."""
+    x, y = divmod(actual, n)
+    vecinos = []
+    if x + 1 < n:
+        vecinos.append(actual + n)
+    if x > 0:
+        vecinos.append(actual - n)
+    if y + 1 < n:
+        vecinos.append(actual + 1)
+    if y > 0:
+        vecinos.append(actual - 1)
+    return vecinos
+
+
+# DFS para encontrar un camino
+@registrar_estrategia("DFS")
+def dfs(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    bloqueado = celdas_bloqueadas(mundo)
+    padres = array("i", [-1]) * (n * n)
+    visitados = bytearray(n * n)
+    origen = inicio[0] * n + inicio[1]
+    destino = meta[0] * n + meta[1]
+    obstaculos_detectados = 0  # Contador de obstáculos
+    expandidos = 0
+    orden = _orden_expansion(estadisticas)
+
+    stack = [(origen, -1)]  # (celda, padre con el que se apiló)
+    while stack:
+        actual, padre = stack.pop()
+        if visitados[actual]:
+            continue
+        visitados[actual] = 1
+        padres[actual] = padre
+        expandidos += 1
+        if orden is not None:
+            orden.append(actual)
+
+        if actual == destino:
+            _guardar_estadisticas(estadisticas, expandidos)
+            return reconstruir_camino(padres, destino, n), obstaculos_detectados
+
+        for vecino in vecinos_planos(actual, n):
+            if not bloqueado[vecino]:  # no es obstáculo
+                if not visitados[vecino]:
+                    stack.append((vecino, actual))
+            else:
+                if verbose:
+                    print(f"🚧Obstáculo encontrado en {divmod(vecino, n)}")
+                obstaculos_detectados += 1  # Incrementar contador
+    _guardar_estadisticas(estadisticas, expandidos)
+    return None, obstaculos_detectados
+
+
+# BFS para encontrar un camino
+@registrar_estrategia("BFS")
+def bfs(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    bloqueado = celdas_bloqueadas(mundo)
+    padres = array("i", [-1]) * (n * n)
+    visitados = bytearray(n * n)
+    origen = inicio[0] * n + inicio[1]
+    destino = meta[0] * n + meta[1]
+    obstaculos_detectados = 0  # Contador de obstáculos
+    expandidos = 0
+    orden = _orden_expansion(estadisticas)
+
+    # Se marca al encolar: el primer padre que descubre una celda es el que queda
+    cola = deque([origen])
+    visitados[origen] = 1
+    while cola:
+        actual = cola.popleft()
+        expandidos += 1
+        if orden is not None:
+            orden.append(actual)
+
+        if actual == destino:
+            _guardar_estadisticas(estadisticas, expandidos)
+            return reconstruir_camino(padres, destino, n), obstaculos_detectados
+
+        for vecino in vecinos_planos(actual, n):
+            if not bloqueado[vecino]:  # si no es obstáculo
+                if not visitados[vecino]:
+                    visitados[vecino] = 1
+                    padres[vecino] = actual
+                    cola.append(vecino)
+            else:
+                if verbose:
+                    print(f"🚧Objeto detectado en {divmod(vecino, n)}")
+                obstaculos_detectados += 1  # Incrementar contador
+    _guardar_estadisticas(estadisticas, expandidos)
+    return None, obstaculos_detectados
+
+
+# A* con heurística Manhattan (admisible y consistente en una cuadrícula 4-conectada)
+@registrar_estrategia("A*")
+def a_estrella(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    bloqueado = celdas_bloqueadas(mundo)
+    padres = array("i", [-1]) * (n * n)
+    costos = array("i", [INFINITO]) * (n * n)
+    cerrados = bytearray(n * n)
+    origen = inicio[0] * n + inicio[1]
+    destino = meta[0] * n + meta[1]
+    mx, my = meta
+    obstaculos_detectados = 0
+    expandidos = 0
+    orden = _orden_expansion(estadisticas)
+
+    h = abs(inicio[0] - mx) + abs(inicio[1] - my)
+    costos[origen] = 0
+    # (f, h, celda): a igual f se prefiere la celda más cercana a la meta
+    abiertos = [(h, h, origen)]
+    while abiertos:
+        _, _, actual = heapq.heappop(abiertos)
+        if cerrados[actual]:
+            continue
+        cerrados[actual] = 1
+        expandidos += 1
+        if orden is not None:
+            orden.append(actual)
+
+        if actual == destino:
+            _guardar_estadisticas(estadisticas, expandidos)
+            return reconstruir_camino(padres, destino, n), obstaculos_detectados
+
+        costo = costos[actual] + 1
+        for vecino in vecinos_planos(actual, n):
+            if bloqueado[vecino]:
+                if verbose:
+                    print(f"🚧Obstáculo encontrado en {divmod(vecino, n)}")
+                obstaculos_detectados += 1
+            elif costo < costos[vecino]:
+                costos[vecino] = costo
+                padres[vecino] = actual
+                vx, vy = divmod(vecino, n)
+                h = abs(vx - mx) + abs(vy - my)
+                heapq.heappush(abiertos, (costo + h, h, vecino))
+    _guardar_estadisticas(estadisticas, expandidos)
+    return None, obstaculos_detectados
+
+
+# BFS bidireccional: avanza por capas desde el inicio y desde la meta a la vez
+@registrar_estrategia("BFS-Bi")
+def bfs_bidireccional(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    bloqueado = celdas_bloqueadas(mundo)
+    origen = inicio[0] * n + inicio[1]
+    destino = meta[0] * n + meta[1]
+    if origen == destino:
+        _guardar_estadisticas(estadisticas, 1)
+        return [tuple(inicio)], 0
+
+    # Índice 0: lado del inicio, índice 1: lado de la meta
+    distancias = (array("i", [-1]) * (n * n), array("i", [-1]) * (n * n))
+    padres = (array("i", [-1]) * (n * n), array("i", [-1]) * (n * n))
+    distancias[0][origen] = 0
+    distancias[1][destino] = 0
+    fronteras = [[origen], [destino]]
+    obstaculos_detectados = 0
+    expandidos = 0
+    orden = _orden_expansion(estadisticas)
+
+    encuentro = None  # (largo, celda del lado del inicio, celda del lado de la meta)
+    while fronteras[0] and fronteras[1] and encuentro is None:
+        # Se expande siempre la frontera más chica, una capa completa
+        lado = 0 if len(fronteras[0]) <= len(fronteras[1]) else 1
+        propias, ajenas = distancias[lado], distancias[1 - lado]
+        siguiente = []
+        for actual in fronteras[lado]:
+            expandidos += 1
+            if orden is not None:
+                orden.append(actual)
+            for vecino in vecinos_planos(actual, n):
+                if bloqueado[vecino]:
+                    if verbose:
+                        print(f"🚧Obstáculo encontrado en {divmod(vecino, n)}")
+                    obstaculos_detectados += 1
+                    continue
+                if ajenas[vecino] != -1:
+                    # Terminar la capa para quedarse con el encuentro más corto
+                    largo = propias[actual] + 1 + ajenas[vecino]
+                    if encuentro is None or largo < encuentro[0]:
+                        encuentro = (largo, actual, vecino) if lado == 0 else (largo, vecino, actual)
+                if propias[vecino] == -1:
+                    propias[vecino] = propias[actual] + 1
+                    padres[lado][vecino] = actual
+                    siguiente.append(vecino)
+        fronteras[lado] = siguiente
+
+    _guardar_estadisticas(estadisticas, expandidos)
+    if encuentro is None:
+        return None, obstaculos_detectados
+
+    _, lado_inicio, lado_meta = encuentro
+    camino = reconstruir_camino(padres[0], lado_inicio, n)
+    actual = lado_meta
+    while actual != -1:
+        camino.append(divmod(actual, n))
+        actual = padres[1][actual]
+    return camino, obstaculos_detectados
+
+
+# Jump Point Search para cuadrículas 4-conectadas. Orden canónico: los caminos
+# avanzan primero en vertical y solo giran desde un tramo horizontal cuando un
+# obstáculo lo fuerza; así se saltan las celdas intermedias de cada tramo recto.
+def _saltar_horizontal(bloqueado, n, x, y, dy, meta):
+    """Avanza por la fila x en dirección dy; devuelve la columna del punto de salto o None."""
+    while True:
+        ny = y + dy
+        if ny < 0 or ny >= n or bloqueado[x * n + ny]:
+            return None
+        if (x, ny) == meta:
+            return ny
+        # Vecino forzado: arriba/abajo está libre pero detrás (columna y) estaba bloqueado
+        for ax in (x + 1, x - 1):
+            if 0 <= ax < n and not bloqueado[ax * n + ny] and bloqueado[ax * n + y]:
+                return ny
+        y = ny
+
+
+def _saltar_vertical(bloqueado, n, x, y, dx, meta):
+    """Avanza por la columna y en dirección dx; devuelve la fila del punto de salto o None."""
+    while True:
+        nx = x + dx
+        if nx < 0 or nx >= n or bloqueado[nx * n + y]:
+            return None
+        if (nx, y) == meta:
+            return nx
+        # Es punto de salto si desde aquí un tramo horizontal encuentra otro
+        if (_saltar_horizontal(bloqueado, n, nx, y, 1, meta) is not None
+                or _saltar_horizontal(bloqueado, n, nx, y, -1, meta) is not None):
+            return nx
+        x = nx
+
+
+def _direcciones_jps(bloqueado, n, x, y, direccion):
+    """Direcciones (dx, dy) a explorar desde un punto de salto según cómo se llegó a él."""
+    if direccion is None:
+        return [(1, 0), (-1, 0), (0, 1), (0, -1)]
+    dx, dy = direccion
+    if dx != 0:
+        return [(dx, 0), (0, 1), (0, -1)]
+    direcciones = [(0, dy)]
+    for ax in (x + 1, x - 1):
+        if 0 <= ax < n and 0 <= y - dy < n and not bloqueado[ax * n + y] and bloqueado[ax * n + y - dy]:
+            direcciones.append((ax - x, 0))
+    return direcciones
+
+
+@registrar_estrategia("JPS")
+def jps(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    bloqueado = celdas_bloqueadas(mundo)
+    # Enteros de Python: con escalares de numpy las restas de booleanos de los saltos fallan
+    inicio = (int(inicio[0]), int(inicio[1]))
+    meta = (int(meta[0]), int(meta[1]))
+    mx, my = meta
+    origen = inicio[0] * n + inicio[1]
+    destino = mx * n + my
+    padres = {origen: -1}
+    costos = {origen: 0}
+    llegada = {origen: None}  # dirección con la que se alcanzó cada punto de salto
+    cerrados = set()
+    obstaculos_detectados = 0
+    expandidos = 0
+    orden = _orden_expansion(estadisticas)   # solo los puntos de salto
+
+    h = abs(inicio[0] - mx) + abs(inicio[1] - my)
+    abiertos = [(h, h, origen)]
+    while abiertos:
+        _, _, actual = heapq.heappop(abiertos)
+        if actual in cerrados:
+            continue
+        cerrados.add(actual)
+        expandidos += 1
+        if orden is not None:
+            orden.append(actual)
+
+        if actual == destino:
+            _guardar_estadisticas(estadisticas, expandidos)
+            return _interpolar_saltos(padres, destino, n), obstaculos_detectados
+
+        x, y = divmod(actual, n)
+        for vecino in vecinos_planos(actual, n):
+            if bloqueado[vecino]:
+                if verbose:
+                    print(f"🚧Obstáculo encontrado en {divmod(vecino, n)}")
+                obstaculos_detectados += 1
+
+        for dx, dy in _direcciones_jps(bloqueado, n, x, y, llegada[actual]):
+            if dx != 0:
+                fila = _saltar_vertical(bloqueado, n, x, y, dx, meta)
+                if fila is None:
+                    continue
+                salto, distancia = fila * n + y, abs(fila - x)
+            else:
+                columna = _saltar_horizontal(bloqueado, n, x, y, dy, meta)
+                if columna is None:
+                    continue
+                salto, distancia = x * n + columna, abs(columna - y)
+
+            costo = costos[actual] + distancia
+            if costo < costos.get(salto, INFINITO):
+                costos[salto] = costo
+                padres[salto] = actual
+                llegada[salto] = (dx, dy)
+                sx, sy = divmod(salto, n)
+                h = abs(sx - mx) + abs(sy - my)
+                heapq.heappush(abiertos, (costo + h, h, salto))
+    _guardar_estadisticas(estadisticas, expandidos)
+    return None, obstaculos_detectados
+
+
+def _interpolar_saltos(padres, destino, n):
+    """Convierte la cadena de puntos de salto en el camino celda por celda."""
+    puntos = reconstruir_camino(padres, destino, n)
+    camino = [puntos[0]]
+    for (x1, y1) in puntos[1:]:
+        x0, y0 = camino[-1]
+        pasos = abs(x1 - x0) + abs(y1 - y0)
+        dx = (x1 > x0) - (x1 < x0)
+        dy = (y1 > y0) - (y1 < y0)
+        camino.extend((x0 + dx * k, y0 + dy * k) for k in range(1, pasos + 1))
+    return camino
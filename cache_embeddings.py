@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Carpeta donde se guardan los embeddings entre ejecuciones
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache_embeddings")
+
+
+def hash_contenido(ruta):
+    """Devuelve el SHA-1 del contenido del archivo."""
+    h = hashlib.sha1()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+class AlmacenEmbeddings:
+    """Caché en disco de embeddings CLIP (matriz memory-mapped + índice JSON)."""
+
+    def __init__(self, model_name, clip_limit, tile_grid, directorio=CACHE_DIR):
+        # Con directorio=None el almacén vive solo en memoria
+        self.directorio = directorio
+        self.ruta_matriz = os.path.join(directorio, "embeddings.npy") if directorio else None
+        self.ruta_indice = os.path.join(directorio, "indice.json") if directorio else None
+
+        # El modelo y los parámetros de CLAHE forman parte de la clave. Cada configuración
+        # (por ejemplo fp32 e int8) guarda sus propias claves, así que alternar entre
+        # ellas no borra las entradas de la otra
+        self.config = f"{model_name}|clip={clip_limit}|tiles={tile_grid[0]}x{tile_grid[1]}"
+
+        self.entradas = {}   # clave -> {"fila": int | None, "etiquetas": {clave_etiquetas: {...}}}
+        self.rutas = {}      # ruta -> {config: clave con la que se clasificó por última vez}
+        self.matriz = None   # embeddings ya guardados (solo lectura, memory-mapped)
+        self.nuevos = {}     # clave -> embedding calculado en esta ejecución
+        self.modificado = False
+        self._cargar()
+
+    def _cargar(self):
+        if self.directorio is None:
+            return
+        if not (os.path.isfile(self.ruta_indice) and os.path.isfile(self.ruta_matriz)):
+            return
+        try:
+            with open(self.ruta_indice, encoding="utf-8") as f:
+                indice = json.load(f)
+            self.matriz = np.load(self.ruta_matriz, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print("Aviso: caché de embeddings ilegible, se reconstruirá:", e)
+            self.matriz = None
+            return
+        rutas = indice.get("rutas", {})
+        if "configs" not in indice:
+            # Formato anterior: una sola clave por ruta, de la configuración guardada
+            config = indice.get("config")
+            rutas = {r: {config: c} for r, c in rutas.items()} if config else {}
+        self.entradas = indice.get("entradas", {})
+        self.rutas = rutas
+
+    def clave(self, ruta, contenido=None):
+        """Clave de la imagen: hash del contenido + modelo + parámetros de preprocesamiento.
+
+        `contenido` es el hash del archivo si ya se calculó (si no, se lee el archivo).
+        """
+        if contenido is None:
+            contenido = hash_contenido(ruta)
+        clave = hashlib.sha1(f"{self.config}|{contenido}".encode()).hexdigest()
+        por_config = self.rutas.setdefault(ruta, {})
+        if por_config.get(self.config) != clave:
+            por_config[self.config] = clave
+            self.modificado = True
+        return clave
+
+    def tiene_embedding(self, clave):
+        return clave in self.nuevos or clave in self.entradas
+
+    def obtener_embedding(self, clave):
+        if clave in self.nuevos:
+            return self.nuevos[clave]
+        return self.matriz[self.entradas[clave]["fila"]]
+
+    def agregar_embedding(self, clave, embedding):
+        self.nuevos[clave] = np.asarray(embedding, dtype=np.float32)
+        self.entradas[clave] = {"fila": None, "etiquetas": {}}
+        self.modificado = True
+
+    def obtener_etiqueta(self, clave, clave_etiquetas):
+        entrada = self.entradas.get(clave)
+        if entrada is None:
+            return None
+        return entrada["etiquetas"].get(clave_etiquetas)
+
+    def guardar_etiqueta(self, clave, clave_etiquetas, resultado):
+        self.entradas[clave]["etiquetas"][clave_etiquetas] = resultado
+        self.modificado = True
+
+    def guardar(self):
+        """Reescribe la matriz y el índice solo con las entradas que siguen en uso."""
+        if self.directorio is None or not self.modificado:
+            return
+
+        en_uso = dict.fromkeys(c for por_config in self.rutas.values() for c in por_config.values())
+        vivas = [c for c in en_uso if self.tiene_embedding(c)]
+        if not vivas:
+            return
+        # La matriz tiene un solo ancho: manda el de la configuración actual, y los
+        # embeddings de otro modelo con otra dimensión quedan afuera
+        propias = [c for por_config in self.rutas.values()
+                   if (c := por_config.get(self.config)) is not None and self.tiene_embedding(c)]
+        dim = len(self.obtener_embedding(propias[0] if propias else vivas[0]))
+        vivas = [c for c in vivas if len(self.obtener_embedding(c)) == dim]
+        filas = [self.obtener_embedding(c) for c in vivas]
+
+        os.makedirs(self.directorio, exist_ok=True)
+        tmp_matriz = self.ruta_matriz + ".tmp"
+        matriz = np.lib.format.open_memmap(tmp_matriz, mode="w+", dtype=np.float32,
+                                           shape=(len(filas), dim))
+        for i, fila in enumerate(filas):
+            matriz[i] = fila
+        matriz.flush()
+        del matriz
+
+        entradas = {}
+        for i, c in enumerate(vivas):
+            entradas[c] = {"fila": i, "etiquetas": self.entradas[c]["etiquetas"]}
+        rutas = {}
+        for ruta, por_config in self.rutas.items():
+            vigentes = {config: c for config, c in por_config.items() if c in entradas}
+            if vigentes:
+                rutas[ruta] = vigentes
+
+        # Soltar el mmap anterior antes de reemplazar el archivo
+        self.matriz = None
+        os.replace(tmp_matriz, self.ruta_matriz)
+        tmp_indice = self.ruta_indice + ".tmp"
+        with open(tmp_indice, "w", encoding="utf-8") as f:
+            configs = sorted({config for por_config in rutas.values() for config in por_config})
+            json.dump({"configs": configs, "entradas": entradas, "rutas": rutas}, f)
+        os.replace(tmp_indice, self.ruta_indice)
+
+        self.entradas = entradas
+        self.rutas = rutas
+        self.nuevos = {}
+        self.matriz = np.load(self.ruta_matriz, mmap_mode="r")
+        self.modificado = False
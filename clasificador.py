@@ -0,0 +1,379 @@
+import hashlib
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from cache_embeddings import AlmacenEmbeddings, hash_contenido
+from inferencia_cpu import HILOS, HILOS_INTER, INT8, configurar_hilos, preparar_modelo
+from instrumentacion import contar, etapa
+from preprocesamiento import aplicar_clahe
+
+# cv2, torch y transformers se importan dentro de las funciones: importar este
+# módulo (o mundo_abejita) para usar la búsqueda no debe pagar la carga de CLIP
+
+# Modelo zero-shot usado para clasificar las imágenes de los obstáculos
+MODEL_NAME = "openai/clip-vit-base-patch32"
+
+# Definir las categorías temáticas
+CANDIDATE_LABELS = ["ave", "perro", "carro", "helado", "lluvia", "flor"]
+
+# Taxonomía ampliada: géneros de flores (incluye los del dataset, p. ej. Weigela o Viola)
+ESPECIES_FLORES = [
+    "Allium", "Anemone", "Aster", "Begonia", "Calendula", "Camellia", "Clematis", "Cosmos",
+    "Crocus", "Dahlia", "Daisy", "Freesia", "Gardenia", "Geranium", "Gerbera", "Gladiolus",
+    "Hibiscus", "Hyacinth", "Hydrangea", "Iris", "Jasmine", "Lavender", "Lily", "Lotus",
+    "Magnolia", "Marigold", "Orchid", "Peony", "Petunia", "Poppy", "Rose", "Sunflower",
+    "Tulip", "Vinca", "Viola", "Watsonia", "Weigela", "Wisteria", "Xanthisma",
+    "Xeranthemum", "Xerochrysum", "Zinnia",
+]
+
+# Cada etiqueta fina se resume en una de las categorías temáticas
+CATEGORIA_DE_ETIQUETA = {especie: "flor" for especie in ESPECIES_FLORES}
+ETIQUETAS_AMPLIADAS = CANDIDATE_LABELS + ESPECIES_FLORES
+
+# Plantilla de texto (la misma que usa el pipeline zero-shot)
+HYPOTHESIS_TEMPLATE = "This is a photo of {}."
+
+# Parámetros de la ecualización adaptativa CLAHE
+CLAHE_CLIP_LIMIT = 1.0
+CLAHE_TILE_GRID = (8, 8)
+
+# Número de imágenes que se envían juntas al modelo
+BATCH_SIZE = 16
+
+# Número de etiquetas que se codifican juntas al construir la matriz de texto
+TEXT_BATCH_SIZE = 256
+
+
+class ProveedorModelo:
+    """Carga perezosa del clasificador zero-shot, opcionalmente en un hilo de fondo."""
+
+    def __init__(self, model_name=MODEL_NAME, hilos=HILOS, hilos_inter=HILOS_INTER, int8=INT8):
+        self.model_name = model_name
+        self.hilos = hilos
+        self.hilos_inter = hilos_inter
+        self.int8 = int8
+        self._classifier = None
+        self._error = None
+        self._hilo = None
+        self._lock = threading.Lock()
+        self._listo = threading.Event()
+        self.tiempo_carga = None    # segundos que tardó la carga
+        self.momento_listo = None   # time.perf_counter() cuando el modelo quedó listo
+
+    def iniciar_en_segundo_plano(self):
+        """Empieza a cargar el modelo sin bloquear (no hace nada si ya se inició)."""
+        with self._lock:
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._cargar, name="carga-modelo", daemon=True)
+                self._hilo.start()
+
+    def _cargar(self):
+        inicio = time.perf_counter()
+        try:
+            from transformers import pipeline
+            configurar_hilos(self.hilos, self.hilos_inter)
+            with etapa("carga_modelo"):
+                classifier = pipeline("zero-shot-image-classification",
+                                      model=self.model_name,
+                                      use_fast=True,
+                                      device="cpu")
+                preparar_modelo(classifier.model, self.int8)
+            self._classifier = classifier
+        except Exception as e:
+            self._error = e
+        finally:
+            self.momento_listo = time.perf_counter()
+            self.tiempo_carga = self.momento_listo - inicio
+            self._listo.set()
+
+    def listo(self):
+        return self._listo.is_set()
+
+    def obtener(self):
+        """Devuelve el pipeline, esperando a que termine de cargar si hace falta."""
+        self.iniciar_en_segundo_plano()
+        self._listo.wait()
+        if self._error is not None:
+            raise self._error
+        return self._classifier
+
+
+# Proveedor compartido del modelo (no carga nada hasta que alguien lo pide)
+proveedor = ProveedorModelo()
+
+
+def __getattr__(nombre):
+    # Compatibilidad: clasificador.classifier sigue funcionando, pero ahora es perezoso
+    if nombre == "classifier":
+        return proveedor.obtener()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+# Caché en disco de embeddings y etiquetas (se abre la primera vez que se usa)
+_almacen = None
+
+# Protege el almacén cuando se clasifica desde varios hilos a la vez
+_lock_almacen = threading.RLock()
+
+# Matrices de embeddings de texto ya calculadas: tupla de etiquetas -> matriz
+_matrices_etiquetas = {}
+
+# Resultados ya entregados en esta sesión: (clave_etiquetas, ruta) -> resultado.
+# Una imagen repetida entre obstáculos no vuelve ni a calcular su hash.
+_resultados_sesion = {}
+
+
+def olvidar_resultados(rutas):
+    """Saca de la memoria de la sesión esas rutas (el archivo cambió: hay que volver a mirar su hash)."""
+    rutas = set(rutas)
+    # Lo llama el hilo que vigila las carpetas mientras otros hilos clasifican
+    with _lock_almacen:
+        for clave in [c for c in _resultados_sesion if c[1] in rutas]:
+            _resultados_sesion.pop(clave, None)
+
+
+def _nombre_modelo():
+    # Los embeddings int8 no son idénticos a los fp32: cada variante tiene sus entradas
+    return f"{MODEL_NAME}|int8" if proveedor.int8 else MODEL_NAME
+
+
+def obtener_almacen():
+    global _almacen
+    if _almacen is None:
+        _almacen = AlmacenEmbeddings(_nombre_modelo(), CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID)
+    return _almacen
+
+
+def preprocesar_clahe(image_path):
+    """Lee la imagen en escala de grises y le aplica CLAHE. Devuelve None si no se puede leer."""
+    # Compartido con el panel de inspección: la misma imagen no se decodifica dos veces
+    return aplicar_clahe(image_path, CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID)
+
+
+def _como_tensor(salida):
+    # Según la versión de transformers, get_*_features devuelve un tensor o un ModelOutput
+    import torch
+    return salida if isinstance(salida, torch.Tensor) else salida.pooler_output
+
+
+def codificar_imagenes(imagenes, proveedor_modelo=None):
+    """Pasa una lista de imágenes PIL por el codificador visual; devuelve embeddings normalizados."""
+    import torch
+    classifier = (proveedor_modelo or proveedor).obtener()
+    with etapa("clip_procesador_imagenes"):
+        inputs = classifier.image_processor(images=imagenes, return_tensors="pt").to(torch.float32)
+    with etapa("clip_imagenes"), torch.inference_mode():
+        emb = _como_tensor(classifier.model.get_image_features(**inputs))
+    contar("imagenes_codificadas", len(imagenes))
+    emb = emb / emb.norm(dim=-1, keepdim=True)
+    return emb.float().numpy()
+
+
+def codificar_etiquetas(candidate_labels, proveedor_modelo=None):
+    """Embeddings de texto normalizados para cada etiqueta."""
+    import torch
+    classifier = (proveedor_modelo or proveedor).obtener()
+    textos = [HYPOTHESIS_TEMPLATE.format(label) for label in candidate_labels]
+    inputs = classifier.tokenizer(textos, padding=True, return_tensors="pt")
+    with etapa("clip_texto"), torch.inference_mode():
+        emb = _como_tensor(classifier.model.get_text_features(**inputs))
+    emb = emb / emb.norm(dim=-1, keepdim=True)
+    return emb.float().numpy()
+
+
+def matriz_etiquetas(candidate_labels):
+    """Matriz (etiquetas x dim) de embeddings de texto, calculada una sola vez por conjunto."""
+    clave = tuple(candidate_labels)
+    if clave not in _matrices_etiquetas:
+        # Por trozos, para vocabularios de miles de etiquetas
+        trozos = [codificar_etiquetas(clave[i:i + TEXT_BATCH_SIZE])
+                  for i in range(0, len(clave), TEXT_BATCH_SIZE)]
+        _matrices_etiquetas[clave] = np.concatenate(trozos)
+    return _matrices_etiquetas[clave]
+
+
+def mejores_k(fila, k):
+    """Índices de las k puntuaciones más altas, de mayor a menor (sin ordenar toda la fila)."""
+    k = min(k, len(fila))
+    indices = np.argpartition(-fila, k - 1)[:k]
+    return indices[np.argsort(-fila[indices])]
+
+
+def categoria(label):
+    """Categoría temática de una etiqueta (una especie de flor cuenta como "flor")."""
+    return CATEGORIA_DE_ETIQUETA.get(label, label)
+
+
+def puntuar(emb_imagenes, emb_etiquetas, proveedor_modelo=None):
+    """Probabilidades por etiqueta (softmax de la similitud escalada, igual que CLIP)."""
+    escala = (proveedor_modelo or proveedor).obtener().model.logit_scale.exp().item()
+    logits = escala * (emb_imagenes @ emb_etiquetas.T)
+    logits -= logits.max(axis=1, keepdims=True)
+    probs = np.exp(logits)
+    return probs / probs.sum(axis=1, keepdims=True)
+
+
+def clasificar_imagenes_en_lote(image_paths, batch_size=BATCH_SIZE, candidate_labels=CANDIDATE_LABELS,
+                                usar_cache=True, top_k=1, agrupar_variantes=False):
+    """Clasifica una lista de imágenes por lotes y devuelve {ruta: {"label", "score", "top"}}.
+
+    Las imágenes ya vistas (mismo contenido, modelo y CLAHE) no pasan por el
+    codificador visual: su embedding y su etiqueta se leen de la caché en disco.
+    "top" contiene las top_k etiquetas como lista de (label, score).
+    Con agrupar_variantes solo se clasifica el representante de cada grupo de
+    variantes (las rutas que no se agruparon antes se agrupan entre sí); las demás
+    variantes copian su resultado (con la clave "representante").
+    """
+    if agrupar_variantes:
+        from variantes import expandir, representantes_de
+        representantes = representantes_de(image_paths)
+        tabla_rep = clasificar_imagenes_en_lote(list(dict.fromkeys(representantes.values())), batch_size,
+                                                candidate_labels, usar_cache, top_k)
+        contar("variantes_agrupadas", sum(r != rep for r, rep in representantes.items()))
+        return expandir(representantes, tabla_rep)
+
+    almacen = obtener_almacen() if usar_cache else AlmacenEmbeddings(
+        _nombre_modelo(), CLAHE_CLIP_LIMIT, CLAHE_TILE_GRID, directorio=None)
+    # Clave corta del conjunto de etiquetas (puede tener miles)
+    clave_etiquetas = hashlib.sha1(
+        f"{HYPOTHESIS_TEMPLATE}|k={top_k}|{'|'.join(candidate_labels)}".encode()).hexdigest()
+
+    tabla = {}
+    claves = {}
+    pendientes = []  # imágenes sin embedding guardado
+
+    # Quitar rutas repetidas conservando el orden (las imágenes se reparten con repetición)
+    rutas = list(dict.fromkeys(image_paths))
+
+    # Leer cada archivo para su hash es lo lento: se hace antes de tomar el lock
+    contenidos = {}
+    for ruta in rutas:
+        if usar_cache and (clave_etiquetas, ruta) in _resultados_sesion:
+            continue
+        try:
+            contenidos[ruta] = hash_contenido(ruta)
+        except OSError:
+            pass
+
+    with _lock_almacen:
+        for ruta in rutas:
+            if usar_cache and (clave_etiquetas, ruta) in _resultados_sesion:
+                contar("sesion_aciertos")
+                tabla[ruta] = _resultados_sesion[clave_etiquetas, ruta]
+                continue
+            if ruta not in contenidos and not os.path.isfile(ruta):
+                print(f"No se pudo cargar la imagen {ruta}")
+                continue
+            # (sin hash previo solo si su resultado de la sesión se olvidó recién)
+            clave = almacen.clave(ruta, contenidos.get(ruta))
+            claves[ruta] = clave
+            resultado = almacen.obtener_etiqueta(clave, clave_etiquetas)
+            if resultado is not None:
+                contar("cache_aciertos")
+                tabla[ruta] = resultado
+            elif not almacen.tiene_embedding(clave):
+                pendientes.append(ruta)
+
+    # Solo las imágenes nuevas pasan por el codificador visual
+    for inicio in range(0, len(pendientes), batch_size):
+        lote_rutas = []
+        lote_imagenes = []
+        for ruta in pendientes[inicio:inicio + batch_size]:
+            clahe_img = preprocesar_clahe(ruta)
+            if clahe_img is None:
+                print(f"No se pudo cargar la imagen {ruta}")
+                continue
+            lote_rutas.append(ruta)
+            lote_imagenes.append(Image.fromarray(clahe_img).convert("RGB"))
+
+        if not lote_imagenes:
+            continue
+
+        # El codificador corre fuera del lock; solo se protege la escritura en el almacén
+        embeddings = codificar_imagenes(lote_imagenes)
+        with _lock_almacen:
+            for ruta, emb in zip(lote_rutas, embeddings):
+                almacen.agregar_embedding(claves[ruta], emb)
+
+    # Puntuar contra las etiquetas todo lo que aún no tiene resultado
+    emb_etiquetas = matriz_etiquetas(candidate_labels)
+    with _lock_almacen:
+        sin_etiqueta = [r for r, c in claves.items() if r not in tabla and almacen.tiene_embedding(c)]
+        if sin_etiqueta:
+            emb_imagenes = np.stack([almacen.obtener_embedding(claves[r]) for r in sin_etiqueta])
+            probs = puntuar(emb_imagenes, emb_etiquetas)
+            for ruta, fila in zip(sin_etiqueta, probs):
+                top = [(candidate_labels[i], float(fila[i])) for i in mejores_k(fila, top_k)]
+                resultado = {"label": top[0][0], "score": top[0][1], "top": top}
+                tabla[ruta] = resultado
+                almacen.guardar_etiqueta(claves[ruta], clave_etiquetas, resultado)
+
+        if usar_cache:
+            _resultados_sesion.update(((clave_etiquetas, ruta), resultado) for ruta, resultado in tabla.items())
+            try:
+                almacen.guardar()
+            except OSError as e:
+                print("Aviso: no se pudo guardar la caché de embeddings:", e)
+
+    return tabla
+
+
+class ClasificacionAnticipada:
+    """Clasifica imágenes en hilos de fondo y entrega los resultados por una cola.
+
+    La animación encola las imágenes de los obstáculos que va a tocar y, en cada
+    frame, recoge sin bloquear lo que ya esté listo.
+    """
+
+    def __init__(self, max_workers=1, batch_size=4, candidate_labels=CANDIDATE_LABELS, agrupar_variantes=False):
+        self.batch_size = batch_size
+        self.candidate_labels = candidate_labels
+        self.agrupar_variantes = agrupar_variantes
+        self.resultados = queue.Queue()   # (ruta, {"label", "score", ...})
+        self.encoladas = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="clasificacion")
+
+    def encolar(self, image_paths):
+        """Manda a clasificar, en el orden dado, las imágenes que aún no se pidieron."""
+        with self._lock:
+            nuevas = [r for r in dict.fromkeys(image_paths) if r not in self.encoladas]
+            self.encoladas.update(nuevas)
+        # Lotes pequeños: las primeras imágenes del camino llegan antes
+        for inicio in range(0, len(nuevas), self.batch_size):
+            self._executor.submit(self._clasificar, nuevas[inicio:inicio + self.batch_size])
+
+    def olvidar(self, rutas):
+        """Permite volver a encolar esas rutas (el archivo cambió y hay que clasificarlo de nuevo)."""
+        with self._lock:
+            self.encoladas.difference_update(rutas)
+
+    def _clasificar(self, rutas):
+        # Por el servidor de clasificación si hay uno en marcha; si no, en este proceso
+        from servidor_clasificacion import clasificar
+        try:
+            tabla = clasificar(rutas, self.candidate_labels, agrupar_variantes=self.agrupar_variantes)
+        except Exception as e:
+            print("Aviso: error clasificando en segundo plano:", e)
+            tabla = {}
+        # Las que fallaron (o no se pudieron leer) llegan como fallo, no quedan pendientes para siempre
+        for ruta in rutas:
+            self.resultados.put((ruta, tabla.get(ruta) or {"label": None, "score": None}))
+
+    def recoger(self):
+        """Devuelve {ruta: resultado} con todo lo que llegó desde la última llamada (no bloquea)."""
+        listos = {}
+        while True:
+            try:
+                ruta, resultado = self.resultados.get_nowait()
+            except queue.Empty:
+                return listos
+            listos[ruta] = resultado
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,50 @@
+import random
+
+import numpy as np
+
+# Códigos de celda: la cuadrícula es una matriz uint8 de n x n indexada por (fila, columna)
+LIBRE = 0
+OBSTACULO = 1
+INICIO = 2
+META = 3
+
+
+# Construcción del mundo como matriz
+def crear_mundo(n, num_obstaculos=20, semilla=None, disposicion="uniforme"):
+    """Mundo n x n con exactamente num_obstaculos obstáculos (ver generador_mundos).
+
+    Sin semilla se saca una del random global: random.seed sigue fijando el mundo.
+    """
+    from generador_mundos import generar_mundo
+    if semilla is None:
+        semilla = random.getrandbits(64)
+    return generar_mundo(n, min(num_obstaculos, n * n), disposicion=disposicion, semilla=semilla)
+
+
+def posiciones_obstaculos(mundo):
+    """Lista de (fila, columna) de todos los obstáculos, en orden de filas."""
+    return [(int(x), int(y)) for x, y in np.argwhere(mundo == OBSTACULO)]
+
+
+def celdas_bloqueadas(mundo):
+    """Bytes con 1 en cada celda obstáculo, indexados por índice plano fila * n + columna."""
+    return (np.asarray(mundo) == OBSTACULO).ravel().tobytes()
+
+
+def contactos_en_camino(mundo, path, meta, n):
+    """Obstáculos vecinos de cada paso del camino (con repeticiones), como los ve la animación."""
+    contactos = []
+    for paso in path:
+        # La abeja no revisa vecinos al llegar a la meta
+        if paso == meta:
+            continue
+        x, y = paso
+        for nx, ny in [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]:
+            if 0 <= nx < n and 0 <= ny < n and mundo[(nx, ny)] == OBSTACULO:
+                contactos.append((nx, ny))
+    return contactos
+
+
+def obstaculos_adyacentes(mundo, path, meta, n):
+    """Obstáculos vecinos al camino, sin repetir, en el orden en que la abeja los va a tocar."""
+    return list(dict.fromkeys(contactos_en_camino(mundo, path, meta, n)))
@@ -0,0 +1,286 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+# Capa de dibujo de la cuadrícula: la parte estática (celdas, obstáculos, inicio y
+# meta) se pinta una vez en una Surface fuera de pantalla, los textos renderizados se
+# reutilizan y en cada frame solo se envían a la pantalla los rectángulos que cambiaron.
+
+# Textos renderizados que se guardan (los contadores cambian poco entre frames)
+MAX_TEXTOS = 512
+
+
+def superficie_cuadricula(mundo, cell_size, colores, borde):
+    """Surface con todas las celdas pintadas (color por código de celda y borde de 1 px).
+
+    Se arma con numpy de una sola vez, sin una llamada a pygame por celda.
+    """
+    n_filas, n_cols = mundo.shape
+    tabla = np.zeros((256, 3), dtype=np.uint8)
+    for codigo, color in colores.items():
+        tabla[codigo] = color
+
+    pixeles = tabla[mundo]                                     # (filas, cols, 3)
+    pixeles = np.repeat(np.repeat(pixeles, cell_size, axis=0), cell_size, axis=1)
+
+    # Cada celda lleva su propio borde, igual que pygame.draw.rect(..., 1)
+    local = np.arange(n_filas * cell_size) % cell_size
+    filas_borde = (local == 0) | (local == cell_size - 1)
+    local = np.arange(n_cols * cell_size) % cell_size
+    cols_borde = (local == 0) | (local == cell_size - 1)
+    pixeles[filas_borde, :] = borde
+    pixeles[:, cols_borde] = borde
+
+    # surfarray usa (x, y): columnas primero
+    return pygame.surfarray.make_surface(np.ascontiguousarray(pixeles.transpose(1, 0, 2)))
+
+
+def pintar_celda(superficie, pos, cell_size, color, borde):
+    """Repinta una sola celda de la superficie estática (p. ej. al mover el inicio)."""
+    fila, col = pos
+    rect = pygame.Rect(col * cell_size, fila * cell_size, cell_size, cell_size)
+    pygame.draw.rect(superficie, color, rect)
+    pygame.draw.rect(superficie, borde, rect, 1)
+    return rect
+
+
+class CacheTextos:
+    """Fuentes y textos ya renderizados, por (texto, color, tamaño)."""
+
+    def __init__(self, max_textos=MAX_TEXTOS):
+        self.max_textos = max_textos
+        self._fuentes = {}
+        self._textos = OrderedDict()
+
+    def fuente(self, tamano):
+        if tamano not in self._fuentes:
+            self._fuentes[tamano] = pygame.font.Font(None, tamano)
+        return self._fuentes[tamano]
+
+    def render(self, texto, color, tamano=25):
+        clave = (texto, color, tamano)
+        imagen = self._textos.get(clave)
+        if imagen is None:
+            imagen = self.fuente(tamano).render(texto, True, color)
+            self._textos[clave] = imagen
+            if len(self._textos) > self.max_textos:
+                self._textos.popitem(last=False)
+        else:
+            self._textos.move_to_end(clave)
+        return imagen
+
+
+# Caché compartida por todas las pantallas (pygame.font necesita pygame.init())
+textos = CacheTextos()
+
+
+class RegionesSucias:
+    """Rectángulos de pantalla que cambiaron desde el último update."""
+
+    def __init__(self):
+        self.rects = []
+
+    def marcar(self, rect):
+        if rect is not None and rect.width and rect.height:
+            self.rects.append(pygame.Rect(rect))
+
+    def actualizar(self):
+        if self.rects:
+            pygame.display.update(self.rects)
+            self.rects = []
+
+
+class PanelTexto:
+    """Líneas de texto en posiciones fijas; solo se repintan las que cambian."""
+
+    def __init__(self, screen, fondo, sucias):
+        self.screen = screen
+        self.fondo = fondo
+        self.sucias = sucias
+        self._lineas = {}   # clave -> (imagen, rect)
+
+    def escribir(self, clave, imagen, pos):
+        anterior = self._lineas.get(clave)
+        if anterior is not None and anterior[0] is imagen and anterior[1].topleft == tuple(pos):
+            return
+        if anterior is not None:
+            self.screen.fill(self.fondo, anterior[1])
+            self.sucias.marcar(anterior[1])
+        rect = self.screen.blit(imagen, pos)
+        self.sucias.marcar(rect)
+        self._lineas[clave] = (imagen, rect)
+
+    def olvidar(self):
+        """Tras limpiar la zona a mano: la próxima escritura de cada línea se vuelve a pintar."""
+        self._lineas = {}
+
+
+# Por debajo de estos píxeles por celda se dibuja la vista general (1 píxel por celda, escalada)
+UMBRAL_VISTA_GENERAL = 4
+
+# Límites del zoom, en píxeles por celda
+ZOOM_MINIMO = 0.05
+ZOOM_MAXIMO = 64
+
+# Factor de cada paso de la rueda del mouse y píxeles de cada paso con las flechas
+PASO_ZOOM = 1.25
+PASO_PANEO = 40
+
+
+def superficie_general(mundo, colores):
+    """Vista general: un píxel por celda, sin bordes."""
+    tabla = np.zeros((256, 3), dtype=np.uint8)
+    for codigo, color in colores.items():
+        tabla[codigo] = color
+    return pygame.surfarray.make_surface(np.ascontiguousarray(tabla[mundo].transpose(1, 0, 2)))
+
+
+class Camara:
+    """Ventana de ancho x alto píxeles sobre la cuadrícula, con paneo, zoom y seguimiento.
+
+    Solo se dibujan las celdas visibles: con celdas grandes se arma el trozo visible con
+    superficie_cuadricula; con el zoom muy alejado se escala la vista general (un píxel
+    por celda, construida una vez con surfarray). El costo por frame depende del tamaño
+    de la ventana, no del mundo.
+    """
+
+    def __init__(self, n_filas, n_cols, ancho, alto, tam_celda):
+        self.n_filas = n_filas
+        self.n_cols = n_cols
+        self.ancho = ancho
+        self.alto = alto
+        self.fila0 = 0.0   # celda (fraccionaria) en la esquina superior izquierda
+        self.col0 = 0.0
+        # Si el mundo no entra en la ventana se empieza viéndolo entero
+        if max(n_filas, n_cols) * tam_celda > max(ancho, alto):
+            tam_celda = min(ancho / n_cols, alto / n_filas)
+        self.tam = self._ajustar_tam(tam_celda)
+        self.version = 0            # sube cada vez que cambia una celda del mundo
+        self._general = None
+        self._vista = None
+        self._clave_vista = None
+        self._arrastre = None       # último punto del arrastre con el botón central
+
+    def _ajustar_tam(self, tam):
+        tam = max(ZOOM_MINIMO, min(ZOOM_MAXIMO, tam))
+        # Con celdas dibujadas una a una el tamaño es entero (los bordes quedan parejos)
+        return float(round(tam)) if tam >= UMBRAL_VISTA_GENERAL else tam
+
+    def _limitar(self):
+        # Sin salirse del mundo (si el mundo es más chico que la ventana, queda arriba a la izquierda)
+        self.col0 = max(0.0, min(self.col0, self.n_cols - self.ancho / self.tam))
+        self.fila0 = max(0.0, min(self.fila0, self.n_filas - self.alto / self.tam))
+
+    def a_pantalla(self, pos):
+        """Esquina superior izquierda de la celda, en píxeles relativos a la ventana."""
+        fila, col = pos
+        return (int(round((col - self.col0) * self.tam)), int(round((fila - self.fila0) * self.tam)))
+
+    def celda_en(self, x, y):
+        """Celda bajo el punto (x, y) relativo a la ventana, o None si cae fuera del mundo."""
+        if not (0 <= x < self.ancho and 0 <= y < self.alto):
+            return None
+        fila = int(self.fila0 + y / self.tam)
+        col = int(self.col0 + x / self.tam)
+        if 0 <= fila < self.n_filas and 0 <= col < self.n_cols:
+            return fila, col
+        return None
+
+    def mover(self, dx, dy):
+        """Panea dx, dy píxeles de pantalla; devuelve True si la cámara se movió."""
+        antes = (self.fila0, self.col0)
+        self.col0 += dx / self.tam
+        self.fila0 += dy / self.tam
+        self._limitar()
+        return (self.fila0, self.col0) != antes
+
+    def zoom(self, factor, x=None, y=None):
+        """Acerca o aleja manteniendo fijo el punto (x, y) de la ventana (por defecto, el centro)."""
+        x = self.ancho / 2 if x is None else x
+        y = self.alto / 2 if y is None else y
+        fila = self.fila0 + y / self.tam
+        col = self.col0 + x / self.tam
+        tam = self._ajustar_tam(self.tam * factor)
+        if tam == self.tam:
+            return False
+        self.tam = tam
+        self.col0 = col - x / tam
+        self.fila0 = fila - y / tam
+        self._limitar()
+        return True
+
+    def seguir(self, pos):
+        """Centra la cámara en la celda (si la ventana ya muestra todo el mundo no se mueve)."""
+        antes = (self.fila0, self.col0)
+        self.fila0 = pos[0] + 0.5 - self.alto / (2 * self.tam)
+        self.col0 = pos[1] + 0.5 - self.ancho / (2 * self.tam)
+        self._limitar()
+        return (self.fila0, self.col0) != antes
+
+    def manejar_evento(self, event, x0, y0):
+        """Rueda = zoom, botón central = arrastrar, flechas = panear. True si la cámara cambió."""
+        if event.type == pygame.MOUSEWHEEL:
+            mx, my = pygame.mouse.get_pos()
+            return self.zoom(PASO_ZOOM ** event.y, mx - x0, my - y0)
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 2:
+            self._arrastre = event.pos
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+            self._arrastre = None
+        elif event.type == pygame.MOUSEMOTION and self._arrastre is not None:
+            dx = self._arrastre[0] - event.pos[0]
+            dy = self._arrastre[1] - event.pos[1]
+            self._arrastre = event.pos
+            return self.mover(dx, dy)
+        elif event.type == pygame.KEYDOWN:
+            pasos = {pygame.K_LEFT: (-PASO_PANEO, 0), pygame.K_RIGHT: (PASO_PANEO, 0),
+                     pygame.K_UP: (0, -PASO_PANEO), pygame.K_DOWN: (0, PASO_PANEO)}
+            if event.key in pasos:
+                return self.mover(*pasos[event.key])
+            if event.key in (pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_EQUALS):
+                return self.zoom(PASO_ZOOM)
+            if event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                return self.zoom(1 / PASO_ZOOM)
+        return False
+
+    def arrastrando(self):
+        return self._arrastre is not None
+
+    def cambio_celda(self, pos, color):
+        """Avisa que una celda del mundo cambió de color (p. ej. al elegir inicio o meta)."""
+        if self._general is not None:
+            self._general.set_at((pos[1], pos[0]), color)
+        self.version += 1
+
+    def vista(self, mundo, colores, borde, fondo=(255, 255, 255)):
+        """Surface de ancho x alto con lo visible; devuelve (superficie, True si se volvió a dibujar)."""
+        clave = (self.tam, self.fila0, self.col0, self.version)
+        if clave == self._clave_vista:
+            return self._vista, False
+
+        if self._vista is None:
+            self._vista = pygame.Surface((self.ancho, self.alto))
+        self._vista.fill(fondo)
+
+        if self.tam >= UMBRAL_VISTA_GENERAL:
+            # Solo las celdas visibles, con sus bordes
+            t = int(self.tam)
+            f_ini, c_ini = int(self.fila0), int(self.col0)
+            f_fin = min(self.n_filas, int(np.ceil(self.fila0 + self.alto / t)) + 1)
+            c_fin = min(self.n_cols, int(np.ceil(self.col0 + self.ancho / t)) + 1)
+            trozo = superficie_cuadricula(mundo[f_ini:f_fin, c_ini:c_fin], t, colores, borde)
+            self._vista.blit(trozo, self.a_pantalla((f_ini, c_ini)))
+        else:
+            # Vista general: un píxel por celda, escalado al zoom actual
+            if self._general is None:
+                self._general = superficie_general(mundo, colores)
+            visibles = pygame.Rect(int(self.col0), int(self.fila0),
+                                   int(np.ceil(self.ancho / self.tam)) + 1,
+                                   int(np.ceil(self.alto / self.tam)) + 1).clip(self._general.get_rect())
+            escalada = pygame.transform.scale(
+                self._general.subsurface(visibles),
+                (max(1, int(round(visibles.width * self.tam))), max(1, int(round(visibles.height * self.tam)))))
+            self._vista.blit(escalada, self.a_pantalla((visibles.y, visibles.x)))
+
+        self._clave_vista = clave
+        return self._vista, True
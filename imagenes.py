@@ -0,0 +1,49 @@
+import os
+import random
+
+from cuadricula import posiciones_obstaculos
+
+# Extensiones de imagen que se buscan en las carpetas del dataset
+EXTENSIONES_IMAGEN = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+
+def cargar_imagenes_de_carpeta(folder_name):
+    base_dir = os.path.join(os.path.dirname(__file__), folder_name)
+    if not os.path.isdir(base_dir):
+        raise FileNotFoundError(f"Carpeta no encontrada: {base_dir}")
+    archivos = [os.path.join(base_dir, f) for f in os.listdir(base_dir)
+                if f.lower().endswith(EXTENSIONES_IMAGEN)]
+    if not archivos:
+        raise FileNotFoundError(f"No se encontraron imágenes en {base_dir}")
+    return archivos
+
+
+def cargar_imagenes_dataset(carpetas=('imagenes_sub', 'imagenes_sobre')):
+    """Rutas de todas las imágenes; si el paquete del dataset está al día se toman de su índice."""
+    from paquete_imagenes import abrir_paquete
+    paquete = abrir_paquete()
+    if paquete is not None:
+        rutas = [ruta for ruta in paquete.rutas() if os.path.basename(os.path.dirname(ruta)) in carpetas]
+        if rutas:
+            return rutas
+    archivos = []
+    for carpeta in carpetas:
+        archivos.extend(cargar_imagenes_de_carpeta(carpeta))
+    return archivos
+
+def asignar_imagenes_a_obstaculos(mundo, image_list):
+    """{posición: ruta}; image_list es una lista de rutas o un IndiceImagenes (sus imágenes actuales)."""
+    if hasattr(image_list, "rutas"):
+        image_list = image_list.rutas()
+    mapping = {}
+    if not image_list:
+        return mapping
+    obstaculos = posiciones_obstaculos(mundo)
+    
+    # Mezclar aleatoriamente la lista de imágenes
+    random.shuffle(image_list)
+    
+    # Si hay menos imágenes que obstáculos, se repetirán algunas
+    for i, pos in enumerate(obstaculos):
+        mapping[pos] = image_list[i % len(image_list)]
+    return mapping
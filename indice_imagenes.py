@@ -0,0 +1,325 @@
+import argparse
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+
+from imagenes import EXTENSIONES_IMAGEN
+
+# Índice vivo de las imágenes del dataset: las carpetas se recorren una sola vez y
+# después un vigilante (inotify en Linux, o sondeo periódico) avisa qué archivos se
+# agregaron, cambiaron o se borraron. Solo esos se vuelven a hashear, preprocesar y
+# clasificar, así que una sesión larga toma datos nuevos con un costo proporcional
+# al cambio y no al tamaño del dataset.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CARPETAS = ("imagenes_sub", "imagenes_sobre")
+
+# Segundos entre recorridos cuando no hay inotify
+INTERVALO_SONDEO = 2.0
+
+# Tras el primer evento se esperan los que sigan durante esta ventana y se aplican juntos
+VENTANA_EVENTOS = 0.2
+
+# Eventos de inotify que interesan (ver <sys/inotify.h>)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+EVENTO_INOTIFY = struct.Struct("iIII")
+
+
+def _es_imagen(nombre):
+    return nombre.lower().endswith(EXTENSIONES_IMAGEN)
+
+
+def _firma(ruta):
+    """(mtime_ns, tamaño) del archivo, o None si ya no existe."""
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class IndiceImagenes:
+    """Imágenes actuales de las carpetas con su hash, hash perceptual y (opcional) clasificación.
+
+    Cada entrada es {"firma", "hash", "phash", "clasificacion"}. Los cambios se aplican
+    por ruta y también invalidan lo que el resto del programa tenía calculado para esa
+    ruta (caché de preprocesamiento, resultados de la sesión del clasificador y grupos
+    de variantes). `version` sube con cada lote de cambios.
+    """
+
+    def __init__(self, carpetas=CARPETAS, base_dir=BASE_DIR, clasificar=False, candidate_labels=None):
+        self.directorios = [os.path.join(base_dir, c) for c in carpetas]
+        self.clasificar = clasificar
+        self.candidate_labels = candidate_labels
+        self.entradas = {}
+        self.version = 0
+        self._lock = threading.RLock()
+        self._cambios = queue.Queue()   # lotes aplicados que todavía no recogió nadie
+        self._vigilante = None
+
+    # --- Consultas ---
+
+    def rutas(self):
+        """Lista (copia) de las imágenes actuales, en orden estable."""
+        with self._lock:
+            return sorted(self.entradas)
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def clasificaciones(self):
+        """{ruta: resultado} de las imágenes ya clasificadas."""
+        with self._lock:
+            return {r: e["clasificacion"] for r, e in self.entradas.items() if e["clasificacion"] is not None}
+
+    def recoger_cambios(self):
+        """Lotes aplicados desde la última llamada, juntos en {"agregadas", "actualizadas", "quitadas"} (no bloquea)."""
+        juntos = {"agregadas": [], "actualizadas": [], "quitadas": []}
+        while True:
+            try:
+                lote = self._cambios.get_nowait()
+            except queue.Empty:
+                return juntos
+            for tipo, rutas in lote.items():
+                juntos[tipo].extend(rutas)
+
+    # --- Cambios ---
+
+    def escanear(self):
+        """Recorre las carpetas y aplica las diferencias con el índice (solo stat para lo que no cambió)."""
+        vistas = {}
+        for directorio in self.directorios:
+            if not os.path.isdir(directorio):
+                continue
+            with os.scandir(directorio) as it:
+                for archivo in it:
+                    if _es_imagen(archivo.name) and archivo.is_file():
+                        st = archivo.stat()
+                        vistas[archivo.path] = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            agregadas = [r for r in vistas if r not in self.entradas]
+            actualizadas = [r for r, firma in vistas.items()
+                            if r in self.entradas and self.entradas[r]["firma"] != firma]
+            quitadas = [r for r in self.entradas if r not in vistas]
+        return self._aplicar(agregadas, actualizadas, quitadas, vistas)
+
+    def revisar(self, rutas):
+        """Vuelve a mirar solo esas rutas (lo que avisó inotify)."""
+        firmas = {}
+        agregadas, actualizadas, quitadas = [], [], []
+        with self._lock:
+            for ruta in dict.fromkeys(rutas):
+                firma = _firma(ruta)
+                if firma is None:
+                    if ruta in self.entradas:
+                        quitadas.append(ruta)
+                elif ruta not in self.entradas:
+                    agregadas.append(ruta)
+                elif self.entradas[ruta]["firma"] != firma:
+                    actualizadas.append(ruta)
+                firmas[ruta] = firma
+        return self._aplicar(agregadas, actualizadas, quitadas, firmas)
+
+    def _aplicar(self, agregadas, actualizadas, quitadas, firmas):
+        if not (agregadas or actualizadas or quitadas):
+            return {"agregadas": [], "actualizadas": [], "quitadas": []}
+        from cache_embeddings import hash_contenido
+        from clasificador import olvidar_resultados
+        import preprocesamiento
+        import variantes
+
+        # Lo calculado para una ruta que cambió o ya no está deja de valer
+        viejas = actualizadas + quitadas
+        if viejas:
+            preprocesamiento.cache.olvidar(viejas)
+            olvidar_resultados(viejas)
+            variantes.olvidar(viejas)
+
+        # Hash del contenido y hash perceptual del CLAHE. Las agregadas pueden salir del
+        # paquete del dataset si está al día; las que cambiaron en el lugar no (el paquete
+        # solo mira la fecha de las carpetas), así que se vuelven a leer
+        phashes = variantes.hashes_perceptuales(agregadas)
+        for ruta in actualizadas:
+            clahe = preprocesamiento.aplicar_clahe(ruta)
+            if clahe is not None:
+                phashes[ruta] = variantes.hash_perceptual(clahe)
+        nuevas = {}
+        for ruta in agregadas + actualizadas:
+            try:
+                contenido = hash_contenido(ruta)
+            except OSError:
+                continue   # se borró mientras tanto: el próximo evento lo saca
+            nuevas[ruta] = {"firma": firmas[ruta], "hash": contenido, "phash": phashes.get(ruta),
+                            "clasificacion": None}
+
+        if self.clasificar and nuevas:
+            from servidor_clasificacion import clasificar
+            for ruta, resultado in clasificar(list(nuevas), self.candidate_labels).items():
+                nuevas[ruta]["clasificacion"] = resultado
+
+        with self._lock:
+            for ruta in quitadas:
+                self.entradas.pop(ruta, None)
+            self.entradas.update(nuevas)
+            self.version += 1
+        cambios = {"agregadas": [r for r in agregadas if r in nuevas],
+                   "actualizadas": [r for r in actualizadas if r in nuevas],
+                   "quitadas": quitadas}
+        self._cambios.put(cambios)
+        return cambios
+
+    # --- Vigilancia ---
+
+    def vigilar(self, sondeo=False, intervalo=INTERVALO_SONDEO):
+        """Arranca el hilo que sigue los cambios (inotify si se puede, si no sondeo)."""
+        if self._vigilante is None:
+            self._vigilante = Vigilante(self, sondeo, intervalo)
+            self._vigilante.iniciar()
+        return self._vigilante
+
+    def detener(self):
+        if self._vigilante is not None:
+            self._vigilante.detener()
+            self._vigilante = None
+
+
+def _abrir_inotify(directorios):
+    """Descriptor de inotify vigilando los directorios, o None si el sistema no lo tiene."""
+    if not sys.platform.startswith("linux"):
+        return None
+    import ctypes
+    import ctypes.util
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    vigilados = {}
+    mascara = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+    for directorio in directorios:
+        if os.path.isdir(directorio):
+            wd = libc.inotify_add_watch(fd, os.fsencode(directorio), mascara)
+            if wd >= 0:
+                vigilados[wd] = directorio
+    if not vigilados:
+        os.close(fd)
+        return None
+    return fd, vigilados
+
+
+class Vigilante:
+    """Hilo que aplica al índice los cambios de las carpetas."""
+
+    def __init__(self, indice, sondeo=False, intervalo=INTERVALO_SONDEO):
+        self.indice = indice
+        self.intervalo = intervalo
+        self._inotify = None if sondeo else _abrir_inotify(indice.directorios)
+        self.modo = "inotify" if self._inotify else "sondeo"
+        self._detenido = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._correr, name="vigilante_imagenes", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detenido.set()
+        if self._hilo is not None:
+            self._hilo.join()
+        if self._inotify is not None:
+            os.close(self._inotify[0])
+            self._inotify = None
+
+    def _correr(self):
+        while not self._detenido.is_set():
+            try:
+                if self._inotify is None:
+                    self._detenido.wait(self.intervalo)
+                    if not self._detenido.is_set():
+                        self.indice.escanear()
+                else:
+                    self._esperar_eventos()
+            except Exception as e:
+                # El vigilante no debe caerse por un archivo raro: se avisa y se sigue
+                print("Aviso: error aplicando cambios de imágenes:", e)
+
+    def _leer_eventos(self, timeout):
+        """Rutas tocadas según inotify (None si hay que recorrer todo por desborde de la cola)."""
+        fd, vigilados = self._inotify
+        listos, _, _ = select.select([fd], [], [], timeout)
+        if not listos:
+            return []
+        try:
+            datos = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        rutas = []
+        posicion = 0
+        while posicion + EVENTO_INOTIFY.size <= len(datos):
+            wd, mascara, _, largo = EVENTO_INOTIFY.unpack_from(datos, posicion)
+            posicion += EVENTO_INOTIFY.size
+            nombre = os.fsdecode(datos[posicion:posicion + largo].rstrip(b"\0"))
+            posicion += largo
+            if mascara & IN_Q_OVERFLOW:
+                return None
+            if wd in vigilados and _es_imagen(nombre):
+                rutas.append(os.path.join(vigilados[wd], nombre))
+        return rutas
+
+    def _esperar_eventos(self):
+        rutas = self._leer_eventos(0.5)
+        if rutas is None:
+            self.indice.escanear()
+            return
+        if not rutas:
+            return
+        # Copias de muchos archivos llegan como una ráfaga: se juntan en un solo lote
+        limite = time.perf_counter() + VENTANA_EVENTOS
+        while (resto := limite - time.perf_counter()) > 0:
+            mas = self._leer_eventos(resto)
+            if mas is None:
+                self.indice.escanear()
+                return
+            rutas.extend(mas)
+        self.indice.revisar(rutas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de imágenes del dataset que se actualiza solo")
+    parser.add_argument("--clasificar", action="store_true", help="clasificar también las imágenes nuevas")
+    parser.add_argument("--sondeo", action="store_true", help="recorrer las carpetas cada tanto en vez de usar inotify")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_SONDEO)
+    args = parser.parse_args()
+
+    indice = IndiceImagenes(clasificar=args.clasificar)
+    t0 = time.perf_counter()
+    indice.escanear()
+    print(f"{len(indice)} imágenes indexadas en {time.perf_counter() - t0:.2f}s")
+    vigilante = indice.vigilar(args.sondeo, args.intervalo)
+    indice.recoger_cambios()
+    print(f"Vigilando las carpetas ({vigilante.modo}); Ctrl+C para salir")
+    try:
+        while True:
+            time.sleep(0.5)
+            cambios = indice.recoger_cambios()
+            if any(cambios.values()):
+                print(", ".join(f"{len(rutas)} {tipo}" for tipo, rutas in cambios.items())
+                      + f" -> {len(indice)} imágenes (versión {indice.version})")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        indice.detener()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import hashlib
+from array import array
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from cuadricula import celdas_bloqueadas
+from busqueda import _orden_expansion, registrar_estrategia, vecinos_planos
+
+# Precálculos por mundo: componentes conexas (¿la meta es alcanzable? en O(1)) y
+# campos de distancias BFS por meta, para responder muchas consultas inicio/meta
+# sobre el mismo mapa sin volver a buscar.
+
+# Campos de distancias que se guardan por mundo (cada uno ocupa 4 bytes por celda)
+MAX_CAMPOS = 16
+
+# Índices que se guardan, uno por contenido de mundo distinto
+MAX_INDICES = 4
+
+
+class IndiceMundo:
+    """Componentes conexas y campos de distancias de un mundo (solo importan los obstáculos)."""
+
+    def __init__(self, mundo):
+        self.n = mundo.shape[0]
+        self.bloqueado = bytearray(celdas_bloqueadas(mundo))
+        self._componentes = None
+        self.campos = OrderedDict()  # celda meta (índice plano) -> array de distancias
+
+    def componentes(self):
+        """Etiqueta de componente por celda (0 = obstáculo), calculada una vez."""
+        if self._componentes is None:
+            import cv2
+            libres = (np.frombuffer(bytes(self.bloqueado), dtype=np.uint8) == 0).astype(np.uint8)
+            _, etiquetas = cv2.connectedComponents(libres.reshape(self.n, self.n), connectivity=4)
+            self._componentes = etiquetas.ravel()
+        return self._componentes
+
+    def alcanzable(self, inicio, meta):
+        """True si inicio y meta están libres y en la misma componente."""
+        etiquetas = self.componentes()
+        a = inicio[0] * self.n + inicio[1]
+        b = meta[0] * self.n + meta[1]
+        return etiquetas[a] != 0 and etiquetas[a] == etiquetas[b]
+
+    def campo_distancias(self, meta):
+        """Distancias BFS desde cada celda hasta la meta (-1 si no llega); se guarda en caché."""
+        destino = meta[0] * self.n + meta[1]
+        if destino in self.campos:
+            self.campos.move_to_end(destino)
+            return self.campos[destino]
+
+        n = self.n
+        bloqueado = self.bloqueado
+        distancias = array("i", [-1]) * (n * n)
+        distancias[destino] = 0
+        cola = deque([destino])
+        while cola:
+            actual = cola.popleft()
+            siguiente = distancias[actual] + 1
+            for vecino in vecinos_planos(actual, n):
+                if not bloqueado[vecino] and distancias[vecino] == -1:
+                    distancias[vecino] = siguiente
+                    cola.append(vecino)
+
+        self.campos[destino] = distancias
+        if len(self.campos) > MAX_CAMPOS:
+            self.campos.popitem(last=False)
+        return distancias
+
+    def distancia(self, inicio, meta):
+        if not self.alcanzable(inicio, meta):
+            return None
+        return self.campo_distancias(meta)[inicio[0] * self.n + inicio[1]]
+
+    def camino(self, inicio, meta):
+        """Camino más corto bajando por el campo de distancias, sin volver a buscar."""
+        if not self.alcanzable(inicio, meta):
+            return None
+        n = self.n
+        distancias = self.campo_distancias(meta)
+        actual = inicio[0] * n + inicio[1]
+        camino = [divmod(actual, n)]
+        while distancias[actual] > 0:
+            # Mismo orden de vecinos que bfs: abajo, arriba, derecha, izquierda
+            for vecino in vecinos_planos(actual, n):
+                if distancias[vecino] == distancias[actual] - 1:
+                    actual = vecino
+                    break
+            camino.append(divmod(actual, n))
+        return camino
+
+    def cambiar_celda(self, pos, bloqueada):
+        """Marca una celda como obstáculo o libre e invalida solo lo que ese cambio afecta.
+
+        Si el índice está guardado en caché pasa a la clave del mapa nuevo.
+        """
+        celda = pos[0] * self.n + pos[1]
+        if bool(self.bloqueado[celda]) == bool(bloqueada):
+            return
+        anterior = _clave(self.n, self.bloqueado)
+        self.bloqueado[celda] = 1 if bloqueada else 0
+        self._componentes = None
+        if _indices.get(anterior) is self:
+            del _indices[anterior]
+            _indices[_clave(self.n, self.bloqueado)] = self
+
+        # Un campo sigue valiendo si la celda nueva queda fuera de su región alcanzable
+        for destino, distancias in list(self.campos.items()):
+            if bloqueada:
+                afectado = distancias[celda] != -1
+            else:
+                afectado = any(distancias[v] != -1 for v in vecinos_planos(celda, self.n))
+            if afectado:
+                del self.campos[destino]
+
+
+# Índices ya construidos, por contenido del mundo (las copias con S/G comparten índice)
+_indices = OrderedDict()
+
+
+def _clave(n, bloqueado):
+    return n, hashlib.sha1(bloqueado).hexdigest()
+
+
+def indice_de(mundo):
+    """Devuelve el IndiceMundo de este mapa, reutilizándolo si los obstáculos no cambiaron."""
+    clave = _clave(mundo.shape[0], celdas_bloqueadas(mundo))
+    if clave in _indices:
+        _indices.move_to_end(clave)
+        return _indices[clave]
+    indice = IndiceMundo(mundo)
+    _indices[clave] = indice
+    if len(_indices) > MAX_INDICES:
+        _indices.popitem(last=False)
+    return indice
+
+
+def cambiar_celda(mundo, pos, bloqueada):
+    """Aplica el cambio de una celda al índice guardado de `mundo` (antes de modificarlo).
+
+    Así el mapa modificado no se vuelve a indexar desde cero; si no había índice no hace nada.
+    """
+    indice = _indices.get(_clave(mundo.shape[0], celdas_bloqueadas(mundo)))
+    if indice is not None:
+        indice.cambiar_celda(pos, bloqueada)
+
+
+# Camino más corto leído del campo de distancias cacheado de la meta
+@registrar_estrategia("BFS-Campo")
+def bfs_campo(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    indice = indice_de(mundo)
+    campo_nuevo = (meta[0] * n + meta[1]) not in indice.campos
+    camino = indice.camino(inicio, meta)
+
+    # Los contactos se cuentan en las celdas por las que baja el camino
+    obstaculos_detectados = 0
+    for x, y in camino or []:
+        for vecino in vecinos_planos(x * n + y, n):
+            if indice.bloqueado[vecino]:
+                if verbose:
+                    print(f"🚧Obstáculo encontrado en {divmod(vecino, n)}")
+                obstaculos_detectados += 1
+
+    if estadisticas is not None:
+        expandidos = len(camino) if camino else 0
+        if campo_nuevo and camino is not None:
+            expandidos += sum(1 for d in indice.campos[meta[0] * n + meta[1]] if d != -1)
+        estadisticas["nodos_expandidos"] = expandidos
+        orden = _orden_expansion(estadisticas)
+        if orden is not None and camino:
+            # El campo se calcula por capas fuera de la búsqueda: lo que se recorre es el camino
+            orden.extend(x * n + y for x, y in camino)
+    return camino, obstaculos_detectados
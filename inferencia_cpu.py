@@ -0,0 +1,138 @@
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+# Backend de inferencia en CPU para CLIP (no hay GPU): hilos de torch explícitos,
+# torch.inference_mode y cuantización dinámica int8 opcional de los codificadores
+# visual y de texto, con una verificación de que las etiquetas coinciden con fp32.
+# torch se importa dentro de las funciones, igual que en clasificador.py.
+
+# Hilos intra-op (None = lo que decida torch). ABEJITA_HILOS=4
+HILOS = int(os.environ["ABEJITA_HILOS"]) if os.environ.get("ABEJITA_HILOS") else None
+
+# Hilos inter-op; solo se pueden fijar antes de que torch haga trabajo en paralelo. ABEJITA_HILOS_INTER=1
+HILOS_INTER = int(os.environ["ABEJITA_HILOS_INTER"]) if os.environ.get("ABEJITA_HILOS_INTER") else None
+
+# Cuantización dinámica int8 de las capas lineales de ambos codificadores. ABEJITA_INT8=1
+INT8 = os.environ.get("ABEJITA_INT8") == "1"
+
+
+def configurar_hilos(hilos=HILOS, hilos_inter=HILOS_INTER):
+    """Fija los hilos de torch (afecta a todo el proceso) y devuelve los que quedaron."""
+    import torch
+    if hilos:
+        torch.set_num_threads(hilos)
+    if hilos_inter and torch.get_num_interop_threads() != hilos_inter:
+        try:
+            torch.set_num_interop_threads(hilos_inter)
+        except RuntimeError as e:
+            # torch no deja cambiarlos una vez que arrancó el pool inter-op
+            print("Aviso: no se pudieron fijar los hilos inter-op:", e)
+    return torch.get_num_threads(), torch.get_num_interop_threads()
+
+
+def cuantizar_int8(model):
+    """Cuantiza en el lugar las nn.Linear de los codificadores visual y de texto (pesos int8).
+
+    Las proyecciones finales y logit_scale quedan en fp32: son pocas y definen la
+    escala de la similitud.
+    """
+    import torch
+    from torch.ao.quantization import quantize_dynamic
+    with warnings.catch_warnings():
+        # torch.ao.quantization está marcado como obsoleto pero sigue siendo la vía sin dependencias extra
+        warnings.simplefilter("ignore")
+        for nombre in ("vision_model", "text_model"):
+            codificador = getattr(model, nombre, None)
+            if codificador is not None:
+                setattr(model, nombre, quantize_dynamic(codificador, {torch.nn.Linear}, dtype=torch.qint8))
+    return model
+
+
+def preparar_modelo(model, int8=INT8):
+    """Deja el modelo listo para inferencia en CPU (eval, fp32 y, si se pide, int8)."""
+    model.eval()
+    model.float()
+    if int8:
+        cuantizar_int8(model)
+    return model
+
+
+def comparar_con_fp32(rutas, model_name, candidate_labels=None, batch_size=16, hilos=HILOS):
+    """Clasifica `rutas` con el modelo en fp32 y en int8 y compara los resultados.
+
+    Devuelve la fracción de imágenes con la misma etiqueta, la diferencia media de
+    score y las imágenes por segundo de cada variante.
+    """
+    from PIL import Image
+    import clasificador
+
+    candidate_labels = candidate_labels or clasificador.CANDIDATE_LABELS
+    imagenes = []
+    for ruta in rutas:
+        clahe_img = clasificador.preprocesar_clahe(ruta)
+        if clahe_img is not None:
+            imagenes.append(Image.fromarray(clahe_img).convert("RGB"))
+
+    salidas = {}
+    for nombre, int8 in (("fp32", False), ("int8", True)):
+        proveedor = clasificador.ProveedorModelo(model_name, hilos=hilos, int8=int8)
+        emb_etiquetas = clasificador.codificar_etiquetas(candidate_labels, proveedor)
+        t0 = time.perf_counter()
+        emb = np.concatenate([clasificador.codificar_imagenes(imagenes[i:i + batch_size], proveedor)
+                              for i in range(0, len(imagenes), batch_size)])
+        duracion = time.perf_counter() - t0
+        probs = clasificador.puntuar(emb, emb_etiquetas, proveedor)
+        salidas[nombre] = (probs, len(imagenes) / duracion)
+
+    probs_fp32, velocidad_fp32 = salidas["fp32"]
+    probs_int8, velocidad_int8 = salidas["int8"]
+    etiquetas_fp32 = probs_fp32.argmax(axis=1)
+    etiquetas_int8 = probs_int8.argmax(axis=1)
+    filas = np.arange(len(etiquetas_fp32))
+    return {
+        "imagenes": len(imagenes),
+        "concordancia": float((etiquetas_fp32 == etiquetas_int8).mean()) if len(imagenes) else 1.0,
+        "diferencia_score": float(np.abs(probs_fp32[filas, etiquetas_fp32] - probs_int8[filas, etiquetas_fp32]).mean())
+        if len(imagenes) else 0.0,
+        "fp32_img_por_s": velocidad_fp32,
+        "int8_img_por_s": velocidad_int8,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la inferencia int8 con fp32 sobre las imágenes del dataset")
+    parser.add_argument("--modelo", default=None,
+                        help="modelo CLIP (por defecto, uno diminuto con pesos al azar construido en local)")
+    parser.add_argument("--hilos", type=int, default=HILOS)
+    parser.add_argument("--hilos-inter", type=int, default=HILOS_INTER)
+    parser.add_argument("--imagenes", type=int, default=None, help="usar solo las primeras N imágenes")
+    parser.add_argument("--minimo", type=float, default=0.95,
+                        help="concordancia mínima aceptada (sale con error si no se alcanza)")
+    args = parser.parse_args()
+
+    print("Hilos (intra, inter):", configurar_hilos(args.hilos, args.hilos_inter))
+    from imagenes import cargar_imagenes_dataset
+    rutas = sorted(cargar_imagenes_dataset())[:args.imagenes]
+
+    with tempfile.TemporaryDirectory() as directorio:
+        modelo = args.modelo
+        if modelo is None:
+            from benchmark import construir_clip_diminuto
+            modelo = construir_clip_diminuto(directorio)
+        datos = comparar_con_fp32(rutas, modelo, hilos=args.hilos)
+
+    print(f"{datos['imagenes']} imágenes: fp32 {datos['fp32_img_por_s']:.1f} img/s, "
+          f"int8 {datos['int8_img_por_s']:.1f} img/s")
+    print(f"Misma etiqueta que fp32: {datos['concordancia']:.1%} "
+          f"(diferencia media de score {datos['diferencia_score']:.4f})")
+    if datos["concordancia"] < args.minimo:
+        raise SystemExit(f"La concordancia con fp32 está por debajo de {args.minimo:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+import preprocesamiento
+from dibujo import textos
+from instrumentacion import etapa
+
+# Panel de inspección dentro de la ventana de pygame: muestra la imagen del obstáculo
+# (original, ecualización global y CLAHE) y la etiqueta del modelo sin detener a la
+# abeja. Reemplaza a la ventana modal de Tk que se abría en cada contacto.
+
+# Miniaturas ya convertidas a Surface que se guardan (3 por imagen)
+MAX_MINIATURAS = 64
+
+# Segundos mínimos que se muestra cada inspección antes de pasar a la siguiente
+TIEMPO_MINIMO = 1.2
+
+# Inspecciones en espera; si la abeja va más rápido, se descartan las más viejas
+MAX_PENDIENTES = 6
+
+TITULOS_VISTAS = ["Original", "Ecualización Global", "CLAHE (Adaptativa)"]
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+GRIS = (120, 120, 120)
+AZUL = (0, 0, 255)
+
+
+def preparar_vistas(image_path, max_w, max_h):
+    """Las tres miniaturas RGB (original, equalizeHist, CLAHE) como (bytes, (ancho, alto)).
+
+    Devuelve None si la imagen no se puede leer. Corre en un hilo de fondo y reutiliza
+    la caché de preprocesamiento (la imagen quizá ya la leyó el clasificador).
+    """
+    reducidas = preprocesamiento.miniaturas(image_path, max_w, max_h)
+    if reducidas is None:
+        return None
+    return [(arreglo.tobytes(), (arreglo.shape[1], arreglo.shape[0])) for arreglo in reducidas]
+
+
+class CacheMiniaturas:
+    """Miniaturas por imagen como Surfaces de pygame (LRU), preparadas en segundo plano."""
+
+    def __init__(self, max_imagenes=MAX_MINIATURAS):
+        self.max_imagenes = max_imagenes
+        self._superficies = OrderedDict()   # (ruta, max_w, max_h) -> [Surface x3] o None
+        self._pendientes = {}               # misma clave -> Future
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="miniaturas")
+
+    def pedir(self, image_path, max_w, max_h):
+        """Empieza a preparar las miniaturas si no están (no bloquea)."""
+        clave = (image_path, max_w, max_h)
+        if clave not in self._superficies and clave not in self._pendientes:
+            self._pendientes[clave] = self._executor.submit(preparar_vistas, image_path, max_w, max_h)
+
+    def obtener(self, image_path, max_w, max_h):
+        """Devuelve (listo, superficies): superficies es None si la imagen no se pudo leer."""
+        clave = (image_path, max_w, max_h)
+        if clave in self._superficies:
+            self._superficies.move_to_end(clave)
+            return True, self._superficies[clave]
+        self.pedir(image_path, max_w, max_h)
+        futuro = self._pendientes[clave]
+        if not futuro.done():
+            return False, None
+        del self._pendientes[clave]
+        try:
+            vistas = futuro.result()
+        except Exception as e:
+            print(f"No se pudo preparar la imagen {image_path}: {e}")
+            vistas = None
+
+        # Las Surfaces se crean en el hilo principal, a partir de los bytes ya listos
+        superficies = None
+        if vistas is not None:
+            with etapa("superficie_miniaturas"):
+                superficies = [pygame.image.frombuffer(datos, tam, "RGB").convert() for datos, tam in vistas]
+        self._superficies[clave] = superficies
+        if len(self._superficies) > self.max_imagenes:
+            self._superficies.popitem(last=False)
+        return True, superficies
+
+    def olvidar(self, rutas):
+        """Descarta las miniaturas de esas rutas (la imagen cambió en disco)."""
+        rutas = set(rutas)
+        for clave in [c for c in self._superficies if c[0] in rutas]:
+            del self._superficies[clave]
+
+
+# Caché compartida entre animaciones (las mismas imágenes se repiten)
+miniaturas = CacheMiniaturas()
+
+
+class PanelInspeccion:
+    """Zona de la ventana donde se van mostrando los obstáculos tocados, sin bloquear."""
+
+    def __init__(self, screen, rect, obtener_resultado, texto_resultado, sucias):
+        self.screen = screen
+        self.rect = pygame.Rect(rect)
+        self.obtener_resultado = obtener_resultado   # ruta -> resultado o None si aún no llega
+        self.texto_resultado = texto_resultado       # resultado -> texto de la etiqueta
+        self.sucias = sucias
+        self.pendientes = deque()
+        self.actual = None           # (posición del obstáculo, ruta)
+        self.desde = 0.0             # momento en que se empezó a mostrar la actual
+        self._dibujado = None        # lo último que se pintó, para no repintar igual
+
+        # Tres miniaturas en fila, con su título debajo
+        self.max_w = max(40, (self.rect.width - 40) // 3)
+        self.max_h = max(30, min(self.rect.height // 2, self.max_w * 3 // 4))
+
+    def encolar(self, pos, image_path):
+        self.pendientes.append((pos, image_path))
+        while len(self.pendientes) > MAX_PENDIENTES:
+            self.pendientes.popleft()
+        # Las miniaturas se van preparando mientras esperan su turno
+        miniaturas.pedir(image_path, self.max_w, self.max_h)
+
+    def actualizar(self):
+        """Pasa a la siguiente inspección si corresponde y repinta solo si algo cambió."""
+        ahora = time.perf_counter()
+        if self.pendientes and (self.actual is None or ahora - self.desde >= TIEMPO_MINIMO):
+            self.actual = self.pendientes.popleft()
+            self.desde = ahora
+        if self.actual is None:
+            return
+
+        pos, image_path = self.actual
+        listo, superficies = miniaturas.obtener(image_path, self.max_w, self.max_h)
+        texto = self.texto_resultado(self.obtener_resultado(image_path))
+        estado = (self.actual, listo, texto, len(self.pendientes))
+        if estado == self._dibujado:
+            return
+        self._dibujado = estado
+
+        with etapa("dibujar_inspeccion"):
+            self.screen.fill(WHITE, self.rect)
+            x0, y0 = self.rect.x + 10, self.rect.y + 20
+            self.screen.blit(textos.render(f"Obstáculo en {pos}", BLACK), (x0, y0))
+
+            y_img = y0 + 35
+            if not listo:
+                self.screen.blit(textos.render("Cargando imagen...", GRIS), (x0, y_img))
+            elif superficies is None:
+                self.screen.blit(textos.render("No se pudo cargar la imagen", GRIS), (x0, y_img))
+            else:
+                for k, (superficie, titulo) in enumerate(zip(superficies, TITULOS_VISTAS)):
+                    x = x0 + k * (self.max_w + 10)
+                    self.screen.blit(superficie, (x, y_img))
+                    self.screen.blit(textos.render(titulo, BLACK, 20), (x, y_img + self.max_h + 5))
+
+            # Resultado del modelo debajo (se actualiza solo cuando llega)
+            y_texto = y_img + self.max_h + 35
+            self.screen.blit(textos.render(texto, AZUL), (x0, y_texto))
+            if self.pendientes:
+                self.screen.blit(textos.render(f"En espera: {len(self.pendientes)}", GRIS, 20),
+                                 (x0, y_texto + 30))
+            self.sucias.marcar(self.rect)
@@ -0,0 +1,216 @@
+import atexit
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# Temporizadores y contadores por etapa (lectura, CLAHE, CLIP, dibujo, búsqueda...).
+# Desactivada, `etapa()` devuelve un contexto vacío compartido y `contar()` retorna
+# enseguida, así que se puede dejar en los caminos calientes.
+#
+# Se activa con variables de entorno (o con activar()):
+#   ABEJITA_PERFIL=1             resumen por etapa al salir
+#   ABEJITA_TRACE=trace.json     además, trace para chrome://tracing o Perfetto
+#   ABEJITA_CPROFILE=carpeta     un .prof de cProfile por episodio
+#   ABEJITA_TRACEMALLOC=1        memoria pico por episodio
+
+ACTIVA = False
+
+# Eventos que se guardan para el trace (los más nuevos se descartan al llenarse)
+MAX_EVENTOS = 200_000
+
+_lock = threading.Lock()
+_tiempos = {}       # nombre -> [llamadas, total, mínimo, máximo]
+_contadores = {}    # nombre -> valor
+_eventos = []       # (nombre, inicio, duración, hilo)
+_memoria = {}       # episodio -> bytes pico (tracemalloc)
+_config = {"trace": None, "cprofile": None, "tracemalloc": False}
+_T0 = time.perf_counter()
+
+
+class _Nulo:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _Nulo()
+
+
+def _registrar(nombre, inicio, duracion):
+    with _lock:
+        t = _tiempos.get(nombre)
+        if t is None:
+            _tiempos[nombre] = [1, duracion, duracion, duracion]
+        else:
+            t[0] += 1
+            t[1] += duracion
+            if duracion < t[2]:
+                t[2] = duracion
+            if duracion > t[3]:
+                t[3] = duracion
+        if _config["trace"] and len(_eventos) < MAX_EVENTOS:
+            _eventos.append((nombre, inicio, duracion, threading.get_ident()))
+
+
+class Cronometro:
+    """Mide una etapa siempre; solo la registra si la instrumentación está activa.
+
+    Sirve como contexto (`with Cronometro("busqueda") as c: ...; c.duracion`) o a mano
+    con iniciar()/transcurrido()/detener() cuando hace falta el tiempo parcial.
+    """
+    __slots__ = ("nombre", "inicio", "duracion")
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.inicio = None
+        self.duracion = None
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def transcurrido(self):
+        return time.perf_counter() - self.inicio
+
+    def detener(self):
+        self.duracion = time.perf_counter() - self.inicio
+        if ACTIVA:
+            _registrar(self.nombre, self.inicio, self.duracion)
+        return self.duracion
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+        return False
+
+
+def etapa(nombre):
+    """Contexto que mide `nombre` (no hace nada si la instrumentación está apagada)."""
+    if not ACTIVA:
+        return _NULO
+    return Cronometro(nombre)
+
+
+def contar(nombre, cantidad=1):
+    if not ACTIVA:
+        return
+    with _lock:
+        _contadores[nombre] = _contadores.get(nombre, 0) + cantidad
+
+
+class PerfilEpisodio:
+    """Etapa de un episodio completo, con cProfile y tracemalloc opcionales."""
+
+    _numero = 0
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self._cronometro = None
+        self._perfil = None
+        self._memoria = False
+
+    def __enter__(self):
+        if not ACTIVA:
+            return self
+        PerfilEpisodio._numero += 1
+        self.nombre = f"{self.nombre}_{PerfilEpisodio._numero}"
+        if _config["tracemalloc"] and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._memoria = True
+        if _config["cprofile"]:
+            self._perfil = cProfile.Profile()
+            self._perfil.enable()
+        self._cronometro = Cronometro(f"episodio {self.nombre}").iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        if self._cronometro is None:
+            return False
+        self._cronometro.detener()
+        if self._perfil is not None:
+            self._perfil.disable()
+            os.makedirs(_config["cprofile"], exist_ok=True)
+            self._perfil.dump_stats(os.path.join(_config["cprofile"], f"{self.nombre}.prof"))
+        if self._memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with _lock:
+                _memoria[self.nombre] = pico
+        return False
+
+
+def episodio(nombre):
+    """Contexto para un episodio: con ABEJITA_CPROFILE guarda <carpeta>/<nombre>_<k>.prof
+    y con ABEJITA_TRACEMALLOC anota su memoria pico en el resumen."""
+    return PerfilEpisodio(nombre)
+
+
+def activar(trace=None, cprofile=None, usar_tracemalloc=False):
+    global ACTIVA
+    _config.update(trace=trace, cprofile=cprofile, tracemalloc=usar_tracemalloc)
+    ACTIVA = True
+
+
+def tiempos():
+    """{etapa: {"llamadas", "total", "media", "min", "max"}} en segundos."""
+    with _lock:
+        return {nombre: {"llamadas": n, "total": total, "media": total / n, "min": minimo, "max": maximo}
+                for nombre, (n, total, minimo, maximo) in _tiempos.items()}
+
+
+def contadores():
+    with _lock:
+        return dict(_contadores)
+
+
+def resumen():
+    """Tabla de texto con las etapas ordenadas por tiempo total."""
+    lineas = [f"{'Etapa':<32} {'Llamadas':>9} {'Total (s)':>10} {'Media (ms)':>11} {'Máx (ms)':>10}"]
+    for nombre, t in sorted(tiempos().items(), key=lambda item: -item[1]["total"]):
+        lineas.append(f"{nombre:<32} {t['llamadas']:>9} {t['total']:>10.3f} "
+                      f"{t['media'] * 1000:>11.3f} {t['max'] * 1000:>10.3f}")
+    for nombre, valor in sorted(contadores().items()):
+        lineas.append(f"{nombre:<32} {valor:>9}")
+    for nombre, pico in _memoria.items():
+        lineas.append(f"{'memoria pico ' + nombre:<32} {pico / 1e6:>9.2f} MB")
+    return "\n".join(lineas)
+
+
+def exportar_trace(ruta):
+    """Escribe los eventos en formato Chrome trace (JSON, tiempos en microsegundos)."""
+    pid = os.getpid()
+    with _lock:
+        eventos = [{"name": nombre, "ph": "X", "pid": pid, "tid": hilo,
+                    "ts": (inicio - _T0) * 1e6, "dur": duracion * 1e6}
+                   for nombre, inicio, duracion, hilo in _eventos]
+        eventos += [{"name": nombre, "ph": "C", "pid": pid, "ts": (time.perf_counter() - _T0) * 1e6,
+                     "args": {"valor": valor}} for nombre, valor in _contadores.items()]
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f)
+
+
+def _al_salir():
+    if not ACTIVA or not (_tiempos or _contadores):
+        return
+    print("\n⏱️ Tiempo por etapa:")
+    print(resumen())
+    if _config["trace"]:
+        exportar_trace(_config["trace"])
+        print(f"Trace guardado en {_config['trace']}")
+
+
+atexit.register(_al_salir)
+
+if any(os.environ.get(v) for v in ("ABEJITA_PERFIL", "ABEJITA_TRACE", "ABEJITA_CPROFILE", "ABEJITA_TRACEMALLOC")):
+    activar(trace=os.environ.get("ABEJITA_TRACE"),
+            cprofile=os.environ.get("ABEJITA_CPROFILE"),
+            usar_tracemalloc=bool(os.environ.get("ABEJITA_TRACEMALLOC")))
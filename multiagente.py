@@ -0,0 +1,346 @@
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from cuadricula import LIBRE, OBSTACULO, crear_mundo
+from busqueda import ESTRATEGIAS
+from generador_mundos import DISPOSICIONES
+import indice_mundo  # registra la estrategia "BFS-Campo"
+import replanificacion  # registra la estrategia "D* Lite"
+
+# Muchas abejas en un mismo mundo: cada una con su estrategia, inicio y meta. Los
+# caminos se calculan en paralelo en un pool de procesos que leen la cuadrícula desde
+# memoria compartida (sin copiarla a cada proceso) y después todas las abejas avanzan
+# en un mismo bucle de frames, sumando contactos y flores por estrategia.
+
+# Abejas por tarea del pool
+TAM_TANDA = 16
+
+# Color de cada estrategia en la ventana (en el orden en que aparecen)
+COLORES_ESTRATEGIA = [(230, 160, 0), (0, 120, 220), (200, 0, 0), (0, 160, 0), (150, 0, 170),
+                      (0, 170, 170), (120, 80, 20)]
+
+# Cuadrícula del proceso trabajador (vista sobre la memoria compartida, la fija _iniciar_trabajador)
+_MEMORIA = None
+_MUNDO = None
+
+
+class MundoCompartido:
+    """Copia de la cuadrícula en memoria compartida; los trabajadores la abren por nombre."""
+
+    def __init__(self, mundo):
+        self.forma = mundo.shape
+        self.memoria = shared_memory.SharedMemory(create=True, size=max(1, mundo.nbytes))
+        self.mundo = np.ndarray(self.forma, dtype=np.uint8, buffer=self.memoria.buf)
+        self.mundo[:] = mundo
+
+    def cerrar(self):
+        self.mundo = None   # sin vistas vivas el buffer se puede cerrar
+        self.memoria.close()
+        self.memoria.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def _iniciar_trabajador(nombre, forma):
+    global _MEMORIA, _MUNDO
+    # Los trabajadores comparten el resource_tracker del proceso principal, que es quien
+    # borra el bloque (MundoCompartido.cerrar)
+    _MEMORIA = shared_memory.SharedMemory(name=nombre)
+    _MUNDO = np.ndarray(forma, dtype=np.uint8, buffer=_MEMORIA.buf)
+
+
+def _planificar_tanda(tanda):
+    """[(id, estrategia, inicio, meta)] -> [(id, camino plano o None, obstáculos, nodos, tiempo)]."""
+    n = _MUNDO.shape[0]
+    resultados = []
+    for id_abeja, nombre, inicio, meta in tanda:
+        estadisticas = {}
+        t0 = time.perf_counter()
+        camino, obstaculos = ESTRATEGIAS[nombre](_MUNDO, inicio, meta, n, estadisticas=estadisticas)
+        tiempo = time.perf_counter() - t0
+        # Índices planos en int32: se devuelven al proceso principal mucho más livianos que tuplas
+        plano = np.array([f * n + c for f, c in camino], dtype=np.int32) if camino else None
+        resultados.append((id_abeja, plano, obstaculos, estadisticas.get("nodos_expandidos"), tiempo))
+    return resultados
+
+
+def crear_abejas(mundo, cantidad, estrategias, semilla=0):
+    """Abejas con estrategia (repartidas en rueda) e inicio/meta libres al azar y distintos."""
+    n = mundo.shape[0]
+    rng = np.random.default_rng(semilla)
+    libres = np.flatnonzero(mundo.ravel() == LIBRE)
+    if libres.size < 2:
+        raise ValueError("El mundo necesita al menos dos celdas libres")
+    puntos = libres[rng.integers(0, libres.size, (cantidad, 2))]
+    repetidos = puntos[:, 0] == puntos[:, 1]
+    while repetidos.any():
+        puntos[repetidos, 1] = libres[rng.integers(0, libres.size, int(repetidos.sum()))]
+        repetidos = puntos[:, 0] == puntos[:, 1]
+    return [{"id": i, "estrategia": estrategias[i % len(estrategias)],
+             "inicio": divmod(int(a), n), "meta": divmod(int(b), n)}
+            for i, (a, b) in enumerate(puntos)]
+
+
+def planificar(mundo, abejas, procesos=None, tam_tanda=TAM_TANDA):
+    """Calcula el camino de cada abeja (en el lugar: camino, obstaculos, nodos, tiempo).
+
+    Con procesos=1 corre en este proceso; si no, en un pool que lee el mundo desde
+    memoria compartida. Devuelve los segundos que tardó en total.
+    """
+    global _MUNDO
+    tareas = [(a["id"], a["estrategia"], a["inicio"], a["meta"]) for a in abejas]
+    tandas = [tareas[i:i + tam_tanda] for i in range(0, len(tareas), tam_tanda)]
+    por_id = {a["id"]: a for a in abejas}
+
+    t0 = time.perf_counter()
+    resultados = []
+    if procesos == 1:
+        _MUNDO = mundo
+        for tanda in tandas:
+            resultados.extend(_planificar_tanda(tanda))
+    else:
+        with MundoCompartido(mundo) as compartido, \
+                ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                                    initargs=(compartido.memoria.name, compartido.forma)) as pool:
+            for parcial in pool.map(_planificar_tanda, tandas):
+                resultados.extend(parcial)
+    for id_abeja, camino, obstaculos, nodos, tiempo in resultados:
+        por_id[id_abeja].update(camino=camino, obstaculos=obstaculos, nodos=nodos, tiempo=tiempo)
+    return time.perf_counter() - t0
+
+
+def mascara_flores(mundo, mapa_imagenes, clasificaciones):
+    """Bool por celda (índice plano): obstáculo cuya imagen se clasificó como flor."""
+    from clasificador import categoria
+    flores = np.zeros(mundo.size, dtype=bool)
+    n = mundo.shape[0]
+    for (fila, col), ruta in mapa_imagenes.items():
+        resultado = clasificaciones.get(ruta)
+        if resultado is not None and resultado["label"] is not None \
+                and categoria(resultado["label"]).lower() == "flor":
+            flores[fila * n + col] = True
+    return flores
+
+
+class Enjambre:
+    """Todas las abejas con camino avanzan un paso por tick; los contactos se suman por estrategia.
+
+    Los caminos están concatenados en un solo array, así que cada tick es un puñado
+    de operaciones de numpy sobre todas las abejas, no un bucle por abeja. Igual que
+    la animación, cada paso (salvo la meta) toca los obstáculos vecinos.
+    """
+
+    def __init__(self, mundo, abejas, flores=None):
+        self.n = mundo.shape[0]
+        self.bloqueado = (mundo == OBSTACULO).ravel()
+        self.flores = flores
+        self.abejas = abejas
+        self.estrategias = list(dict.fromkeys(a["estrategia"] for a in abejas))
+        con_camino = [a for a in abejas if a.get("camino") is not None]
+        indice = {nombre: k for k, nombre in enumerate(self.estrategias)}
+        self.grupo = np.array([indice[a["estrategia"]] for a in con_camino], dtype=np.int64)
+        self.largos = np.array([len(a["camino"]) for a in con_camino], dtype=np.int64)
+        self.desde = np.concatenate(([0], np.cumsum(self.largos)[:-1])).astype(np.int64)
+        self.caminos = (np.concatenate([a["camino"] for a in con_camino]) if con_camino
+                        else np.zeros(0, dtype=np.int32))
+        self.metas = np.array([a["meta"][0] * self.n + a["meta"][1] for a in con_camino], dtype=np.int64)
+        self.total = int(self.largos.max()) if con_camino else 0
+
+        k = len(self.estrategias)
+        self.contactos = np.zeros(k, dtype=np.int64)
+        self.puntos_flores = np.zeros(k, dtype=np.int64)
+        self.tocados = [set() for _ in range(k)]
+
+    def posiciones(self, paso):
+        """(filas, columnas, estrategia) de cada abeja en ese paso (las que llegaron se quedan en la meta)."""
+        plano = self.caminos[self.desde + np.minimum(paso, self.largos - 1)]
+        filas, cols = np.divmod(plano, self.n)
+        return filas, cols, self.grupo
+
+    def llegadas(self, paso):
+        """Abejas que ya llegaron a su meta en ese paso, por estrategia."""
+        return np.bincount(self.grupo[self.largos - 1 <= paso], minlength=len(self.estrategias))
+
+    def tocar(self, paso):
+        activas = np.flatnonzero(self.largos > paso)
+        pos = self.caminos[self.desde[activas] + paso].astype(np.int64)
+        fuera_meta = pos != self.metas[activas]
+        activas, pos = activas[fuera_meta], pos[fuera_meta]
+        filas, cols = np.divmod(pos, self.n)
+        k = len(self.estrategias)
+        for df, dc, dentro in ((1, 0, filas < self.n - 1), (-1, 0, filas > 0),
+                               (0, 1, cols < self.n - 1), (0, -1, cols > 0)):
+            vecinos = pos[dentro] + df * self.n + dc
+            choca = self.bloqueado[vecinos]
+            vecinos = vecinos[choca]
+            grupos = self.grupo[activas[dentro][choca]]
+            self.contactos += np.bincount(grupos, minlength=k)
+            if self.flores is not None:
+                self.puntos_flores += np.bincount(grupos[self.flores[vecinos]], minlength=k)
+            for g in np.unique(grupos):
+                self.tocados[g].update(vecinos[grupos == g].tolist())
+
+    def correr(self):
+        """Todos los ticks sin ventana; devuelve los ticks por segundo."""
+        t0 = time.perf_counter()
+        for paso in range(self.total):
+            self.tocar(paso)
+        duracion = time.perf_counter() - t0
+        return self.total / duracion if duracion > 0 else float("inf")
+
+    def resumen(self):
+        """Una fila por estrategia: abejas, éxito, longitud, nodos, tiempo de búsqueda, contactos y flores."""
+        filas = []
+        for k, nombre in enumerate(self.estrategias):
+            propias = [a for a in self.abejas if a["estrategia"] == nombre]
+            exitosas = [a for a in propias if a.get("camino") is not None]
+            nodos = [a["nodos"] for a in propias if a.get("nodos") is not None]
+            filas.append({
+                "estrategia": nombre,
+                "abejas": len(propias),
+                "exitosas": len(exitosas),
+                "longitud_media": sum(len(a["camino"]) for a in exitosas) / len(exitosas) if exitosas else 0.0,
+                "nodos_medios": sum(nodos) / len(nodos) if nodos else 0.0,
+                "tiempo_busqueda_ms": sum(a.get("tiempo", 0.0) for a in propias) * 1000,
+                "contactos": int(self.contactos[k]),
+                "obstaculos_tocados": len(self.tocados[k]),
+                "flores": int(self.puntos_flores[k]),
+            })
+        return filas
+
+
+def imprimir_resumen(resumen):
+    print(f"{'Estrategia':<10} {'Abejas':>7} {'Llegan':>7} {'Longitud':>9} {'Nodos':>9} "
+          f"{'Búsqueda(ms)':>13} {'Contactos':>10} {'Tocados':>8} {'Flores':>7}")
+    for r in resumen:
+        print(f"{r['estrategia']:<10} {r['abejas']:>7} {r['exitosas']:>7} {r['longitud_media']:>9.1f} "
+              f"{r['nodos_medios']:>9.1f} {r['tiempo_busqueda_ms']:>13.1f} {r['contactos']:>10} "
+              f"{r['obstaculos_tocados']:>8} {r['flores']:>7}")
+
+
+def mostrar_enjambre(mundo, enjambre, velocidad=None):
+    """Ventana con todas las abejas moviéndose a la vez (un cuadrado por abeja, color por estrategia)."""
+    import pygame
+    from animacion import Reproductor, velocidad_desde_texto
+    from dibujo import Camara, textos
+
+    blanco, negro, borde = (255, 255, 255), (0, 0, 0), (105, 147, 255)
+    lado, ancho_panel = 600, 380
+    pygame.init()
+    screen = pygame.display.set_mode((lado + ancho_panel, lado))
+    pygame.display.set_caption(f"Enjambre: {len(enjambre.abejas)} abejas 🐝 "
+                               f"(espacio: pausa, [ ]: velocidad, Fin: saltar)")
+    clock = pygame.time.Clock()
+    camara = Camara(enjambre.n, enjambre.n, lado, lado, 25)
+    celdas = np.where(mundo == OBSTACULO, OBSTACULO, LIBRE).astype(np.uint8)
+    colores = {LIBRE: blanco, OBSTACULO: negro}
+    paleta = np.array([COLORES_ESTRATEGIA[k % len(COLORES_ESTRATEGIA)] for k in range(len(enjambre.estrategias))])
+
+    reproductor = Reproductor(max(1, enjambre.total), velocidad or velocidad_desde_texto(None))
+    dt = 0.0
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                return
+            camara.manejar_evento(event, 0, 0)
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    reproductor.alternar_pausa()
+                elif event.key == pygame.K_RIGHTBRACKET:
+                    reproductor.cambiar_velocidad(2)
+                elif event.key == pygame.K_LEFTBRACKET:
+                    reproductor.cambiar_velocidad(0.5)
+                elif event.key == pygame.K_END:
+                    reproductor.saltar_al_final()
+                elif reproductor.terminado():
+                    pygame.quit()
+                    return
+
+        # Un solo bucle para todas: cada paso alcanzado suma los contactos de todas las abejas
+        for paso in reproductor.avanzar(dt):
+            enjambre.tocar(paso)
+        paso = reproductor.paso_actual()
+
+        estatica, _ = camara.vista(celdas, colores, borde)
+        screen.fill(blanco)
+        screen.blit(estatica, (0, 0))
+        filas, cols, grupos = enjambre.posiciones(paso)
+        t = max(2, int(camara.tam) - 2)
+        for fila, col, g in zip(filas.tolist(), cols.tolist(), grupos.tolist()):
+            x, y = camara.a_pantalla((fila, col))
+            if -t < x < lado and -t < y < lado:
+                screen.fill(paleta[g], pygame.Rect(x + 1, y + 1, t, t))
+
+        llegadas = enjambre.llegadas(paso)
+        screen.blit(textos.render(f"Paso {paso + 1}/{enjambre.total}  ({reproductor.texto_velocidad()})", negro),
+                    (lado + 20, 20))
+        for k, nombre in enumerate(enjambre.estrategias):
+            y = 60 + 70 * k
+            abejas = int(np.count_nonzero(enjambre.grupo == k))
+            screen.blit(textos.render(f"{nombre}: {llegadas[k]}/{abejas} en la meta",
+                                      tuple(paleta[k])), (lado + 20, y))
+            screen.blit(textos.render(f"  contactos {enjambre.contactos[k]}, flores {enjambre.puntos_flores[k]}",
+                                      negro, 22), (lado + 20, y + 24))
+        if reproductor.terminado():
+            screen.blit(textos.render("Todas llegaron: una tecla para salir", (200, 0, 0)),
+                        (lado + 20, lado - 40))
+        pygame.display.flip()
+        dt = clock.tick(60) / 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Muchas abejas con distintas estrategias en un mismo mundo")
+    parser.add_argument("--abejas", type=int, default=300)
+    parser.add_argument("--n", type=int, default=200, help="tamaño de la cuadrícula")
+    parser.add_argument("--densidad", type=float, default=0.2)
+    parser.add_argument("--disposicion", default="uniforme", choices=list(DISPOSICIONES))
+    parser.add_argument("--estrategias", nargs="+", default=["DFS", "BFS", "A*"],
+                        help=f"disponibles: {', '.join(ESTRATEGIAS)}")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos del pool (por defecto, uno por CPU; 1 = sin pool)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--clasificar", action="store_true",
+                        help="asignar imágenes a los obstáculos y contar flores (carga el modelo)")
+    parser.add_argument("--ventana", action="store_true", help="ver el enjambre en una ventana")
+    args = parser.parse_args()
+
+    desconocidas = [e for e in args.estrategias if e not in ESTRATEGIAS]
+    if desconocidas:
+        parser.error(f"estrategias desconocidas: {desconocidas} (disponibles: {list(ESTRATEGIAS)})")
+
+    mundo = crear_mundo(args.n, round(args.densidad * args.n * args.n), semilla=args.semilla,
+                        disposicion=args.disposicion)
+    abejas = crear_abejas(mundo, args.abejas, args.estrategias, args.semilla)
+
+    flores = None
+    if args.clasificar:
+        from clasificador import CANDIDATE_LABELS
+        from imagenes import asignar_imagenes_a_obstaculos
+        from simulacion import cargar_imagenes_y_clasificar
+        imagenes, clasificaciones = cargar_imagenes_y_clasificar(CANDIDATE_LABELS)
+        random.seed(args.semilla)
+        flores = mascara_flores(mundo, asignar_imagenes_a_obstaculos(mundo, imagenes), clasificaciones)
+
+    duracion = planificar(mundo, abejas, args.procesos)
+    print(f"{len(abejas)} caminos en {duracion:.2f}s ({len(abejas) / duracion:.0f} abejas/s)")
+    enjambre = Enjambre(mundo, abejas, flores)
+    if args.ventana:
+        mostrar_enjambre(mundo, enjambre)
+    else:
+        ticks = enjambre.correr()
+        print(f"{enjambre.total} ticks ({ticks:.0f} ticks/s con todas las abejas)")
+    imprimir_resumen(enjambre.resumen())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,78 @@
-import pygame
-import random
 import time
-from collections import deque
-import os
-import tkinter as tk
-from PIL import Image, ImageTk
-import cv2
-import matplotlib.pyplot as plt
 
-from transformers import pipeline
-from PIL import Image
+# Momento de arranque, para medir el tiempo hasta el primer frame y hasta el modelo listo
+T_INICIO = time.perf_counter()
+
+import os
+import pygame
+from array import array
+from collections import defaultdict
+
+from cuadricula import LIBRE, OBSTACULO, INICIO, META, crear_mundo, obstaculos_adyacentes
+from imagenes import cargar_imagenes_dataset, asignar_imagenes_a_obstaculos
+from busqueda import ESTRATEGIAS
+from instrumentacion import Cronometro, episodio, etapa
+from dibujo import Camara, PanelTexto, RegionesSucias, textos
+from animacion import Reproductor, velocidad_desde_texto
+from inspeccion import PanelInspeccion, miniaturas
+import indice_mundo
+from indice_mundo import indice_de  # también registra la estrategia "BFS-Campo"
+from replanificacion import DStarLite  # también registra la estrategia "D* Lite"
+from clasificador import CANDIDATE_LABELS, ClasificacionAnticipada, categoria, proveedor
+from servidor_clasificacion import clasificar, servidor_disponible
+from trazas import EscritorTrazas, armar_traza
+from indice_imagenes import IndiceImagenes
+
+# cv2 se importa solo al inspeccionar un obstáculo, y el modelo lo carga `proveedor`
+# en segundo plano: buscar con dfs/bfs no paga nada de eso
 
 # Mapa global de posiciones de obstáculos a imágenes
 OBSTACLE_IMAGE_MAP = {}
 
-# Contador global de flores detectadas
-SCORE_FLORES = {"DFS": 0, "BFS": 0}
+# Tabla global de clasificaciones precalculadas: ruta -> {"label", "score"}
+CLASIFICACIONES = {}
+
+# Clasificación en segundo plano de los obstáculos del camino (se crea en el programa principal)
+ANTICIPADA = None
+
+# Etiquetas para el modelo: las 6 categorías o la taxonomía ampliada con especies de flores
+ETIQUETAS = CANDIDATE_LABELS  # o clasificador.ETIQUETAS_AMPLIADAS
+
+# Clasificar una sola vez cada par X_sub/X_sobre (ABEJITA_VARIANTES=1)
+AGRUPAR_VARIANTES = os.environ.get("ABEJITA_VARIANTES") == "1"
 
-# Dimensiones de la cuadrícula
-N = 10
+# Seguir las carpetas de imágenes durante la sesión (ABEJITA_VIGILAR=1): lo que se agrega,
+# cambia o borra se usa desde el episodio siguiente, sin reiniciar ni reclasificar todo
+VIGILAR_IMAGENES = os.environ.get("ABEJITA_VIGILAR") == "1"
+INDICE_IMAGENES = None
+
+# Grabar cada episodio en un archivo de trazas (ABEJITA_TRAZAS=episodios.abtr); se ven con trazas.py
+RUTA_TRAZAS = os.environ.get("ABEJITA_TRAZAS")
+
+# Métricas de arranque (segundos desde T_INICIO)
+METRICAS_ARRANQUE = {"primer_frame": None, "modelo_listo": None}
+
+# Contador global de flores detectadas por estrategia
+SCORE_FLORES = defaultdict(int, {nombre: 0 for nombre in ESTRATEGIAS})
+
+# Dimensiones de la cuadrícula (ABEJITA_N=2000 para mundos grandes)
+N = int(os.environ.get("ABEJITA_N", 10))
 CELL_SIZE = 25
-WINDOW_SIZE = N * CELL_SIZE
-WINDOW_WIDTH, WINDOW_HEIGHT = 1200, 500
+# Lado de la ventana de cada cuadrícula: si el mundo no entra, se navega con la cámara
+VISTA_MAXIMA = 300
+WINDOW_SIZE = min(N * CELL_SIZE, VISTA_MAXIMA)
+# Panel de cada cuadrícula: un botón por estrategia desde Y_BOTONES y debajo las
+# cuatro líneas de instrucciones; la ventana crece si hay muchas estrategias
+Y_BOTONES, ALTO_BOTON, ANCHO_BOTON = 150, 35, 170
+Y_INSTRUCCIONES = Y_BOTONES + len(ESTRATEGIAS) * ALTO_BOTON + 15
+WINDOW_WIDTH, WINDOW_HEIGHT = 1200, max(500, Y_INSTRUCCIONES + 4 * 30 + 10)
+
+# Semilla y disposición del mundo (ABEJITA_SEMILLA=7, ABEJITA_DISPOSICION=agrupada|laberinto)
+SEMILLA = int(os.environ["ABEJITA_SEMILLA"]) if os.environ.get("ABEJITA_SEMILLA") else None
+DISPOSICION = os.environ.get("ABEJITA_DISPOSICION", "uniforme")
+
+# Pasos por segundo de la animación (ABEJITA_VELOCIDAD=20, o "instantaneo")
+VELOCIDAD_ANIMACION = velocidad_desde_texto(os.environ.get("ABEJITA_VELOCIDAD"))
 
 # Colores RGB
 WHITE = (255, 255, 255)
@@ -31,232 +82,163 @@ GREEN = (0, 200, 0)
 RED = (200, 0, 0)
 YELLOW = (255, 255, 0)
 
-# Cargar clasificador zero-shot para imágenes
-classifier = pipeline("zero-shot-image-classification", 
-                     model="openai/clip-vit-base-patch32",
-                     use_fast=True)
-
-# Definir las categorías temáticas
-CANDIDATE_LABELS = ["ave", "perro", "carro", "helado", "lluvia", "flor"]
-
-
-# Construcción del mundo con diccionario
-def crear_mundo(n, num_obstaculos=20):
-    mundo = {}
-    for i in range(n):
-        for j in range(n):
-            mundo[(i, j)] = " "  # espacio vacío
-
-    # Obstáculos aleatorios
-    for _ in range(num_obstaculos):
-        x, y = random.randint(0, n-1), random.randint(0, n-1)
-        mundo[(x, y)] = "X"  # obstáculo
-
-    return mundo
-
-def cargar_imagenes_de_carpeta(folder_name):
-    base_dir = os.path.join(os.path.dirname(__file__), folder_name)
-    if not os.path.isdir(base_dir):
-        raise FileNotFoundError(f"Carpeta no encontrada: {base_dir}")
-    archivos = [os.path.join(base_dir, f) for f in os.listdir(base_dir)
-                if f.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp'))]
-    if not archivos:
-        raise FileNotFoundError(f"No se encontraron imágenes en {base_dir}")
-    return archivos
-
-def asignar_imagenes_a_obstaculos(mundo, image_list):
-    mapping = {}
-    obstaculos = [pos for pos, val in mundo.items() if val == "X"]
-    
-    # Mezclar aleatoriamente la lista de imágenes
-    random.shuffle(image_list)
-    
-    # Si hay menos imágenes que obstáculos, se repetirán algunas
-    for i, pos in enumerate(obstaculos):
-        mapping[pos] = image_list[i % len(image_list)]
-    return mapping
-
-
-def mostrar_imagen_ventana(image_path):
-    # Inicialización perezosa del root de Tk (oculto)
-    if not hasattr(mostrar_imagen_ventana, "_root"):
-        mostrar_imagen_ventana._root = tk.Tk()
-        mostrar_imagen_ventana._root.withdraw()
-
-    win = tk.Toplevel(mostrar_imagen_ventana._root)
-    win.title("¡Obstáculo detectado!")
-    # Asegura que salga al frente (puedes quitar si molesta)
-    try:
-        win.attributes("-topmost", True)
-    except Exception:
-        pass
-    
-    # Cargar imagen en escala de grises
-    img_gray = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
-    
-    if img_gray is None:
-        print(f"No se pudo cargar la imagen {image_path}")
-        return
-    
-    # Ecualización de histograma normal
-    eq_hist = cv2.equalizeHist(img_gray)
-    
-    # Ecualización adaptativa CLAHE
-    clahe = cv2.createCLAHE(clipLimit=1.0, tileGridSize=(8,8))
-    clahe_img = clahe.apply(img_gray)
-    
-    # Convertir de nuevo a formato RGB para mostrar con PIL
-    # img_rgb = cv2.cvtColor(clahe_img, cv2.COLOR_GRAY2RGB)
-
-    # Convertir a objeto PIL
-    # img = Image.fromarray(img_rgb)
-    
-    # Clasificación con el modelo
-    try:
-        img_for_model = Image.fromarray(cv2.cvtColor(clahe_img, cv2.COLOR_GRAY2RGB))
-        results = classifier(img_for_model, candidate_labels=CANDIDATE_LABELS)
-        best_label = results[0]['label']
-        best_score = results[0]['score']
-        classification_text = f"El modelo detecta: {best_label}" #({best_score:.2f}
-        
-        # 🟢 Si detecta una flor, sumar al score del algoritmo activo
-        if best_label.lower() == "flor":
-            # Detectar algoritmo actual (DFS o BFS)
-            import inspect
-            current_frame = inspect.currentframe()
-            while current_frame:
-                if "algoritmo" in current_frame.f_locals:
-                    algoritmo_actual = current_frame.f_locals["algoritmo"]
-                    break
-                current_frame = current_frame.f_back
-            else:
-                algoritmo_actual = "DFS"  # Por defecto
-                
-            if algoritmo_actual in SCORE_FLORES:
-                SCORE_FLORES[algoritmo_actual] += 1
-                print(f"🌸 Flor detectada ({algoritmo_actual}): +1 punto (total = {SCORE_FLORES[algoritmo_actual]})")
-        
-    except Exception as e:
-        classification_text = f"Error clasificando: {e}"
-        best_label = None
-    
-    img_original_pil = Image.fromarray(cv2.cvtColor(img_gray, cv2.COLOR_GRAY2RGB))
-    img_eq_pil = Image.fromarray(cv2.cvtColor(eq_hist, cv2.COLOR_GRAY2RGB))
-    img_clahe_pil = Image.fromarray(cv2.cvtColor(clahe_img, cv2.COLOR_GRAY2RGB))
-    
-    # Redimensionar imágenes
-    max_w, max_h = 400, 300
-    for im in [img_original_pil, img_eq_pil, img_clahe_pil]:
-        im.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
-
-    photo_orig = ImageTk.PhotoImage(img_original_pil)
-    photo_eq = ImageTk.PhotoImage(img_eq_pil)
-    photo_clahe = ImageTk.PhotoImage(img_clahe_pil)
-    
-    # Mostrar las dos imágenes lado a lado
-    frame = tk.Frame(win)
-    frame.pack(padx=10, pady=10)
-
-    lbl1 = tk.Label(frame, image=photo_orig, text="Original", compound="top")
-    lbl1.image = photo_orig
-    lbl1.pack(side="left", padx=10)
+# Color de cada tipo de celda en la cuadrícula
+COLORES_CELDA = {LIBRE: WHITE, OBSTACULO: BLACK, INICIO: GREEN, META: RED}
 
-    lbl2 = tk.Label(frame, image=photo_eq, text="Ecualización Global", compound="top")
-    lbl2.image = photo_eq
-    lbl2.pack(side="left", padx=10)
 
-    lbl3 = tk.Label(frame, image=photo_clahe, text="CLAHE (Adaptativa)", compound="top")
-    lbl3.image = photo_clahe
-    lbl3.pack(side="left", padx=10)
-    
-    # Mostrar el resultado del modelo debajo
-    lbl_result = tk.Label(win, text=classification_text, font=("Arial", 12, "bold"), fg="blue")
-    lbl_result.pack(pady=5)
+def recoger_clasificaciones():
+    """Pasa a CLASIFICACIONES lo que ya terminó de clasificarse en segundo plano (no bloquea)."""
+    if ANTICIPADA is not None:
+        CLASIFICACIONES.update(ANTICIPADA.recoger())
 
-    btn = tk.Button(win, text="Cerrar", command=win.destroy)
-    btn.pack(pady=8)
 
-    # Modal: bloquea hasta cerrar la ventana
-    win.grab_set()
-    win.focus_force()
-    win.wait_window()
+def obtener_clasificacion(image_path):
+    """Devuelve la clasificación ya calculada, o None si todavía se está calculando.
 
+    Sin clasificación en segundo plano (ANTICIPADA es None) se calcula en el momento.
+    """
+    recoger_clasificaciones()
+    if image_path not in CLASIFICACIONES:
+        if ANTICIPADA is not None:
+            ANTICIPADA.encolar([image_path])
+            return None
+        CLASIFICACIONES.update(clasificar([image_path], ETIQUETAS, agrupar_variantes=AGRUPAR_VARIANTES))
+    return CLASIFICACIONES.get(image_path)
 
-# DFS para encontrar un camino
-def dfs(mundo, inicio, meta, n):
-    stack = [(inicio, [inicio])]
-    visitados = set()
-    obstaculos_detectados = 0  # Contador de obstáculos
 
-    while stack:
-        (actual, path) = stack.pop()
-        if actual in visitados:
-            continue
-        visitados.add(actual)
+def texto_clasificacion(resultado):
+    if resultado is None:
+        return "El modelo está clasificando..."
+    if resultado['label'] is None:
+        return "No se pudo clasificar la imagen"
+    return f"El modelo detecta: {resultado['label']}" #({resultado['score']:.2f}
 
-        if actual == meta:
-            return path, obstaculos_detectados  # Retornar camino y contador
 
-        x, y = actual
-        vecinos = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-        for nx, ny in vecinos:
-            if 0 <= nx < n and 0 <= ny < n:
-                if mundo[(nx, ny)] != "X":  # no es obstáculo
-                    stack.append(((nx, ny), path + [(nx, ny)]))
-                else:
-                    print(f"🚧Obstáculo encontrado en {nx, ny}")
-                    obstaculos_detectados += 1  # Incrementar contador
-    return None, obstaculos_detectados
-
-# BFS para encontrar un camino
-def bfs(mundo, inicio, meta, n):
-    cola = deque([(inicio, [inicio])])
-    visitados = set()
-    obstaculos_detectados = 0  # Contador de obstáculos
-
-    while cola:
-        (actual, path) = cola.popleft()
-        if actual in visitados:
+def contar_flores(pendientes, algoritmo):
+    """Suma al score las imágenes ya clasificadas como flor y devuelve las que siguen pendientes."""
+    recoger_clasificaciones()
+    restantes = []
+    for image_path in pendientes:
+        if image_path not in CLASIFICACIONES:
+            restantes.append(image_path)
             continue
-        visitados.add(actual)
-
-        if actual == meta:
-            return path, obstaculos_detectados  # Retornar camino y contador
+        resultado = CLASIFICACIONES[image_path]
+        label = resultado['label'] if resultado else None
+        # 🟢 Si detecta una flor, sumar al score del algoritmo activo
+        if label is not None and categoria(label).lower() == "flor":
+            SCORE_FLORES[algoritmo] += 1
+            print(f"🌸 Flor detectada ({algoritmo}): +1 punto (total = {SCORE_FLORES[algoritmo]})")
+    return restantes
+
+
+def aplicar_cambios_de_imagenes(mundo):
+    """Antes de cada episodio: toma los cambios de las carpetas vigiladas y reasigna las imágenes."""
+    global OBSTACLE_IMAGE_MAP
+    cambios = INDICE_IMAGENES.recoger_cambios()
+    viejas = cambios["actualizadas"] + cambios["quitadas"]
+    # Lo que ya llegó de la versión vieja se recoge antes de olvidarlo
+    recoger_clasificaciones()
+    for ruta in viejas:
+        CLASIFICACIONES.pop(ruta, None)
+    if ANTICIPADA is not None:
+        ANTICIPADA.olvidar(viejas)
+    miniaturas.olvidar(viejas)
+    if any(cambios.values()):
+        OBSTACLE_IMAGE_MAP = asignar_imagenes_a_obstaculos(mundo, INDICE_IMAGENES)
+        print(f"Imágenes: {len(cambios['agregadas'])} nuevas, {len(cambios['actualizadas'])} cambiadas, "
+              f"{len(cambios['quitadas'])} borradas ({len(INDICE_IMAGENES)} en total)")
+
+
+def reportar_metricas_arranque():
+    """Imprime el tiempo hasta el primer frame y hasta que el modelo quedó listo."""
+    if proveedor.momento_listo is not None:
+        METRICAS_ARRANQUE["modelo_listo"] = proveedor.momento_listo - T_INICIO
+    for nombre, valor in METRICAS_ARRANQUE.items():
+        texto = f"{valor:.2f}s" if valor is not None else "—"
+        print(f"⏱️ Tiempo hasta {nombre.replace('_', ' ')}: {texto}")
 
-        x, y = actual
-        vecinos = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-        for nx, ny in vecinos:
-            if 0 <= nx < n and 0 <= ny < n:
-                if mundo[(nx, ny)] != "X":  # si no es obstáculo
-                    cola.append(((nx, ny), path + [(nx, ny)]))
-                else:
-                    print(f"🚧Objeto detectado en {nx, ny}")
-                    obstaculos_detectados += 1  # Incrementar contador
-    return None, obstaculos_detectados
 
 # Elegir inicio y meta manualmente 
 def elegir_puntos_separados(mundo, n):
     screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-    pygame.display.set_caption("Selecciona inicio, meta y algoritmo")
-    font = pygame.font.Font(None, 25)
+    pygame.display.set_caption("Selecciona inicio, meta y algoritmo (rueda: zoom, botón central: mover)")
     clock = pygame.time.Clock()
+    sucias = RegionesSucias()
 
-    inicio_dfs = None
-    meta_dfs = None
-    inicio_bfs = None
-    meta_bfs = None
+    # El modelo se va cargando mientras el usuario elige inicio y meta (salvo que lo tenga el servidor)
+    if not servidor_disponible():
+        proveedor.iniciar_en_segundo_plano()
+
+    inicio_izq = None
+    meta_izq = None
+    inicio_der = None
+    meta_der = None
     
     
-    # Copias del mundo para cada algoritmo
-    mundo_dfs = mundo.copy()
-    mundo_bfs = mundo.copy()
+    # Copias del mundo para cada cuadrícula
+    mundo_izq = mundo.copy()
+    mundo_der = mundo.copy()
     
-    # Botones para seleccionar algoritmo
-    dfs_button = pygame.Rect(WINDOW_SIZE + 20, 150, 150, 30)
-    bfs_button = pygame.Rect(WINDOW_SIZE + 680,150, 150, 30)
+    # Un botón por cada estrategia registrada, en el panel de cada cuadrícula (mismo x que su texto)
+    botones_izq = {}
+    botones_der = {}
+    for k, nombre in enumerate(ESTRATEGIAS):
+        botones_izq[nombre] = pygame.Rect(WINDOW_SIZE + 20, Y_BOTONES + k * ALTO_BOTON, ANCHO_BOTON, 30)
+        botones_der[nombre] = pygame.Rect(2 * WINDOW_SIZE + 420, Y_BOTONES + k * ALTO_BOTON, ANCHO_BOTON, 30)
+
+    instrucciones_izq = [
+        "Instrucciones:",
+        "- Click izquierdo: Inicio (S)",
+        "- Click derecho: Meta (G)", 
+        "- Luego elige el algoritmo"
+    ]
+    instrucciones_der = [
+        "Instrucciones:",
+        "- Click izquierdo: INICIO (S)",
+        "- Click derecho: META (G)", 
+        "- Luego 'Ejecutar ...'"
+    ]
+
+    # Una cámara por cuadrícula: solo se dibuja lo visible y un clic solo cambia una celda
+    camara_izq = Camara(n, n, WINDOW_SIZE, WINDOW_SIZE, CELL_SIZE)
+    camara_der = Camara(n, n, WINDOW_SIZE, WINDOW_SIZE, CELL_SIZE)
+    sucio_izq = sucio_der = True
+
+    def dibujar_lado(x0, camara, mundo_lado, inicio, meta, titulo, color_titulo, botones, color_activo,
+                     instrucciones):
+        """Cuadrícula y panel de un lado de la pantalla (cuadrícula + panel a su derecha)."""
+        with etapa("dibujar_seleccion"):
+            lado = pygame.Rect(x0, 0, WINDOW_SIZE + 400, WINDOW_HEIGHT).clip(screen.get_rect())
+            screen.fill(WHITE, lado)
+            vista, _ = camara.vista(mundo_lado, COLORES_CELDA, BLUE)
+            screen.blit(vista, (x0, 0))
+
+            panel_x = x0 + WINDOW_SIZE + 20
+            screen.blit(textos.render(titulo, color_titulo), (panel_x, 20))
+
+            # Información de inicio y meta
+            if inicio:
+                screen.blit(textos.render(f"Inicio: {inicio}", GREEN), (panel_x, 60))
+            else:
+                screen.blit(textos.render("Inicio: No seleccionado", BLUE), (panel_x, 60))
+            if meta:
+                screen.blit(textos.render(f"Meta: {meta}", RED), (panel_x, 100))
+            else:
+                screen.blit(textos.render("Meta: No seleccionado", BLUE), (panel_x, 100))
+
+            # Botones, con el texto centrado
+            color = color_activo if inicio and meta else (100, 100, 100)
+            for nombre, boton in botones.items():
+                pygame.draw.rect(screen, color, boton)
+                boton_text = textos.render(f"Ejecutar {nombre}", WHITE)
+                screen.blit(boton_text, boton_text.get_rect(center=boton.center))
+
+            for i, linea in enumerate(instrucciones):
+                screen.blit(textos.render(linea, BLACK), (panel_x, Y_INSTRUCCIONES + i * 30))
+            sucias.marcar(lado)
     
     # Algoritmo seleccionado
-    algoritmo = None
+    algoritmo_elegido = None
     datos_elegidos = None
     
     seleccionando = True
@@ -264,310 +246,321 @@ def elegir_puntos_separados(mundo, n):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return None, None
-            
+
+            # Zoom y paneo de la cuadrícula que está bajo el mouse (o de la que se arrastra)
+            if event.type in (pygame.MOUSEWHEEL, pygame.MOUSEMOTION, pygame.KEYDOWN) or \
+                    getattr(event, "button", None) == 2:
+                if camara_izq.arrastrando() or (not camara_der.arrastrando()
+                                                and pygame.mouse.get_pos()[0] < WINDOW_SIZE + 400):
+                    sucio_izq |= camara_izq.manejar_evento(event, 0, 0)
+                else:
+                    sucio_der |= camara_der.manejar_evento(event, WINDOW_SIZE + 400, 0)
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 x, y = pygame.mouse.get_pos()
+                celda_izq = camara_izq.celda_en(x, y)
+                celda_der = camara_der.celda_en(x - (WINDOW_SIZE + 400), y)
                 
-                #Vereficar clic en la cuadrícula DFS
-                if x < WINDOW_SIZE and y < WINDOW_SIZE:
-                    fila = y // CELL_SIZE
-                    columna = x // CELL_SIZE
+                #Vereficar clic en la cuadrícula izquierda
+                if celda_izq is not None:
+                    fila, columna = celda_izq
                     # Evitar seleccionar un obstáculo
-                    if mundo_dfs[(fila, columna)] != "X":
+                    if mundo_izq[(fila, columna)] != OBSTACULO:
                         if event.button == 1:  # Click izquierdo
-                            if inicio_dfs:
-                                mundo_dfs[inicio_dfs] = " "
-                            inicio_dfs = (fila, columna)
-                            mundo_dfs[inicio_dfs] = "S"
+                            if inicio_izq:
+                                mundo_izq[inicio_izq] = LIBRE
+                                camara_izq.cambio_celda(inicio_izq, WHITE)
+                            inicio_izq = (fila, columna)
+                            mundo_izq[inicio_izq] = INICIO
+                            camara_izq.cambio_celda(inicio_izq, COLORES_CELDA[INICIO])
+                            sucio_izq = True
                         elif event.button == 3:  # Click derecho
-                            if meta_dfs:
-                                mundo_dfs[meta_dfs] = " "
-                            meta_dfs = (fila, columna)
-                            mundo_dfs[meta_dfs] = "G"
+                            if meta_izq:
+                                mundo_izq[meta_izq] = LIBRE
+                                camara_izq.cambio_celda(meta_izq, WHITE)
+                            meta_izq = (fila, columna)
+                            mundo_izq[meta_izq] = META
+                            camara_izq.cambio_celda(meta_izq, COLORES_CELDA[META])
+                            sucio_izq = True
 
                 
-                # Verificar clic en cuadrícula BFS 
-                elif WINDOW_SIZE + 400 < x < WINDOW_SIZE * 2 + 400 and y < WINDOW_SIZE:
-                    fila = y // CELL_SIZE
-                    columna = (x - WINDOW_SIZE - 400) // CELL_SIZE
+                # Verificar clic en cuadrícula derecha
+                elif celda_der is not None:
+                    fila, columna = celda_der
                     # Evitar seleccionar un obstáculo
-                    if mundo_bfs[(fila, columna)] != "X":
+                    if mundo_der[(fila, columna)] != OBSTACULO:
                         if event.button == 1:  # Click izquierdo
-                            if inicio_bfs:
-                                mundo_bfs[inicio_bfs] = " "
-                            inicio_bfs = (fila, columna)
-                            mundo_bfs[inicio_bfs] = "S"
+                            if inicio_der:
+                                mundo_der[inicio_der] = LIBRE
+                                camara_der.cambio_celda(inicio_der, WHITE)
+                            inicio_der = (fila, columna)
+                            mundo_der[inicio_der] = INICIO
+                            camara_der.cambio_celda(inicio_der, COLORES_CELDA[INICIO])
+                            sucio_der = True
                         elif event.button == 3:  # Click derecho
-                            if meta_bfs:
-                                mundo_bfs[meta_bfs] = " "
-                            meta_bfs = (fila, columna)
-                            mundo_bfs[meta_bfs] = "G"
+                            if meta_der:
+                                mundo_der[meta_der] = LIBRE
+                                camara_der.cambio_celda(meta_der, WHITE)
+                            meta_der = (fila, columna)
+                            mundo_der[meta_der] = META
+                            camara_der.cambio_celda(meta_der, COLORES_CELDA[META])
+                            sucio_der = True
 
                         
                 # Verificar clic en botones
-                if dfs_button.collidepoint(x, y) and inicio_dfs and meta_dfs:
-                    algoritmo_elegido = "DFS"
-                    datos_elegidos = (inicio_dfs, meta_dfs, mundo_dfs)
-                    seleccionando = False
-                    
-                if bfs_button.collidepoint(x, y) and inicio_bfs and meta_bfs:
-                    algoritmo_elegido = "BFS"
-                    datos_elegidos = (inicio_bfs, meta_bfs, mundo_bfs)
-                    seleccionando = False
-
-        # Dibujar el mundo
-        screen.fill(WHITE)
-        
-        # CUADRÍCULA DFS (IZQUIERDA) 
-        for i in range(n):
-            for j in range(n):
-                valor = mundo_dfs[(i, j)]
-                if valor == "X":
-                    color = BLACK
-                elif valor == "S":
-                    color = GREEN
-                elif valor == "G":
-                    color = RED
-                else:
-                    color = WHITE
-
-                rect = pygame.Rect(j * CELL_SIZE, i * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(screen, color, rect)
-                pygame.draw.rect(screen, BLUE, rect, 1)
-        
-        # Panel información para DFS
-        panel_dfs_x = WINDOW_SIZE + 20
-        
-        # Título
-        titulo_dfs = font.render("Algoritmo DFS ", True, BLACK)
-        screen.blit(titulo_dfs, (panel_dfs_x, 20))
-        
-        # Información de inicio y meta
-        if inicio_dfs:
-            inicio_dfs_text = font.render(f"Inicio: {inicio_dfs}", True, GREEN)
-            screen.blit(inicio_dfs_text, (panel_dfs_x, 60))
-        else:
-            inicio_dfs_text = font.render("Inicio: No seleccionado", True, BLUE)
-            screen.blit(inicio_dfs_text, (panel_dfs_x, 60))
-            
-        if meta_dfs:
-            meta_dfs_text = font.render(f"Meta: {meta_dfs}", True, RED)
-            screen.blit(meta_dfs_text, (panel_dfs_x, 100))
-        else:
-            meta_dfs_text = font.render("Meta: No seleccionado", True, BLUE)
-            screen.blit(meta_dfs_text, (panel_dfs_x, 100))
-        
-        # Botón DFS
-        dfs_color = (0, 200, 0) if inicio_dfs and meta_dfs else (100, 100, 100)
-        pygame.draw.rect(screen, dfs_color, dfs_button)
-        dfs_text = font.render("Ejecutar DFS", True, WHITE)
-        
-        # Obtener el rectángulo del texto y centrarlo en el botón
-        dfs_text_rect = dfs_text.get_rect(center=dfs_button.center)
-
-        # Dibujar el texto centrado
-        screen.blit(dfs_text, dfs_text_rect)
-        
-        
-        # Instrucciones DFS
-        instrucciones = [
-            "Instrucciones:",
-            "- Click izquierdo: Inicio (S)",
-            "- Click derecho: Meta (G)", 
-            "- Enter para iniciar"
-        ]
-        
-        for i, linea in enumerate(instrucciones):
-            texto = font.render(linea, True, BLACK)
-            screen.blit(texto, (panel_dfs_x, 200 + i * 30))
-        
-        # CUADRÍCULA BFS (DERECHA)
-        espacio_x= WINDOW_SIZE + 400
-        
-        # Dibujar mundo BFS
-        for i in range(n):
-            for j in range(n):
-                valor = mundo_bfs[(i, j)]
-                if valor == "X":
-                    color = BLACK
-                elif valor == "S":
-                    color = GREEN
-                elif valor == "G":
-                    color = RED
-                else:
-                    color = WHITE
-
-                rect = pygame.Rect(espacio_x + j * CELL_SIZE, i * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(screen, color, rect)
-                pygame.draw.rect(screen, BLUE, rect, 1)
-        
-        # Panel información BFS
-        panel_bfs_x = espacio_x + WINDOW_SIZE + 20
-        
-        titulo_bfs = font.render("ALGORITMO BFS", True, (0, 0, 200))
-        screen.blit(titulo_bfs, (panel_bfs_x, 20))
-        
-        if inicio_bfs:
-            inicio_bfs_text = font.render(f"Inicio: {inicio_bfs}", True, GREEN)
-            screen.blit(inicio_bfs_text, (panel_bfs_x, 60))
-        else:
-            inicio_bfs_text = font.render("Inicio: No seleccionado", True, BLUE)
-            screen.blit(inicio_bfs_text, (panel_bfs_x, 60))
-            
-        if meta_bfs:
-            meta_bfs_text = font.render(f"Meta: {meta_bfs}", True, RED)
-            screen.blit(meta_bfs_text, (panel_bfs_x, 100))
-        else:
-            meta_bfs_text = font.render("Meta: No seleccionado", True, BLUE)
-            screen.blit(meta_bfs_text, (panel_bfs_x, 100))
-        
-        # Botón BFS
-        bfs_color = (0, 0, 200) if inicio_bfs and meta_bfs else (100, 100, 100)
-        pygame.draw.rect(screen, bfs_color, bfs_button)
-        bfs_text = font.render("Ejecutar BFS", True, WHITE)
-        
-        bfs_text_rect = bfs_text.get_rect(center=bfs_button.center)
-        screen.blit(bfs_text, bfs_text_rect)
-        
-        # Instrucciones BFS
-        instrucciones_bfs = [
-            "Instrucciones BFS:",
-            "- Click izquierdo: INICIO (S)",
-            "- Click derecho: META (G)", 
-            "- Luego 'Ejecutar BFS'"
-        ]
-        
-        for i, linea in enumerate(instrucciones_bfs):
-            texto = font.render(linea, True, BLACK)
-            screen.blit(texto, (panel_bfs_x, 200 + i * 30))
-        
-        pygame.display.flip()
+                for nombre, boton in botones_izq.items():
+                    if boton.collidepoint(x, y) and inicio_izq and meta_izq:
+                        algoritmo_elegido = nombre
+                        datos_elegidos = (inicio_izq, meta_izq, mundo_izq, 0)
+                        seleccionando = False
+
+                for nombre, boton in botones_der.items():
+                    if boton.collidepoint(x, y) and inicio_der and meta_der:
+                        algoritmo_elegido = nombre
+                        datos_elegidos = (inicio_der, meta_der, mundo_der, WINDOW_SIZE + 400)
+                        seleccionando = False
+
+        # Repintar solo el lado que cambió (el resto del frame queda igual)
+        if sucio_izq:
+            dibujar_lado(0, camara_izq, mundo_izq, inicio_izq, meta_izq, "Cuadrícula izquierda", BLACK,
+                         botones_izq, (0, 200, 0), instrucciones_izq)
+            sucio_izq = False
+        if sucio_der:
+            dibujar_lado(WINDOW_SIZE + 400, camara_der, mundo_der, inicio_der, meta_der,
+                         "CUADRÍCULA DERECHA", (0, 0, 200), botones_der, (0, 0, 200), instrucciones_der)
+            sucio_der = False
+
+        sucias.actualizar()
+        if METRICAS_ARRANQUE["primer_frame"] is None:
+            METRICAS_ARRANQUE["primer_frame"] = time.perf_counter() - T_INICIO
         clock.tick(30)
 
     return algoritmo_elegido, datos_elegidos
 
+def dibujar_abeja(screen, camara, paso, offset_x):
+    """Dibuja la abeja en la celda `paso`; con el zoom muy alejado es un punto amarillo."""
+    px, py = camara.a_pantalla(paso)
+    tam = int(camara.tam)
+    if tam >= 12:
+        bee_text = textos.render("🐝", YELLOW, tam + 5)
+        return screen.blit(bee_text, (offset_x + px + tam // 4, py + tam // 4))
+    lado = max(3, tam)
+    centro = (offset_x + px + int(camara.tam / 2), py + int(camara.tam / 2))
+    return screen.fill(YELLOW, pygame.Rect(centro[0] - lado // 2, centro[1] - lado // 2, lado, lado))
+
+
 # Visualizar el mundo y el movimiento del agente
-def mostrar_mundo(mundo, path, inicio, meta, n, algoritmo, obstaculos_totales, tiempo_total):
+def alternar_obstaculo(planificador, mundo, celdas, camara, path, reproductor, celda, meta):
+    """Pone o quita un obstáculo en `celda` y rehace el resto del camino desde la abeja.
+
+    Devuelve (planificador, camino nuevo). Si la abeja queda encerrada, el camino
+    termina donde está.
+    """
+    paso = reproductor.paso_actual()
+    if planificador is None:
+        # El camino que se está animando puede venir de cualquier estrategia: la
+        # primera planificación de D* Lite es completa, las siguientes incrementales
+        planificador = DStarLite(mundo, path[paso], meta)
+        planificador.calcular()
+    planificador.mover(path[paso])
+
+    bloquear = mundo[celda] != OBSTACULO
+    indice_mundo.cambiar_celda(mundo, celda, bloquear)   # el índice de componentes/distancias sigue al mapa
+    mundo[celda] = celdas[celda] = OBSTACULO if bloquear else LIBRE
+    camara.cambio_celda(celda, COLORES_CELDA[celdas[celda]])
+    reexpandidos = planificador.cambiar_celdas([(celda, bloquear)])
+
+    nuevo = planificador.camino()
+    path = path[:paso] + (nuevo if nuevo is not None else [path[paso]])
+    reproductor.cambiar_total(len(path))
+    print(f"{'Obstáculo en' if bloquear else 'Se quitó el obstáculo de'} {celda}: "
+          f"{reexpandidos} celdas reexpandidas"
+          + ("" if nuevo is not None else " (la abeja quedó sin camino)"))
+    return planificador, path
+
+
+def mostrar_mundo(mundo, path, inicio, meta, n, algoritmo, obstaculos_totales, tiempo_total, offset_x=None):
     screen = pygame.display.get_surface()  # Usa la misma ventana existente
-    pygame.display.set_caption(f"Abeja DFS y BFS 🐝")
-    font = pygame.font.Font(None, 25)
-    bee_font = pygame.font.Font(None, CELL_SIZE + 5)
+    pygame.display.set_caption(f"Abeja {algoritmo} 🐝 (espacio: pausa, [ ]: velocidad, Tab: rápido, Fin: saltar, "
+                               f"clic: poner/quitar obstáculo)")
     clock = pygame.time.Clock()
+    sucias = RegionesSucias()
+    panel = PanelTexto(screen, WHITE, sucias)
 
     # Iniciar contadores en tiempo real
-    tiempo_inicio = time.time()
+    cronometro = Cronometro(f"animacion {algoritmo}").iniciar()
     obstaculos_en_tiempo_real = 0
     obstaculos_contados = set()
-
-    # Determinar desplazamiento (izquierda = DFS, derecha = BFS)
-    offset_x = 0 if algoritmo == "DFS" else WINDOW_SIZE + 400
-
-    for paso_index, paso in enumerate(path):
+    flores_pendientes = []  # imágenes tocadas cuya clasificación aún no llegó
+
+    # Determinar desplazamiento (cuadrícula izquierda o derecha de la pantalla de selección)
+    if offset_x is None:
+        offset_x = 0 if algoritmo == "DFS" else WINDOW_SIZE + 400
+
+    # La cuadrícula no cambia durante la animación: la cámara solo vuelve a dibujarla
+    # si se mueve (seguir a la abeja, zoom o paneo); si no, solo se mueve la abeja y
+    # se reescriben los contadores que cambiaron
+    celdas = mundo.copy()
+    celdas[celdas != OBSTACULO] = LIBRE
+    celdas[inicio] = INICIO
+    celdas[meta] = META
+    camara = Camara(n, n, WINDOW_SIZE, WINDOW_SIZE, CELL_SIZE)
+    seguir = True  # la cámara sigue a la abeja; F lo activa/desactiva, arrastrar lo desactiva
+    ventana = pygame.Rect(offset_x, 0, WINDOW_SIZE, WINDOW_SIZE)
+
+    # Limpiar solo el área de la cuadrícula actual (sin borrar otras)
+    area = pygame.Rect(offset_x, 0, WINDOW_SIZE + 300, WINDOW_SIZE)
+    screen.fill(WHITE, area)
+    sucias.marcar(area)
+    panel_x = offset_x + WINDOW_SIZE + 20
+    rect_abeja = None
+
+    # Los obstáculos tocados se muestran en la zona de la otra cuadrícula, sin ventanas aparte
+    if offset_x == 0:
+        zona = (WINDOW_SIZE + 400, 0, WINDOW_WIDTH - WINDOW_SIZE - 400, WINDOW_HEIGHT)
+    else:
+        zona = (0, 0, offset_x, WINDOW_HEIGHT)
+    inspeccion = PanelInspeccion(screen, zona, obtener_clasificacion, texto_clasificacion, sucias)
+
+    # La abeja avanza según el tiempo, no un paso por frame: los eventos se atienden
+    # en cada frame y la velocidad se cambia sin tocar la tasa de frames
+    reproductor = Reproductor(len(path), VELOCIDAD_ANIMACION)
+    dt = 0.0
+
+    # Mundo dinámico: clic izquierdo en la cuadrícula pone o quita un obstáculo y la
+    # abeja replanifica desde donde está con D* Lite (se crea con el primer cambio)
+    path = list(path)
+    planificador = None
+
+    while True:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 pygame.quit()
                 return
-
-        # Limpiar solo el área de la cuadrícula actual (sin borrar otras)
-        pygame.draw.rect(screen, WHITE, (offset_x, 0, WINDOW_SIZE + 300, WINDOW_SIZE))
-
-
-        # Comprobar obstáculos cercanos SOLO si no es la meta
-        obstaculos_cercanos = []
-        if paso != meta:
-            x, y = paso
-            vecinos = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
-            for nx, ny in vecinos:
-                if 0 <= nx < n and 0 <= ny < n:
-                    if mundo[(nx, ny)] == "X":
-                        obstaculos_cercanos.append((nx, ny))
-                        if (nx, ny) not in obstaculos_contados:
-                            obstaculos_contados.add((nx, ny))
-                            obstaculos_en_tiempo_real += 1
+            camara.manejar_evento(event, offset_x, 0)
+            if camara.arrastrando():
+                seguir = False
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_f:
+                    seguir = not seguir
+                elif event.key == pygame.K_SPACE:
+                    reproductor.alternar_pausa()
+                elif event.key == pygame.K_TAB:
+                    reproductor.alternar_avance_rapido()
+                elif event.key == pygame.K_RIGHTBRACKET:
+                    reproductor.cambiar_velocidad(2)
+                elif event.key == pygame.K_LEFTBRACKET:
+                    reproductor.cambiar_velocidad(0.5)
+                elif event.key == pygame.K_END:
+                    reproductor.saltar_al_final()
+            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                celda = camara.celda_en(event.pos[0] - offset_x, event.pos[1])
+                if celda is not None and celda not in (inicio, meta, path[reproductor.paso_actual()]):
+                    planificador, path = alternar_obstaculo(planificador, mundo, celdas, camara, path,
+                                                            reproductor, celda, meta)
+                    ultimo = planificador.historial[-1]
+                    panel.escribir("replanificacion",
+                                   textos.render(f"Replanificación: {ultimo['reexpandidos']} celdas", BLACK),
+                                   (panel_x, 180))
+
+        # Efectos de cada paso alcanzado en este frame (pueden ser varios a velocidad alta)
+        for paso_index in reproductor.avanzar(dt):
+            paso = path[paso_index]
+
+            # Comprobar obstáculos cercanos SOLO si no es la meta
+            obstaculos_cercanos = []
+            if paso != meta:
+                x, y = paso
+                vecinos = [(x+1, y), (x-1, y), (x, y+1), (x, y-1)]
+                for nx, ny in vecinos:
+                    if 0 <= nx < n and 0 <= ny < n:
+                        if mundo[(nx, ny)] == OBSTACULO:
+                            obstaculos_cercanos.append((nx, ny))
+                            if (nx, ny) not in obstaculos_contados:
+                                obstaculos_contados.add((nx, ny))
+                                obstaculos_en_tiempo_real += 1
                         
-                        # Mostrar ventana con la imagen asignada a ese obstáculo (pausa hasta cerrarla)
-                        img_path = OBSTACLE_IMAGE_MAP.get((nx, ny))
-                        if img_path:
-                            mostrar_imagen_ventana(img_path)
-
-        # Dibujar el mundo del algoritmo activo
-        for i in range(n):
-            for j in range(n):
-                valor = mundo[(i, j)]
-                if valor == "X":
-                    color = BLACK
-                elif (i, j) == inicio:
-                    color = GREEN
-                elif (i, j) == meta:
-                    color = RED
-                else:
-                    color = WHITE
-                rect = pygame.Rect(offset_x + j * CELL_SIZE, i * CELL_SIZE, CELL_SIZE, CELL_SIZE)
-                pygame.draw.rect(screen, color, rect)
-                pygame.draw.rect(screen, BLUE, rect, 1)
-
-        # Dibujar la abeja en el camino
-        x, y = paso
-        bee_text = bee_font.render("🐝", True, YELLOW)
-        screen.blit(bee_text, (offset_x + y * CELL_SIZE + CELL_SIZE // 4, x * CELL_SIZE + CELL_SIZE // 4))
+                            # Inspeccionar la imagen asignada a ese obstáculo en el panel (sin pausar)
+                            img_path = OBSTACLE_IMAGE_MAP.get((nx, ny))
+                            if img_path:
+                                flores_pendientes.append(img_path)
+                                inspeccion.encolar((nx, ny), img_path)
+
+        # Sumar las flores cuyo resultado ya llegó (nunca espera al modelo)
+        flores_pendientes = contar_flores(flores_pendientes, algoritmo)
+
+        with etapa("dibujar_cuadricula"):
+            # Posición intermedia entre dos celdas para un movimiento suave
+            posicion = reproductor.interpolar(path)
+            if seguir:
+                camara.seguir(posicion)
+            estatica, redibujada = camara.vista(celdas, COLORES_CELDA, BLUE)
+
+            # Borrar la abeja del paso anterior reponiendo ese trozo de la cuadrícula
+            if rect_abeja is not None:
+                screen.fill(WHITE, rect_abeja)
+                screen.blit(estatica, rect_abeja, area=rect_abeja.move(-offset_x, 0))
+                sucias.marcar(rect_abeja)
+            if redibujada:
+                screen.blit(estatica, ventana)
+                sucias.marcar(ventana)
+
+            # Dibujar la abeja en el camino (sin salirse del área de esta cuadrícula)
+            screen.set_clip(area)
+            rect_abeja = dibujar_abeja(screen, camara, posicion, offset_x)
+            screen.set_clip(None)
+            sucias.marcar(rect_abeja)
 
         # Calcular tiempo transcurrido
-        tiempo_transcurrido = time.time() - tiempo_inicio
-
-        # Mostrar información del algoritmo y estadísticas
-        panel_x = offset_x + WINDOW_SIZE + 20
-        algo_text = font.render(f"Algoritmo: {algoritmo}", True, BLACK)
-        screen.blit(algo_text, (panel_x, 20))
-
-        obstaculos_text = font.render(f"Obstáculos: {obstaculos_en_tiempo_real}", True, BLACK)
-        screen.blit(obstaculos_text, (panel_x, 60))
-        
-        score_text = font.render(f"Flores: {SCORE_FLORES[algoritmo]}", True, (128, 0, 128))
-        screen.blit(score_text, (panel_x, 80))
-
-
-        tiempo_text = font.render(f"Tiempo: {tiempo_transcurrido:.2f}s", True, BLACK)
-        screen.blit(tiempo_text, (panel_x, 100))
-
-        progreso_text = font.render(f"Progreso: {paso_index+1}/{len(path)}", True, BLACK)
-        screen.blit(progreso_text, (panel_x, 140))
-
-        pygame.display.flip()
-        time.sleep(0.6)
-        clock.tick(60)
+        tiempo_transcurrido = cronometro.transcurrido()
+
+        # Mostrar información del algoritmo y estadísticas (solo se repinta lo que cambió)
+        panel.escribir("algoritmo", textos.render(f"Algoritmo: {algoritmo}", BLACK), (panel_x, 20))
+        panel.escribir("obstaculos", textos.render(f"Obstáculos: {obstaculos_en_tiempo_real}", BLACK),
+                       (panel_x, 60))
+        panel.escribir("flores", textos.render(f"Flores: {SCORE_FLORES[algoritmo]}", (128, 0, 128)),
+                       (panel_x, 80))
+        panel.escribir("tiempo", textos.render(f"Tiempo: {tiempo_transcurrido:.2f}s", BLACK), (panel_x, 100))
+        panel.escribir("progreso", textos.render(f"Progreso: {reproductor.paso_actual()+1}/{len(path)}", BLACK),
+                       (panel_x, 140))
+        panel.escribir("velocidad", textos.render(f"Velocidad: {reproductor.texto_velocidad()}", BLACK),
+                       (panel_x, 160))
+
+        inspeccion.actualizar()
+
+        with etapa("display_update"):
+            sucias.actualizar()
+        if reproductor.terminado():
+            break
+        dt = clock.tick(60) / 1000
 
     # Limpiar área del mensaje "Meta alcanzada" (parte inferior de la cuadrícula)
-    pygame.draw.rect(screen, WHITE, (offset_x, WINDOW_SIZE, WINDOW_SIZE, 50))
+    mensaje = pygame.Rect(offset_x, WINDOW_SIZE, WINDOW_SIZE, 50)
+    screen.fill(WHITE, mensaje)
+    sucias.marcar(mensaje)
     
     # Limpiar área del panel lateral (estadísticas)
-    pygame.draw.rect(screen, WHITE, (offset_x + WINDOW_SIZE, 0, 300, WINDOW_HEIGHT))
+    lateral = pygame.Rect(offset_x + WINDOW_SIZE, 0, 300, WINDOW_HEIGHT)
+    screen.fill(WHITE, lateral)
+    sucias.marcar(lateral)
+    panel.olvidar()
 
     # Mostrar texto final (limpio)
-    fin_text = font.render("¡Meta alcanzada!", True, RED)
-    screen.blit(fin_text, (offset_x + 30, WINDOW_SIZE + 20))
+    final = "¡Meta alcanzada!" if path[-1] == meta else "La abeja quedó encerrada"
+    panel.escribir("fin", textos.render(final, RED), (offset_x + 30, WINDOW_SIZE + 20))
 
     # Estadísticas finales (limpias)
-    panel_x = offset_x + WINDOW_SIZE + 20
-    tiempo_final = time.time() - tiempo_inicio
-
-    algo_fin_text = font.render(f"Algoritmo: {algoritmo}", True, BLACK)
-    screen.blit(algo_fin_text, (panel_x, 20))
-
-    obstaculos_fin_text = font.render(f"Obstáculos: {obstaculos_en_tiempo_real}", True, BLACK)
-    screen.blit(obstaculos_fin_text, (panel_x, 60))
-    
-    score_text = font.render(f"Flores: {SCORE_FLORES[algoritmo]}", True, (128, 0, 128))
-    screen.blit(score_text, (panel_x, 80))
-
-    tiempo_fin_text = font.render(f"Tiempo: {tiempo_final:.2f}s", True, BLACK)
-    screen.blit(tiempo_fin_text, (panel_x, 100))
-
-    pasos_fin_text = font.render(f"Pasos: {len(path)}", True, BLACK)
-    screen.blit(pasos_fin_text, (panel_x, 140))
-
-    pygame.display.flip()
+    tiempo_final = cronometro.detener()
+    panel.escribir("algoritmo", textos.render(f"Algoritmo: {algoritmo}", BLACK), (panel_x, 20))
+    panel.escribir("obstaculos", textos.render(f"Obstáculos: {obstaculos_en_tiempo_real}", BLACK),
+                   (panel_x, 60))
+    panel.escribir("flores", textos.render(f"Flores: {SCORE_FLORES[algoritmo]}", (128, 0, 128)),
+                   (panel_x, 80))
+    panel.escribir("tiempo", textos.render(f"Tiempo: {tiempo_final:.2f}s", BLACK), (panel_x, 100))
+    panel.escribir("pasos", textos.render(f"Pasos: {len(path)}", BLACK), (panel_x, 140))
+    sucias.actualizar()
     
-    # Esperar para volver al menú
+    # Esperar para volver al menú (mientras tanto siguen llegando clasificaciones pendientes)
     esperando = True
     while esperando:
         for event in pygame.event.get():
@@ -576,19 +569,46 @@ def mostrar_mundo(mundo, path, inicio, meta, n, algoritmo, obstaculos_totales, t
             if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
                 esperando = False
 
+        if flores_pendientes:
+            flores_pendientes = contar_flores(flores_pendientes, algoritmo)
+            panel.escribir("flores", textos.render(f"Flores: {SCORE_FLORES[algoritmo]}", (128, 0, 128)),
+                           (panel_x, 80))
+        inspeccion.actualizar()
+        sucias.actualizar()
+        clock.tick(30)
+
 
-def mostrar_comparativa(resultados_dfs, resultados_bfs):
-    """Muestra una ventana comparativa entre DFS y BFS según las métricas recolectadas."""
-    if not resultados_dfs or not resultados_bfs:
-        return  # Solo mostrar si ambos existen
+def mostrar_comparativa(resultados):
+    """Muestra una ventana comparativa entre las estrategias registradas según las métricas recolectadas."""
+    if len(resultados) < 2:
+        return  # Solo mostrar si hay al menos dos para comparar
 
-    screen = pygame.display.set_mode((600, 400))
-    pygame.display.set_caption("Comparativa DFS vs BFS 🌸")
+    nombres = list(ESTRATEGIAS)
+    ancho = max(600, 260 + 120 * len(nombres))
+    screen = pygame.display.set_mode((ancho, 400))
+    pygame.display.set_caption("Comparativa de algoritmos 🌸")
 
     font_title = pygame.font.Font(None, 36)
     font_text = pygame.font.Font(None, 28)
     clock = pygame.time.Clock()
 
+    def valor(nombre, metrica):
+        resultado = resultados.get(nombre)
+        if resultado is None:
+            return "—"
+        if metrica == "Flores":
+            return SCORE_FLORES[nombre]
+        if metrica == "Tiempo":
+            return f"{resultado['tiempo']:.3f}s"
+        if metrica == "Nodos expandidos":
+            return resultado['nodos'] if resultado['nodos'] is not None else "—"
+        if metrica == "Obstáculos":
+            return resultado['obstaculos']
+        return len(resultado['camino']) if resultado['camino'] else "—"
+
+    metricas = ["Flores", "Tiempo", "Nodos expandidos", "Obstáculos", "Longitud camino"]
+    colores = [(0, 128, 0), (200, 0, 0), (0, 0, 200), (200, 120, 0), (128, 0, 128)]
+
     running = True
     while running:
         for event in pygame.event.get():
@@ -599,37 +619,26 @@ def mostrar_comparativa(resultados_dfs, resultados_bfs):
 
         screen.fill((255, 255, 255))
 
-        title = font_title.render("Comparativa DFS vs BFS", True, (0, 0, 0))
-        screen.blit(title, (150, 20))
-
-        headers = ["Métrica", "DFS", "BFS"]
-        datos = [
-            ("Flores", SCORE_FLORES["DFS"], SCORE_FLORES["BFS"]),
-            ("Tiempo", f"{resultados_dfs['tiempo']:.2f}s", f"{resultados_bfs['tiempo']:.2f}s"),
-            ("Obstáculos", resultados_dfs['obstaculos'], resultados_bfs['obstaculos']),
-            ("Longitud camino",
-             len(resultados_dfs['camino']) if resultados_dfs['camino'] else "—",
-             len(resultados_bfs['camino']) if resultados_bfs['camino'] else "—")
-        ]
+        title = font_title.render("Comparativa de algoritmos", True, (0, 0, 0))
+        screen.blit(title, title.get_rect(centerx=ancho // 2, y=20))
 
         # Dibujar encabezados
-        x_positions = [100, 300, 450]
-        for i, header in enumerate(headers):
+        x_positions = [40] + [260 + 120 * k for k in range(len(nombres))]
+        for i, header in enumerate(["Métrica"] + nombres):
             text = font_text.render(header, True, (0, 0, 200))
             screen.blit(text, (x_positions[i], 80))
 
         # Dibujar filas
-        for row_index, (metrica, dfs_val, bfs_val) in enumerate(datos):
-            y = 130 + row_index * 50
-            metrica_text = font_text.render(str(metrica), True, (0, 0, 0))
-            dfs_text = font_text.render(str(dfs_val), True, (0, 128, 0))
-            bfs_text = font_text.render(str(bfs_val), True, (200, 0, 0))
-            screen.blit(metrica_text, (100, y))
-            screen.blit(dfs_text, (300, y))
-            screen.blit(bfs_text, (450, y))
+        for row_index, metrica in enumerate(metricas):
+            y = 130 + row_index * 40
+            metrica_text = font_text.render(metrica, True, (0, 0, 0))
+            screen.blit(metrica_text, (40, y))
+            for k, nombre in enumerate(nombres):
+                val_text = font_text.render(str(valor(nombre, metrica)), True, colores[k % len(colores)])
+                screen.blit(val_text, (x_positions[k + 1], y))
 
         nota = font_text.render("Presiona una tecla o haz clic para continuar", True, (100, 100, 100))
-        screen.blit(nota, (100, 340))
+        screen.blit(nota, (40, 350))
 
         pygame.display.flip()
         clock.tick(30)
@@ -640,102 +649,128 @@ def mostrar_comparativa(resultados_dfs, resultados_bfs):
 # Programa principal CORREGIDO
 if __name__ == "__main__":
     pygame.init()
-    mundo = crear_mundo(N)
+    mundo = crear_mundo(N, N * N // 5, semilla=SEMILLA, disposicion=DISPOSICION)
     
     
     # Cargar imágenes y asignarlas aleatoriamente a cada obstáculo
     try:
-        imagenes_sub = cargar_imagenes_de_carpeta('imagenes_sub')
-        imagenes_sobre = cargar_imagenes_de_carpeta('imagenes_sobre')
-        
-        # Unir ambas listas en una sola
-        imagenes = imagenes_sub + imagenes_sobre
+        if VIGILAR_IMAGENES:
+            # Índice vivo: las carpetas se recorren una vez y después se siguen sus cambios
+            INDICE_IMAGENES = IndiceImagenes()
+            INDICE_IMAGENES.escanear()
+            INDICE_IMAGENES.recoger_cambios()
+            print(f"Vigilando las carpetas de imágenes ({INDICE_IMAGENES.vigilar().modo}).")
+            imagenes = INDICE_IMAGENES.rutas()
+        else:
+            # Ambas carpetas en una sola lista (del índice del paquete si está al día)
+            imagenes = cargar_imagenes_dataset()
         
         OBSTACLE_IMAGE_MAP = asignar_imagenes_a_obstaculos(mundo, imagenes)
         print(f"Se cargaron {len(imagenes)} imágenes en total.")
+        if AGRUPAR_VARIANTES:
+            from variantes import agrupar_variantes
+            # Agrupar todo el dataset de una vez: así cada par se encuentra aunque sus dos
+            # variantes se clasifiquen en episodios distintos
+            representantes = agrupar_variantes(imagenes)
+            print(f"Variantes agrupadas: {len(set(representantes.values()))} fotos distintas.")
         
     except Exception as e:
         print("Aviso: no se pudieron cargar imágenes:", e)
         OBSTACLE_IMAGE_MAP = {}
     
-    # Variables para guardar resultados
-    resultado_dfs = None
-    resultado_bfs = None
+    # Clasificador en segundo plano: la animación nunca espera al modelo
+    ANTICIPADA = ClasificacionAnticipada(candidate_labels=ETIQUETAS, agrupar_variantes=AGRUPAR_VARIANTES)
+    metricas_reportadas = False
+
+    # Resultados guardados por estrategia
+    resultados = {}
+    trazas = EscritorTrazas(RUTA_TRAZAS) if RUTA_TRAZAS else None
     
     ejecutando = True
     while ejecutando:
+        if INDICE_IMAGENES is not None:
+            aplicar_cambios_de_imagenes(mundo)
         algoritmo, datos = elegir_puntos_separados(mundo, N)
 
         if algoritmo and datos:
-            inicio, meta, mundo_elegido = datos
-
-            inicio_tiempo = time.time()
-
-            if algoritmo == "DFS":
-                camino, obstaculos_detectados = dfs(mundo_elegido, inicio, meta, N)
-                # GUARDAR RESULTADO DFS
-                resultado_dfs = {
+            inicio, meta, mundo_elegido, offset_x = datos
+            buscar = ESTRATEGIAS[algoritmo]
+            estadisticas = {"orden_expansion": array("i")} if trazas is not None else {}
+            # Copia del mundo tal como se buscó (durante la animación se pueden agregar obstáculos)
+            mundo_buscado = mundo_elegido.copy() if trazas is not None else None
+
+            # Un episodio = búsqueda + animación (cProfile/tracemalloc opcionales)
+            with episodio(algoritmo):
+                # Solo la búsqueda: los print de la consola quedan fuera de la medición
+                with Cronometro(f"busqueda {algoritmo}") as medicion:
+                    # Si la meta está en otra componente conexa no hace falta agotar la búsqueda
+                    alcanzable = indice_de(mundo_elegido).alcanzable(inicio, meta)
+                    if alcanzable:
+                        camino, obstaculos_detectados = buscar(mundo_elegido, inicio, meta, N, estadisticas=estadisticas)
+                    else:
+                        camino, obstaculos_detectados = None, 0
+                        estadisticas['nodos_expandidos'] = 0
+                tiempo_ejecucion = medicion.duracion
+                if not alcanzable:
+                    print("La meta no es alcanzable desde el inicio (están en componentes distintas).")
+
+                # GUARDAR RESULTADO
+                resultados[algoritmo] = {
                     'camino': camino,
                     'obstaculos': obstaculos_detectados,
-                    'tiempo': 0,  # Se actualizará después
+                    'tiempo': tiempo_ejecucion,
+                    'nodos': estadisticas.get('nodos_expandidos'),
                     'inicio': inicio,
                     'meta': meta,
                     'exitoso': camino is not None
                 }
 
-            elif algoritmo == "BFS":
-                camino, obstaculos_detectados = bfs(mundo_elegido, inicio, meta, N)
-                # GUARDAR RESULTADO BFS
-                resultado_bfs = {
-                    'camino': camino,
-                    'obstaculos': obstaculos_detectados,
-                    'tiempo': 0,  # Se actualizará después
-                    'inicio': inicio,
-                    'meta': meta,
-                    'exitoso': camino is not None
-                }
-
-            fin_tiempo = time.time()
-            tiempo_ejecucion = fin_tiempo - inicio_tiempo
-            
-            # Actualizar tiempo en los resultados
-            if algoritmo == "DFS" and resultado_dfs:
-                resultado_dfs['tiempo'] = tiempo_ejecucion
-            elif algoritmo == "BFS" and resultado_bfs:
-                resultado_bfs['tiempo'] = tiempo_ejecucion
-
-            if camino:
-                print(f"Ruta encontrada con {algoritmo}: {camino}")
-                mostrar_mundo(mundo_elegido, camino, inicio, meta, N, algoritmo, obstaculos_detectados, tiempo_ejecucion)
-            else:
-                print("No se encontró ruta :(")
-                print(f"Obstáculos detectados: {obstaculos_detectados}")
-                print(f"Tiempo: {tiempo_ejecucion:.2f}s")
+                if camino:
+                    print(f"Ruta encontrada con {algoritmo}: {camino}")
+                    # Clasificar por adelantado los obstáculos junto al camino, en orden de llegada
+                    rutas_adelantadas = [OBSTACLE_IMAGE_MAP[pos]
+                                         for pos in obstaculos_adyacentes(mundo_elegido, camino, meta, N)
+                                         if pos in OBSTACLE_IMAGE_MAP]
+                    ANTICIPADA.encolar(rutas_adelantadas)
+                    mostrar_mundo(mundo_elegido, camino, inicio, meta, N, algoritmo, obstaculos_detectados, tiempo_ejecucion,
+                                  offset_x=offset_x)
+                else:
+                    print("No se encontró ruta :(")
+                    print(f"Obstáculos detectados: {obstaculos_detectados}")
+                    print(f"Tiempo: {tiempo_ejecucion:.2f}s")
+
+            if trazas is not None:
+                # Después de la animación: las etiquetas de lo tocado ya llegaron (o quedan vacías)
+                recoger_clasificaciones()
+                trazas.escribir(armar_traza(
+                    mundo_buscado, inicio, meta, camino, algoritmo, episodio=trazas.registros,
+                    semilla=SEMILLA, disposicion=DISPOSICION, orden=estadisticas.get("orden_expansion", ()),
+                    obstaculos_busqueda=obstaculos_detectados, nodos=estadisticas.get("nodos_expandidos"),
+                    mapa_imagenes=OBSTACLE_IMAGE_MAP, clasificaciones=CLASIFICACIONES,
+                    tiempos={"busqueda": tiempo_ejecucion}))
             
+            if not metricas_reportadas and proveedor.listo():
+                reportar_metricas_arranque()
+                metricas_reportadas = True
+
             # MOSTRAR RESULTADOS EN CONSOLA
             print("\n" + "="*50)
             print("RESULTADOS ACTUALES:")
             print("="*50)
             
-            if resultado_dfs:
-                if resultado_dfs['exitoso']:
-                    print(f"✅ DFS: {len(resultado_dfs['camino'])} pasos, {resultado_dfs['obstaculos']} obstáculos, {resultado_dfs['tiempo']:.2f}s, 🌸 Score: {SCORE_FLORES['DFS']}")
+            for nombre in ESTRATEGIAS:
+                resultado = resultados.get(nombre)
+                if resultado:
+                    if resultado['exitoso']:
+                        print(f"✅ {nombre}: {len(resultado['camino'])} pasos, {resultado['obstaculos']} obstáculos, {resultado['nodos']} nodos, {resultado['tiempo']:.3f}s, 🌸 Score: {SCORE_FLORES[nombre]}")
+                    else:
+                        print(f"❌ {nombre}: No encontró camino, {resultado['obstaculos']} obstáculos, {resultado['nodos']} nodos, {resultado['tiempo']:.3f}s")
                 else:
-                    print(f"❌ DFS: No encontró camino, {resultado_dfs['obstaculos']} obstáculos, {resultado_dfs['tiempo']:.2f}s")
-            else:
-                print("🔵 DFS: Aún no ejecutado")
-                
-            if resultado_bfs:
-                if resultado_bfs['exitoso']:
-                    print(f"✅ BFS: {len(resultado_bfs['camino'])} pasos, {resultado_bfs['obstaculos']} obstáculos, {resultado_bfs['tiempo']:.2f}s, 🌸 Score: {SCORE_FLORES['BFS']}")
-                else:
-                    print(f"❌ BFS: No encontró camino, {resultado_bfs['obstaculos']} obstáculos, {resultado_bfs['tiempo']:.2f}s")
-            else:
-                print("🔵 BFS: Aún no ejecutado")
+                    print(f"🔵 {nombre}: Aún no ejecutado")
             
-            # Si ambos algoritmos se ejecutaron, mostrar comparativa
-            if resultado_dfs and resultado_bfs:
-                mostrar_comparativa(resultado_dfs, resultado_bfs)
+            # Si se ejecutaron al menos dos algoritmos, mostrar comparativa
+            if len(resultados) >= 2:
+                mostrar_comparativa(resultados)
 
             
             print("="*50)
@@ -746,4 +781,9 @@ if __name__ == "__main__":
             print("No se definieron los puntos de inicio y meta.")
             ejecutando = False
 
+    ANTICIPADA.cerrar()
+    if INDICE_IMAGENES is not None:
+        INDICE_IMAGENES.detener()
+    if trazas is not None:
+        trazas.cerrar()
     pygame.quit()
\ No newline at end of file
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from cache_embeddings import hash_contenido
+from preprocesamiento import CARPETAS, CLIP_LIMIT, TILE_GRID, clahe_para
+
+# Paquete del dataset: todas las imágenes decodificadas una vez en un solo archivo
+# uint8 contiguo (memory-mapped) con los planos gris y CLAHE a tamaño de miniatura,
+# más un índice JSON con offset, forma, archivo, exposición, hash y firma de cada imagen.
+# Leer una imagen del paquete es aritmética de punteros: no hay listdir ni JPEG.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAQUETE_DIR = os.path.join(BASE_DIR, ".paquete_imagenes")
+
+# Lado máximo de las miniaturas guardadas (se conserva la proporción)
+TAM_MAXIMO = 256
+
+# Planos guardados por imagen, uno detrás del otro
+PLANOS = ("gris", "clahe")
+
+VERSION = 2
+
+
+def exposicion_de(carpeta):
+    """"imagenes_sub" -> "sub", "imagenes_sobre" -> "sobre"."""
+    return carpeta.rsplit("_", 1)[-1]
+
+
+def nombre_base(archivo):
+    """Nombre de la foto sin la marca de exposición: "Viola_sub.jpg" -> "Viola"."""
+    raiz = os.path.splitext(os.path.basename(archivo))[0]
+    for sufijo in ("_sub", "_sobre"):
+        if raiz.endswith(sufijo):
+            return raiz[:-len(sufijo)]
+    return raiz
+
+
+def _firma_carpetas(carpetas):
+    # Cambia si se agregan, quitan o renombran archivos (sin recorrer cada imagen)
+    firma = {}
+    for carpeta in carpetas:
+        ruta = os.path.join(BASE_DIR, carpeta)
+        firma[carpeta] = os.stat(ruta).st_mtime_ns if os.path.isdir(ruta) else None
+    return firma
+
+
+def _firma_archivo(ruta):
+    # Cambia si el archivo se reescribe en el lugar (eso no toca la fecha de la carpeta)
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _planos_de(ruta, tam_maximo, clip_limit, tile_grid):
+    import cv2
+    firma = _firma_archivo(ruta)
+    gris = cv2.imread(ruta, cv2.IMREAD_GRAYSCALE)
+    if gris is None:
+        return None
+    # CLAHE a resolución completa (como el clasificador) y después se reduce
+    clahe = clahe_para(clip_limit, tile_grid).apply(gris)
+    alto, ancho = gris.shape
+    escala = min(1.0, tam_maximo / max(alto, ancho))
+    forma = (max(1, round(alto * escala)), max(1, round(ancho * escala)))
+    if forma != (alto, ancho):
+        gris = cv2.resize(gris, forma[::-1], interpolation=cv2.INTER_AREA)
+        clahe = cv2.resize(clahe, forma[::-1], interpolation=cv2.INTER_AREA)
+    return gris, clahe, hash_contenido(ruta), firma
+
+
+def construir_paquete(directorio=PAQUETE_DIR, carpetas=CARPETAS, tam_maximo=TAM_MAXIMO,
+                      clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID, hilos=None):
+    """Decodifica el dataset y escribe datos.bin + indice.json en `directorio`."""
+    from imagenes import cargar_imagenes_de_carpeta
+
+    fuentes = []
+    for carpeta in carpetas:
+        for ruta in sorted(cargar_imagenes_de_carpeta(carpeta)):
+            fuentes.append((carpeta, ruta))
+
+    with ThreadPoolExecutor(max_workers=hilos or os.cpu_count()) as pool:
+        planos = list(pool.map(lambda f: _planos_de(f[1], tam_maximo, clip_limit, tile_grid), fuentes))
+
+    entradas = []
+    offset = 0
+    for (carpeta, ruta), resultado in zip(fuentes, planos):
+        if resultado is None:
+            print(f"No se pudo cargar la imagen {ruta}")
+            continue
+        alto, ancho = resultado[0].shape
+        entradas.append({
+            "archivo": os.path.relpath(ruta, BASE_DIR),
+            "exposicion": exposicion_de(carpeta),
+            "base": nombre_base(ruta),
+            "hash": resultado[2],
+            "firma": resultado[3],
+            "forma": [alto, ancho],
+            "offset": offset,
+        })
+        offset += alto * ancho * len(PLANOS)
+
+    os.makedirs(directorio, exist_ok=True)
+    ruta_datos = os.path.join(directorio, "datos.bin")
+    tmp_datos = ruta_datos + ".tmp"
+    datos = np.memmap(tmp_datos, dtype=np.uint8, mode="w+", shape=(max(offset, 1),))
+    resultados = [r for r in planos if r is not None]
+    for entrada, resultado in zip(entradas, resultados):
+        inicio = entrada["offset"]
+        for plano in resultado[:len(PLANOS)]:
+            datos[inicio:inicio + plano.size] = plano.ravel()
+            inicio += plano.size
+    datos.flush()
+    del datos
+    os.replace(tmp_datos, ruta_datos)
+
+    indice = {
+        "version": VERSION,
+        "planos": list(PLANOS),
+        "tam_maximo": tam_maximo,
+        "clahe": {"clip_limit": clip_limit, "tile_grid": list(tile_grid)},
+        "carpetas": _firma_carpetas(carpetas),
+        "bytes": offset,
+        "entradas": entradas,
+    }
+    ruta_indice = os.path.join(directorio, "indice.json")
+    with open(ruta_indice + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(indice, f)
+    os.replace(ruta_indice + ".tmp", ruta_indice)
+    return PaqueteImagenes(directorio)
+
+
+class PaqueteImagenes:
+    """Lectura del paquete: cada plano es una vista NumPy sobre el mmap (sin copias)."""
+
+    def __init__(self, directorio=PAQUETE_DIR):
+        self.directorio = directorio
+        with open(os.path.join(directorio, "indice.json"), encoding="utf-8") as f:
+            self.indice = json.load(f)
+        if self.indice.get("version") != VERSION:
+            raise ValueError(f"Versión de paquete no soportada: {self.indice.get('version')}")
+        self.entradas = self.indice["entradas"]
+        self.planos = self.indice["planos"]
+        self.datos = np.memmap(os.path.join(directorio, "datos.bin"), dtype=np.uint8, mode="r")
+        self._por_archivo = {e["archivo"]: i for i, e in enumerate(self.entradas)}
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def rutas(self):
+        """Rutas absolutas de las imágenes, en el orden del paquete."""
+        return [os.path.join(BASE_DIR, e["archivo"]) for e in self.entradas]
+
+    def posicion(self, ruta):
+        """Índice de la imagen en el paquete (None si no está)."""
+        return self._por_archivo.get(os.path.relpath(os.path.abspath(ruta), BASE_DIR))
+
+    def plano(self, i, nombre="clahe"):
+        """Vista (alto, ancho) de solo lectura del plano `nombre` de la imagen i."""
+        entrada = self.entradas[i]
+        alto, ancho = entrada["forma"]
+        inicio = entrada["offset"] + self.planos.index(nombre) * alto * ancho
+        return self.datos[inicio:inicio + alto * ancho].reshape(alto, ancho)
+
+    def iterar(self, nombre="clahe"):
+        """(entrada, plano) para todas las imágenes."""
+        for i, entrada in enumerate(self.entradas):
+            yield entrada, self.plano(i, nombre)
+
+    def al_dia(self, carpetas=CARPETAS):
+        """True si ninguna carpeta ni imagen cambió desde que se construyó el paquete.
+
+        Las carpetas delatan archivos agregados o quitados; un stat por imagen, los
+        reescritos en el lugar (sin leer ni decodificar nada).
+        """
+        if self.indice.get("carpetas") != _firma_carpetas(carpetas):
+            return False
+        return all(_firma_archivo(os.path.join(BASE_DIR, e["archivo"])) == e["firma"] for e in self.entradas)
+
+
+def abrir_paquete(directorio=PAQUETE_DIR, construir=False):
+    """Abre el paquete si existe y está al día; si no, lo construye (o devuelve None)."""
+    try:
+        paquete = PaqueteImagenes(directorio)
+        if paquete.al_dia():
+            return paquete
+    except (OSError, ValueError, KeyError):
+        pass
+    return construir_paquete(directorio) if construir else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Empaqueta el dataset de imágenes en un archivo memory-mapped")
+    parser.add_argument("--directorio", default=PAQUETE_DIR)
+    parser.add_argument("--tam", type=int, default=TAM_MAXIMO, help="lado máximo de las miniaturas")
+    parser.add_argument("--hilos", type=int, default=None)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    paquete = construir_paquete(args.directorio, tam_maximo=args.tam, hilos=args.hilos)
+    print(f"{len(paquete)} imágenes empaquetadas en {time.perf_counter() - t0:.2f}s "
+          f"({paquete.indice['bytes'] / 1e6:.1f} MB) en {args.directorio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from instrumentacion import contar, etapa
+
+# Etapa de preprocesamiento compartida (clasificador, panel de inspección, lotes):
+# escala de grises, ecualización global y CLAHE de cada imagen, con una caché LRU
+# limitada por memoria. Las imágenes se repiten entre obstáculos, así que cada
+# variante se calcula una sola vez.
+
+# Memoria máxima de la caché de variantes
+PRESUPUESTO_MB = 128
+
+# Parámetros de CLAHE por defecto (los mismos que el clasificador y la ventana original)
+CLIP_LIMIT = 1.0
+TILE_GRID = (8, 8)
+
+VARIANTES = ("gris", "eq_hist", "clahe")
+
+# Carpetas del dataset
+CARPETAS = ("imagenes_sub", "imagenes_sobre")
+
+
+# Un objeto CLAHE por juego de parámetros y por hilo (apply no es seguro entre hilos)
+_clahes = threading.local()
+
+
+def clahe_para(clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    import cv2
+    instancias = getattr(_clahes, "instancias", None)
+    if instancias is None:
+        instancias = _clahes.instancias = {}
+    clave = (float(clip_limit), tuple(tile_grid))
+    if clave not in instancias:
+        instancias[clave] = cv2.createCLAHE(clipLimit=clave[0], tileGridSize=clave[1])
+    return instancias[clave]
+
+
+class CachePreprocesado:
+    """LRU de arreglos ya procesados, limitada por bytes en vez de por cantidad."""
+
+    def __init__(self, presupuesto_bytes=PRESUPUESTO_MB * 1024 * 1024):
+        self.presupuesto = presupuesto_bytes
+        self.usados = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self._datos = OrderedDict()   # clave -> (valor, bytes)
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        """Devuelve el valor guardado o lo calcula con calcular() (fuera del lock)."""
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.aciertos += 1
+                contar("preprocesado_aciertos")
+                return self._datos[clave][0]
+            self.fallos += 1
+        valor = calcular()
+        if valor is not None:
+            self.guardar(clave, valor)
+        return valor
+
+    def guardar(self, clave, valor):
+        arreglos = valor if isinstance(valor, (list, tuple)) else [valor]
+        tamano = 0
+        for arreglo in arreglos:
+            # Se comparten entre llamadas: nadie debe modificarlos
+            arreglo.flags.writeable = False
+            tamano += arreglo.nbytes
+        if tamano > self.presupuesto:
+            return
+        with self._lock:
+            if clave in self._datos:
+                return
+            self._datos[clave] = (valor, tamano)
+            self.usados += tamano
+            while self.usados > self.presupuesto:
+                _, (_, liberados) = self._datos.popitem(last=False)
+                self.usados -= liberados
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.usados = 0
+
+    def olvidar(self, rutas):
+        """Descarta lo calculado para esas rutas (el archivo cambió o se borró)."""
+        rutas = set(rutas)
+        with self._lock:
+            for clave in [c for c in self._datos if c[0] in rutas]:
+                _, liberados = self._datos.pop(clave)
+                self.usados -= liberados
+
+
+cache = CachePreprocesado()
+
+
+def leer_gris(ruta):
+    """Imagen en escala de grises (None si no se puede leer)."""
+    def calcular():
+        import cv2
+        with etapa("imread"):
+            return cv2.imread(ruta, cv2.IMREAD_GRAYSCALE)
+    return cache.obtener((ruta, "gris"), calcular)
+
+
+def ecualizar(ruta):
+    def calcular():
+        import cv2
+        gris = leer_gris(ruta)
+        if gris is None:
+            return None
+        with etapa("equalizeHist"):
+            return cv2.equalizeHist(gris)
+    return cache.obtener((ruta, "eq_hist"), calcular)
+
+
+def aplicar_clahe(ruta, clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    def calcular():
+        gris = leer_gris(ruta)
+        if gris is None:
+            return None
+        with etapa("clahe"):
+            return clahe_para(clip_limit, tile_grid).apply(gris)
+    return cache.obtener((ruta, "clahe", float(clip_limit), tuple(tile_grid)), calcular)
+
+
+def vistas(ruta, clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    """(gris, eq_hist, clahe) de la imagen, o None si no se puede leer."""
+    gris = leer_gris(ruta)
+    if gris is None:
+        return None
+    return gris, ecualizar(ruta), aplicar_clahe(ruta, clip_limit, tile_grid)
+
+
+def miniaturas(ruta, max_w, max_h, clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    """Las tres vistas en RGB, reducidas con LANCZOS para caber en max_w x max_h."""
+    def calcular():
+        tres = vistas(ruta, clip_limit, tile_grid)
+        if tres is None:
+            return None
+        reducidas = []
+        with etapa("miniaturas_lanczos"):
+            for gris in tres:
+                im = Image.fromarray(gris).convert("RGB")
+                im.thumbnail((max_w, max_h), Image.Resampling.LANCZOS)
+                reducidas.append(np.asarray(im))
+        return reducidas
+    return cache.obtener((ruta, "miniaturas", max_w, max_h, float(clip_limit), tuple(tile_grid)), calcular)
+
+
+def rutas_dataset(carpetas=CARPETAS):
+    from imagenes import cargar_imagenes_dataset
+    return cargar_imagenes_dataset(carpetas)
+
+
+def _guardar_variantes(ruta, tres, salida):
+    import cv2
+    carpeta = os.path.join(salida, os.path.basename(os.path.dirname(ruta)))
+    os.makedirs(carpeta, exist_ok=True)
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    for variante, arreglo in zip(VARIANTES, tres):
+        cv2.imwrite(os.path.join(carpeta, f"{nombre}_{variante}.png"), arreglo)
+
+
+def preprocesar_lote(rutas, hilos=None, salida=None, clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    """Calcula las tres variantes de todas las imágenes en un pool de hilos.
+
+    OpenCV suelta el GIL al decodificar y ecualizar, así que los hilos escalan.
+    Con `salida` además se escriben como PNG en salida/<carpeta>/<nombre>_<variante>.png.
+    Los arreglos no se juntan: quedan en la caché hasta donde alcance su presupuesto.
+    Devuelve la lista de rutas procesadas (sin las que no se pudieron leer).
+    """
+    def procesar(ruta):
+        tres = vistas(ruta, clip_limit, tile_grid)
+        if tres is not None and salida:
+            _guardar_variantes(ruta, tres, salida)
+        return ruta, tres is not None
+
+    procesadas = []
+    with ThreadPoolExecutor(max_workers=hilos or os.cpu_count()) as pool:
+        for ruta, ok in pool.map(procesar, rutas):
+            if ok:
+                procesadas.append(ruta)
+            else:
+                print(f"No se pudo cargar la imagen {ruta}")
+    return procesadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Preprocesa las imágenes del dataset (gris, ecualización, CLAHE)")
+    parser.add_argument("--hilos", type=int, default=None)
+    parser.add_argument("--salida", default=None, help="carpeta donde escribir las variantes como PNG")
+    parser.add_argument("--clip-limit", type=float, default=CLIP_LIMIT)
+    parser.add_argument("--tiles", type=int, default=TILE_GRID[0])
+    args = parser.parse_args()
+
+    rutas = rutas_dataset()
+    t0 = time.perf_counter()
+    procesadas = preprocesar_lote(rutas, args.hilos, args.salida, args.clip_limit, (args.tiles, args.tiles))
+    duracion = time.perf_counter() - t0
+    print(f"{len(procesadas)} imágenes en {duracion:.2f}s ({len(procesadas) / duracion:.1f} img/s, "
+          f"{cache.usados / 1e6:.1f} MB en caché)")
+    if args.salida:
+        print(f"Variantes guardadas en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
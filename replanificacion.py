@@ -0,0 +1,240 @@
+import argparse
+import heapq
+import math
+import random
+import time
+
+import numpy as np
+
+from cuadricula import OBSTACULO, LIBRE, celdas_bloqueadas
+from busqueda import _orden_expansion, a_estrella, registrar_estrategia, vecinos_planos
+
+# Replanificación incremental con D* Lite (Koenig y Likhachev): la búsqueda va de la
+# meta hacia la abeja y guarda g/rhs de cada celda, así que cuando una celda cambia
+# (aparece o desaparece un obstáculo) solo se vuelven a expandir las celdas cuyo costo
+# hasta la meta se vio afectado, no todo el mapa.
+
+INF = math.inf
+
+
+class DStarLite:
+    """Planificador D* Lite sobre la cuadrícula 4-conectada (costo 1 por paso)."""
+
+    def __init__(self, mundo, inicio, meta):
+        self.n = n = mundo.shape[0]
+        self.bloqueado = bytearray(celdas_bloqueadas(mundo))
+        self.inicio = inicio[0] * n + inicio[1]
+        self.meta = meta[0] * n + meta[1]
+        self.ultimo = self.inicio     # posición de la abeja en el último cambio (para km)
+        self.km = 0
+        self.g = [INF] * (n * n)
+        self.rhs = [INF] * (n * n)
+        self.rhs[self.meta] = 0
+        self.abiertos = []            # montículo de (k1, k2, celda), con entradas viejas
+        self.en_cola = {}             # celda -> clave vigente en el montículo
+        self._encolar(self.meta)
+
+        # Contadores: expansiones totales y por replanificación
+        self.expandidos = 0
+        self.obstaculos_detectados = 0
+        self.historial = []           # [{"cambios": k, "reexpandidos": m, "tiempo_s": t}]
+        self.orden = None             # array("i") donde anotar las celdas expandidas (trazas)
+
+    def _h(self, a, b):
+        ax, ay = divmod(a, self.n)
+        bx, by = divmod(b, self.n)
+        return abs(ax - bx) + abs(ay - by)
+
+    def _clave(self, celda):
+        minimo = min(self.g[celda], self.rhs[celda])
+        return (minimo + self._h(self.inicio, celda) + self.km, minimo)
+
+    def _encolar(self, celda):
+        clave = self._clave(celda)
+        self.en_cola[celda] = clave
+        heapq.heappush(self.abiertos, (clave[0], clave[1], celda))
+
+    def _tope(self):
+        """Clave vigente más chica (descarta las entradas viejas del montículo)."""
+        while self.abiertos:
+            k1, k2, celda = self.abiertos[0]
+            if self.en_cola.get(celda) == (k1, k2):
+                return (k1, k2), celda
+            heapq.heappop(self.abiertos)
+        return (INF, INF), None
+
+    def _actualizar(self, celda):
+        if celda != self.meta:
+            if self.bloqueado[celda]:
+                self.rhs[celda] = INF
+            else:
+                g = self.g
+                self.rhs[celda] = 1 + min((g[v] for v in vecinos_planos(celda, self.n) if not self.bloqueado[v]),
+                                          default=INF)
+        self.en_cola.pop(celda, None)
+        if self.g[celda] != self.rhs[celda]:
+            self._encolar(celda)
+
+    def calcular(self):
+        """Propaga los cambios pendientes hasta que el camino desde la abeja es óptimo.
+
+        Devuelve cuántas celdas se expandieron en esta llamada.
+        """
+        expandidos = 0
+        g, rhs = self.g, self.rhs
+        while True:
+            clave, celda = self._tope()
+            if not (clave < self._clave(self.inicio) or rhs[self.inicio] != g[self.inicio]):
+                break
+            if celda is None:
+                break
+            heapq.heappop(self.abiertos)
+            nueva = self._clave(celda)
+            if clave < nueva:
+                self._encolar(celda)
+                continue
+            del self.en_cola[celda]
+            expandidos += 1
+            if self.orden is not None:
+                self.orden.append(celda)
+            if g[celda] > rhs[celda]:
+                g[celda] = rhs[celda]
+            else:
+                g[celda] = INF
+                self._actualizar(celda)
+            for vecino in vecinos_planos(celda, self.n):
+                if self.bloqueado[vecino]:
+                    self.obstaculos_detectados += 1
+                else:
+                    self._actualizar(vecino)
+        self.expandidos += expandidos
+        return expandidos
+
+    def mover(self, celda):
+        """La abeja avanzó a `celda` (fila, columna): el próximo camino sale de ahí."""
+        self.inicio = celda[0] * self.n + celda[1]
+
+    def cambiar_celdas(self, cambios):
+        """Aplica [(celda, bloqueada)] y replanifica; devuelve las celdas reexpandidas."""
+        t0 = time.perf_counter()
+        self.km += self._h(self.ultimo, self.inicio)
+        self.ultimo = self.inicio
+        afectadas = set()
+        for (fila, col), bloqueada in cambios:
+            celda = fila * self.n + col
+            if bool(self.bloqueado[celda]) == bool(bloqueada):
+                continue
+            self.bloqueado[celda] = 1 if bloqueada else 0
+            if bloqueada:
+                self.g[celda] = INF
+            afectadas.add(celda)
+            afectadas.update(vecinos_planos(celda, self.n))
+        for celda in afectadas:
+            self._actualizar(celda)
+        reexpandidos = self.calcular()
+        self.historial.append({"cambios": len(cambios), "reexpandidos": reexpandidos,
+                               "tiempo_s": time.perf_counter() - t0})
+        return reexpandidos
+
+    def camino(self):
+        """Camino más corto actual desde la abeja hasta la meta, o None si no hay."""
+        if self.g[self.inicio] == INF:
+            return None
+        n = self.n
+        actual = self.inicio
+        camino = [divmod(actual, n)]
+        while actual != self.meta:
+            siguiente = min((v for v in vecinos_planos(actual, n) if not self.bloqueado[v]),
+                            key=lambda v: self.g[v], default=None)
+            if siguiente is None or self.g[siguiente] == INF:
+                return None
+            actual = siguiente
+            camino.append(divmod(actual, n))
+        return camino
+
+
+@registrar_estrategia("D* Lite")
+def d_estrella_lite(mundo, inicio, meta, n, verbose=False, estadisticas=None):
+    """Primera planificación de D* Lite (misma firma que las demás búsquedas)."""
+    planificador = DStarLite(mundo, inicio, meta)
+    planificador.orden = _orden_expansion(estadisticas)
+    expandidos = planificador.calcular()
+    if estadisticas is not None:
+        estadisticas["nodos_expandidos"] = expandidos
+        estadisticas["planificador"] = planificador
+    if verbose:
+        print(f"D* Lite: {expandidos} celdas expandidas")
+    return planificador.camino(), planificador.obstaculos_detectados
+
+
+def comparar_con_a_estrella(n, densidad, pasos, cambios_por_paso, radio, semilla=0):
+    """Recorre un camino con cambios al azar cerca de la abeja y compara D* Lite con A* desde cero.
+
+    Devuelve una fila por replanificación: celdas reexpandidas por D* Lite, celdas
+    expandidas por A* desde cero y si quedó camino.
+    """
+    from generador_mundos import generar_mundo
+    rng = random.Random(semilla)
+    inicio, meta = (0, 0), (n - 1, n - 1)
+    mundo = generar_mundo(n, densidad=densidad, semilla=semilla, conectados=(inicio, meta))
+    planificador = DStarLite(mundo, inicio, meta)
+    planificador.calcular()
+    camino = planificador.camino()
+
+    filas = []
+    posicion = inicio
+    for _ in range(pasos):
+        if not camino or len(camino) < 2:
+            break
+        posicion = camino[1]
+        planificador.mover(posicion)
+
+        # Celdas al azar cerca de la abeja cambian de estado (ni la meta ni la abeja o sus
+        # vecinas, para que no quede encerrada)
+        cambios = []
+        for _ in range(cambios_por_paso):
+            fila = min(n - 1, max(0, posicion[0] + rng.randint(-radio, radio)))
+            col = min(n - 1, max(0, posicion[1] + rng.randint(-radio, radio)))
+            if (fila, col) == meta or abs(fila - posicion[0]) + abs(col - posicion[1]) <= 1:
+                continue
+            bloqueada = mundo[fila, col] != OBSTACULO
+            mundo[fila, col] = OBSTACULO if bloqueada else LIBRE
+            cambios.append(((fila, col), bloqueada))
+        if not cambios:
+            continue
+        reexpandidos = planificador.cambiar_celdas(cambios)
+        camino = planificador.camino()
+
+        estadisticas = {}
+        a_estrella(mundo, posicion, meta, n, estadisticas=estadisticas)
+        filas.append({"reexpandidos": reexpandidos, "a_estrella": estadisticas["nodos_expandidos"],
+                      "hay_camino": camino is not None})
+    return filas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara la replanificación de D* Lite con A* desde cero")
+    parser.add_argument("--n", type=int, default=256)
+    parser.add_argument("--densidad", type=float, default=0.2)
+    parser.add_argument("--pasos", type=int, default=100)
+    parser.add_argument("--cambios", type=int, default=2, help="celdas que cambian en cada paso")
+    parser.add_argument("--radio", type=int, default=5, help="distancia máxima de los cambios a la abeja")
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args()
+
+    filas = comparar_con_a_estrella(args.n, args.densidad, args.pasos, args.cambios, args.radio, args.semilla)
+    if not filas:
+        print("No hubo cambios que replanificar")
+        return
+    incremental = [f["reexpandidos"] for f in filas]
+    desde_cero = [f["a_estrella"] for f in filas]
+    print(f"{len(filas)} replanificaciones en {args.n}x{args.n} "
+          f"({sum(not f['hay_camino'] for f in filas)} dejaron a la abeja sin camino):")
+    print(f"  D* Lite: mediana {np.median(incremental):9.1f}, media {np.mean(incremental):9.1f} "
+          f"celdas reexpandidas por cambio (máx {max(incremental)})")
+    print(f"  A*:      mediana {np.median(desde_cero):9.1f}, media {np.mean(desde_cero):9.1f} "
+          f"celdas expandidas buscando desde cero")
+
+
+if __name__ == "__main__":
+    main()
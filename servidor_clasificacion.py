@@ -0,0 +1,344 @@
+import argparse
+import os
+import queue
+import secrets
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+# Servidor local de clasificación: un solo modelo CLIP para varias instancias del
+# simulador o de la ventana. Los pedidos que llegan dentro de una ventana corta se
+# juntan en un mismo lote (micro-batching). Los clientes usan clasificar(), que cae
+# a la inferencia en el propio proceso si no hay servidor.
+#
+# multiprocessing.connection intercambia pickles, así que solo el mismo usuario tiene
+# que poder conectarse: el socket y la clave viven en una carpeta privada (0700) y la
+# clave es al azar, salvo que ABEJITA_CLAVE indique otra.
+
+# Carpeta privada del usuario para el socket y la clave
+if os.environ.get("XDG_RUNTIME_DIR"):
+    DIRECTORIO = os.path.join(os.environ["XDG_RUNTIME_DIR"], "abejita")
+else:
+    DIRECTORIO = os.path.join(os.path.expanduser("~"), ".abejita")
+RUTA_CLAVE = os.path.join(DIRECTORIO, "clave")
+
+# Dirección por defecto: socket Unix en la carpeta privada (o localhost:puerto en Windows)
+if hasattr(os, "fork"):
+    DIRECCION = os.path.join(DIRECTORIO, "clasificador.sock")
+else:
+    DIRECCION = "localhost:6017"
+
+# Milisegundos que se espera a otros pedidos antes de correr el lote
+VENTANA_MS = 10
+
+# Imágenes máximas por lote del servidor
+MAX_LOTE = 64
+
+# Segundos sin volver a intentar conectar tras un fallo (mientras tanto se clasifica en local)
+REINTENTO_S = 5.0
+
+
+def parsear_direccion(texto):
+    """"host:puerto" -> (host, puerto); cualquier otra cosa es la ruta de un socket Unix."""
+    if ":" in texto and os.path.sep not in texto:
+        host, puerto = texto.rsplit(":", 1)
+        if puerto.isdigit():
+            return host, int(puerto)
+    return texto
+
+
+def direccion_configurada():
+    """Dirección de ABEJITA_SERVIDOR ("1" = la de por defecto); None si no se configuró servidor."""
+    texto = os.environ.get("ABEJITA_SERVIDOR")
+    if not texto:
+        return None
+    return parsear_direccion(DIRECCION if texto == "1" else texto)
+
+
+def obtener_clave(crear=False):
+    """Clave de autenticación: ABEJITA_CLAVE o la del archivo privado (con crear=True se genera).
+
+    Devuelve None si no hay clave y no se pidió crearla.
+    """
+    texto = os.environ.get("ABEJITA_CLAVE")
+    if texto:
+        return texto.encode()
+    try:
+        with open(RUTA_CLAVE, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        if not crear:
+            return None
+    os.makedirs(DIRECTORIO, mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(RUTA_CLAVE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return obtener_clave()   # otro proceso la creó recién
+    clave = secrets.token_hex(32).encode()
+    with os.fdopen(fd, "wb") as f:
+        f.write(clave)
+    return clave
+
+
+def _validar_socket(ruta):
+    """El socket tiene que ser del usuario actual (si no, sus respuestas no son de fiar)."""
+    if hasattr(os, "getuid") and os.stat(ruta).st_uid != os.getuid():
+        raise OSError(f"el socket {ruta} es de otro usuario")
+
+
+class _Pedido:
+    def __init__(self, rutas, etiquetas, top_k):
+        self.rutas = rutas
+        self.etiquetas = tuple(etiquetas)
+        self.top_k = top_k
+        self.futuro = Future()
+
+
+class ServidorClasificacion:
+    """Atiende clientes en hilos y clasifica sus pedidos juntos con un único modelo."""
+
+    def __init__(self, direccion=DIRECCION, ventana_ms=VENTANA_MS, max_lote=MAX_LOTE):
+        self.direccion = parsear_direccion(direccion) if isinstance(direccion, str) else direccion
+        self.ventana = ventana_ms / 1000
+        self.max_lote = max_lote
+        self.estadisticas = {"pedidos": 0, "lotes": 0, "imagenes": 0, "clientes": 0}
+        self._cola = queue.Queue()
+        self._listener = None
+        self._cerrado = threading.Event()
+
+    def iniciar(self):
+        """Carga el modelo, abre el socket y arranca el hilo que arma los lotes.
+
+        Si ya hay un servidor escuchando en la dirección lanza RuntimeError (no se la roba).
+        """
+        import clasificador
+        clave = obtener_clave(crear=True)
+        if isinstance(self.direccion, str):
+            os.makedirs(os.path.dirname(self.direccion) or ".", mode=0o700, exist_ok=True)
+            self._liberar_socket_viejo(clave)
+        clasificador.proveedor.obtener()
+        self._listener = Listener(self.direccion, authkey=clave)
+        if isinstance(self.direccion, str):
+            os.chmod(self.direccion, 0o600)
+        threading.Thread(target=self._despachar, name="lotes", daemon=True).start()
+        threading.Thread(target=self._aceptar, name="aceptar", daemon=True).start()
+
+    def _liberar_socket_viejo(self, clave):
+        """Borra el socket de una ejecución que no cerró bien; si alguien atiende ahí, no lo toca."""
+        try:
+            Client(self.direccion, authkey=clave).close()
+        except (ConnectionRefusedError, FileNotFoundError):
+            if os.path.exists(self.direccion):
+                os.unlink(self.direccion)
+            return
+        except AuthenticationError:
+            pass   # hay un servidor, aunque con otra clave
+        raise RuntimeError(f"Ya hay un servidor de clasificación escuchando en {self.direccion}")
+
+    def cerrar(self):
+        self._cerrado.set()
+        self._cola.put(None)
+        if self._listener is None:
+            return
+        self._listener.close()
+        if isinstance(self.direccion, str) and os.path.exists(self.direccion):
+            os.unlink(self.direccion)
+
+    def _aceptar(self):
+        while not self._cerrado.is_set():
+            try:
+                conexion = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                # Cliente que no pasó la autenticación, o el listener se cerró
+                continue
+            self.estadisticas["clientes"] += 1
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        with conexion:
+            while True:
+                try:
+                    mensaje = conexion.recv()
+                except (EOFError, OSError):
+                    return
+                if not isinstance(mensaje, dict):
+                    conexion.send({"ok": False, "error": "pedido inválido"})
+                    continue
+                if mensaje.get("tipo") == "estado":
+                    conexion.send({"ok": True, "estado": dict(self.estadisticas)})
+                    continue
+                rutas, etiquetas, top_k = mensaje.get("rutas"), mensaje.get("etiquetas"), mensaje.get("top_k", 1)
+                if not (isinstance(rutas, list) and all(isinstance(r, str) for r in rutas)
+                        and isinstance(etiquetas, list) and etiquetas and all(isinstance(e, str) for e in etiquetas)
+                        and isinstance(top_k, int) and top_k >= 1):
+                    conexion.send({"ok": False, "error": "pedido inválido"})
+                    continue
+                pedido = _Pedido(rutas, etiquetas, top_k)
+                self._cola.put(pedido)
+                try:
+                    conexion.send({"ok": True, "tabla": pedido.futuro.result()})
+                except Exception as e:
+                    conexion.send({"ok": False, "error": str(e)})
+
+    def _juntar(self, primero):
+        """El primer pedido más los que lleguen dentro de la ventana (hasta max_lote imágenes)."""
+        pedidos = [primero]
+        imagenes = len(primero.rutas)
+        limite = time.perf_counter() + self.ventana
+        while imagenes < self.max_lote:
+            resto = limite - time.perf_counter()
+            if resto <= 0:
+                break
+            try:
+                pedido = self._cola.get(timeout=resto)
+            except queue.Empty:
+                break
+            if pedido is None:
+                self._cola.put(None)
+                break
+            pedidos.append(pedido)
+            imagenes += len(pedido.rutas)
+        return pedidos
+
+    def _despachar(self):
+        from clasificador import clasificar_imagenes_en_lote
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                return
+            pedidos = self._juntar(primero)
+
+            # Un lote por conjunto de etiquetas: las rutas repetidas entre clientes van una vez
+            por_etiquetas = {}
+            for pedido in pedidos:
+                por_etiquetas.setdefault((pedido.etiquetas, pedido.top_k), []).append(pedido)
+            for (etiquetas, top_k), grupo in por_etiquetas.items():
+                rutas = list(dict.fromkeys(r for pedido in grupo for r in pedido.rutas))
+                try:
+                    tabla = clasificar_imagenes_en_lote(rutas, batch_size=self.max_lote,
+                                                        candidate_labels=list(etiquetas), top_k=top_k)
+                except Exception as e:
+                    for pedido in grupo:
+                        pedido.futuro.set_exception(e)
+                    continue
+                self.estadisticas["lotes"] += 1
+                self.estadisticas["imagenes"] += len(rutas)
+                for pedido in grupo:
+                    self.estadisticas["pedidos"] += 1
+                    pedido.futuro.set_result({r: tabla[r] for r in pedido.rutas if r in tabla})
+
+
+class ClienteClasificacion:
+    """Conexión persistente al servidor (una a la vez por cliente)."""
+
+    def __init__(self, direccion):
+        self.direccion = direccion
+        self._conexion = None
+        self._lock = threading.Lock()
+
+    def _pedir(self, mensaje):
+        with self._lock:
+            if self._conexion is None:
+                clave = obtener_clave()
+                if clave is None:
+                    raise OSError(f"no hay clave del servidor en {RUTA_CLAVE} ni en ABEJITA_CLAVE")
+                if isinstance(self.direccion, str):
+                    _validar_socket(self.direccion)
+                self._conexion = Client(self.direccion, authkey=clave)
+            try:
+                self._conexion.send(mensaje)
+                respuesta = self._conexion.recv()
+            except (OSError, EOFError):
+                self._conexion = None
+                raise
+        if not respuesta["ok"]:
+            raise RuntimeError(respuesta["error"])
+        return respuesta
+
+    def clasificar(self, rutas, candidate_labels, top_k=1):
+        # Rutas absolutas: el servidor puede tener otro directorio de trabajo
+        absolutas = {os.path.abspath(r): r for r in rutas}
+        tabla = self._pedir({"rutas": list(absolutas), "etiquetas": list(candidate_labels),
+                             "top_k": top_k})["tabla"]
+        return {absolutas[r]: resultado for r, resultado in tabla.items()}
+
+    def estado(self):
+        return self._pedir({"tipo": "estado"})["estado"]
+
+
+_cliente = None
+_fallo = 0.0   # momento del último fallo de conexión
+
+
+def servidor_disponible():
+    """True si hay un servidor configurado y no falló hace poco."""
+    if direccion_configurada() is None:
+        return False
+    return not _fallo or time.perf_counter() - _fallo >= REINTENTO_S
+
+
+def clasificar(image_paths, candidate_labels=None, top_k=1, agrupar_variantes=False):
+    """Igual que clasificador.clasificar_imagenes_en_lote, pero por el servidor si hay uno.
+
+    Si el servidor no está o se cae, se clasifica en este proceso (cargando el modelo).
+    """
+    global _cliente, _fallo
+    import clasificador
+    candidate_labels = candidate_labels or clasificador.CANDIDATE_LABELS
+    if agrupar_variantes:
+        # La agrupación es del cliente (las rutas nuevas se agrupan entre sí): al servidor
+        # solo van los representantes
+        from variantes import expandir, representantes_de
+        representantes = representantes_de(image_paths)
+        tabla = clasificar(list(dict.fromkeys(representantes.values())), candidate_labels, top_k)
+        return expandir(representantes, tabla)
+
+    if servidor_disponible():
+        direccion = direccion_configurada()
+        if _cliente is None or _cliente.direccion != direccion:
+            _cliente = ClienteClasificacion(direccion)
+        try:
+            return _cliente.clasificar(list(image_paths), candidate_labels, top_k)
+        except (OSError, EOFError, RuntimeError, AuthenticationError) as e:
+            print("Aviso: servidor de clasificación no disponible, se clasifica en local:", e)
+            _fallo = time.perf_counter()
+    return clasificador.clasificar_imagenes_en_lote(image_paths, candidate_labels=candidate_labels, top_k=top_k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor local de clasificación con micro-batching")
+    parser.add_argument("--direccion", default=direccion_configurada() or DIRECCION,
+                        help="ruta del socket Unix o host:puerto")
+    parser.add_argument("--ventana-ms", type=float, default=VENTANA_MS)
+    parser.add_argument("--max-lote", type=int, default=MAX_LOTE)
+    parser.add_argument("--estado", action="store_true", help="consultar un servidor en marcha y salir")
+    args = parser.parse_args()
+
+    if args.estado:
+        print(ClienteClasificacion(parsear_direccion(args.direccion)).estado())
+        return
+
+    servidor = ServidorClasificacion(args.direccion, args.ventana_ms, args.max_lote)
+    try:
+        servidor.iniciar()
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+    # kill (SIGTERM) también cierra el socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Servidor de clasificación escuchando en {args.direccion} (Ctrl+C para salir)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.cerrar()
+        print(servidor.estadisticas)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import csv
+import json
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cuadricula import LIBRE, INICIO, META, crear_mundo, contactos_en_camino
+from imagenes import cargar_imagenes_dataset, asignar_imagenes_a_obstaculos
+from busqueda import ESTRATEGIAS
+from generador_mundos import DISPOSICIONES
+import indice_mundo  # registra la estrategia "BFS-Campo"
+import replanificacion  # registra la estrategia "D* Lite"
+from clasificador import CANDIDATE_LABELS, ETIQUETAS_AMPLIADAS, categoria
+from trazas import EscritorTrazas, armar_traza
+
+# Simulación sin ventanas: muchos episodios (mundo + inicio/meta al azar) por estrategia,
+# con el mismo conteo de obstáculos y flores que la animación de mundo_abejita.py
+
+# Estado de cada proceso trabajador (lo fija _iniciar_trabajador)
+_IMAGENES = []
+_CLASIFICACIONES = {}
+
+CAMPOS_EPISODIO = ["episodio", "semilla", "estrategia", "inicio", "meta", "exitoso", "longitud",
+                   "nodos", "tiempo", "obstaculos_busqueda", "contactos", "obstaculos_tocados", "flores"]
+
+
+def _iniciar_trabajador(imagenes, clasificaciones):
+    global _IMAGENES, _CLASIFICACIONES
+    _IMAGENES = imagenes
+    _CLASIFICACIONES = clasificaciones
+
+
+def elegir_inicio_meta(mundo, rng):
+    """Dos celdas libres distintas al azar."""
+    n = mundo.shape[0]
+    libres = np.flatnonzero(mundo.ravel() == LIBRE)
+    return tuple(divmod(int(libres[i]), n) for i in rng.sample(range(libres.size), 2))
+
+
+def es_flor(image_path):
+    resultado = _CLASIFICACIONES.get(image_path)
+    return (resultado is not None and resultado['label'] is not None
+            and categoria(resultado['label']).lower() == "flor")
+
+
+def correr_episodio(episodio, semilla, n, num_obstaculos, estrategias, disposicion="uniforme", trazar=False):
+    """Corre todas las estrategias sobre el mismo mundo y los mismos puntos; devuelve una fila por estrategia.
+
+    Con trazar=True cada fila lleva además "traza" (los arrays de trazas.armar_traza).
+    """
+    # El reparto de imágenes usa el random global
+    random.seed(semilla)
+    mundo = crear_mundo(n, num_obstaculos, semilla=semilla, disposicion=disposicion)
+    mapa_imagenes = asignar_imagenes_a_obstaculos(mundo, list(_IMAGENES)) if _IMAGENES else {}
+    inicio, meta = elegir_inicio_meta(mundo, random.Random(semilla))
+
+    mundo_elegido = mundo.copy()
+    mundo_elegido[inicio] = INICIO
+    mundo_elegido[meta] = META
+
+    filas = []
+    for nombre in estrategias:
+        estadisticas = {"orden_expansion": array("i")} if trazar else {}
+        t0 = time.perf_counter()
+        camino, obstaculos_busqueda = ESTRATEGIAS[nombre](mundo_elegido, inicio, meta, n,
+                                                          estadisticas=estadisticas)
+        tiempo = time.perf_counter() - t0
+
+        # Igual que la animación: cada paso (salvo la meta) toca sus obstáculos vecinos,
+        # y cada contacto con una imagen de flor suma un punto
+        contactos = contactos_en_camino(mundo_elegido, camino, meta, n) if camino else []
+        flores = sum(1 for pos in contactos if pos in mapa_imagenes and es_flor(mapa_imagenes[pos]))
+
+        fila = {
+            "episodio": episodio,
+            "semilla": semilla,
+            "estrategia": nombre,
+            "inicio": inicio,
+            "meta": meta,
+            "exitoso": camino is not None,
+            "longitud": len(camino) if camino else 0,
+            "nodos": estadisticas.get("nodos_expandidos"),
+            "tiempo": tiempo,
+            "obstaculos_busqueda": obstaculos_busqueda,
+            "contactos": len(contactos),
+            "obstaculos_tocados": len(set(contactos)),
+            "flores": flores,
+        }
+        if trazar:
+            fila["traza"] = armar_traza(
+                mundo, inicio, meta, camino, nombre, episodio=episodio, semilla=semilla,
+                disposicion=disposicion, orden=estadisticas["orden_expansion"],
+                obstaculos_busqueda=obstaculos_busqueda, nodos=estadisticas.get("nodos_expandidos"),
+                mapa_imagenes=mapa_imagenes, clasificaciones=_CLASIFICACIONES, tiempos={"busqueda": tiempo})
+        filas.append(fila)
+    return filas
+
+
+def _correr_tanda(tanda, n, num_obstaculos, estrategias, disposicion="uniforme", trazar=False):
+    filas = []
+    for episodio, semilla in tanda:
+        filas.extend(correr_episodio(episodio, semilla, n, num_obstaculos, estrategias, disposicion, trazar))
+    return filas
+
+
+def agregar(filas, estrategias):
+    """Resumen por estrategia. Las medias de longitud y contactos son sobre episodios exitosos."""
+    resumen = []
+    for nombre in estrategias:
+        propias = [f for f in filas if f["estrategia"] == nombre]
+        exitosas = [f for f in propias if f["exitoso"]]
+        total = len(propias)
+
+        def media(campo, grupo):
+            return sum(f[campo] for f in grupo) / len(grupo) if grupo else 0.0
+
+        resumen.append({
+            "estrategia": nombre,
+            "episodios": total,
+            "exitosos": len(exitosas),
+            "tasa_exito": len(exitosas) / total if total else 0.0,
+            "longitud_media": media("longitud", exitosas),
+            "nodos_medios": media("nodos", propias),
+            "tiempo_medio_ms": media("tiempo", propias) * 1000,
+            "contactos_medios": media("contactos", exitosas),
+            "obstaculos_tocados_medios": media("obstaculos_tocados", exitosas),
+            "flores_totales": sum(f["flores"] for f in propias),
+            "flores_medias": media("flores", propias),
+        })
+    return resumen
+
+
+def cargar_imagenes_y_clasificar(etiquetas, clasificar=True, agrupar_variantes=False):
+    """Imágenes del dataset y su clasificación (una sola vez, con la caché de embeddings)."""
+    try:
+        imagenes = cargar_imagenes_dataset()
+    except FileNotFoundError as e:
+        print("Aviso: no se pudieron cargar imágenes:", e)
+        return [], {}
+    if not clasificar:
+        return imagenes, {}
+
+    from servidor_clasificacion import clasificar
+    t0 = time.perf_counter()
+    if agrupar_variantes:
+        # X_sub y X_sobre son la misma foto: el modelo corre una vez por par
+        from variantes import agrupar_variantes as agrupar
+        unicas = len(set(agrupar(imagenes).values()))
+        print(f"{len(imagenes)} imágenes agrupadas en {unicas} fotos distintas")
+    clasificaciones = clasificar(imagenes, etiquetas, agrupar_variantes=agrupar_variantes)
+    print(f"Se clasificaron {len(clasificaciones)} imágenes en {time.perf_counter() - t0:.2f}s")
+    return imagenes, clasificaciones
+
+
+def simular(episodios, n=10, num_obstaculos=20, estrategias=None, procesos=None, semilla=0,
+            imagenes=(), clasificaciones=None, tam_tanda=50, disposicion="uniforme", trazas=None):
+    """Corre los episodios en un pool de procesos y devuelve (filas, resumen).
+
+    Con trazas=<archivo> cada episodio y estrategia se agrega al archivo de trazas en
+    cuanto llega su tanda (las trazas no se acumulan en memoria).
+    """
+    estrategias = list(estrategias or ESTRATEGIAS)
+    desconocidas = [e for e in estrategias if e not in ESTRATEGIAS]
+    if desconocidas:
+        raise ValueError(f"Estrategias desconocidas: {desconocidas} (disponibles: {list(ESTRATEGIAS)})")
+    # Inicio y meta necesitan dos celdas libres
+    if not 0 <= num_obstaculos <= n * n - 2:
+        raise ValueError(f"Con {num_obstaculos} obstáculos en {n}x{n} no quedan dos celdas libres "
+                         f"(máximo {n * n - 2})")
+
+    # Semillas derivadas de la semilla base: el mismo comando repite los mismos mundos
+    rng = random.Random(semilla)
+    trabajos = [(i, rng.getrandbits(32)) for i in range(episodios)]
+    tandas = [trabajos[i:i + tam_tanda] for i in range(0, len(trabajos), tam_tanda)]
+    args = (list(imagenes), clasificaciones or {})
+
+    filas = []
+    escritor = EscritorTrazas(trazas) if trazas else None
+    trazar = escritor is not None
+
+    def guardar(parciales):
+        for fila in parciales:
+            traza = fila.pop("traza", None)
+            if traza is not None:
+                escritor.escribir(traza)
+            filas.append(fila)
+
+    try:
+        if procesos == 1:
+            _iniciar_trabajador(*args)
+            for tanda in tandas:
+                guardar(_correr_tanda(tanda, n, num_obstaculos, estrategias, disposicion, trazar))
+        else:
+            with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_trabajador,
+                                     initargs=args) as pool:
+                futuros = [pool.submit(_correr_tanda, tanda, n, num_obstaculos, estrategias, disposicion, trazar)
+                           for tanda in tandas]
+                for futuro in futuros:
+                    guardar(futuro.result())
+    finally:
+        if escritor is not None:
+            escritor.cerrar()
+    return filas, agregar(filas, estrategias)
+
+
+def guardar_csv(ruta, filas, campos):
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.DictWriter(f, fieldnames=campos)
+        escritor.writeheader()
+        escritor.writerows(filas)
+
+
+def imprimir_resumen(resumen):
+    print(f"{'Estrategia':<10} {'Éxito':>7} {'Longitud':>9} {'Nodos':>8} {'Tiempo(ms)':>11} "
+          f"{'Contactos':>10} {'Flores':>7}")
+    for r in resumen:
+        print(f"{r['estrategia']:<10} {r['tasa_exito']:>7.1%} {r['longitud_media']:>9.2f} "
+              f"{r['nodos_medios']:>8.1f} {r['tiempo_medio_ms']:>11.3f} "
+              f"{r['contactos_medios']:>10.2f} {r['flores_totales']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación de episodios sin ventanas")
+    parser.add_argument("--episodios", type=int, default=1000)
+    parser.add_argument("--n", type=int, default=10, help="tamaño de la cuadrícula")
+    parser.add_argument("--obstaculos", type=int, default=20)
+    parser.add_argument("--disposicion", default="uniforme", choices=list(DISPOSICIONES),
+                        help="cómo se reparten los obstáculos")
+    parser.add_argument("--estrategias", nargs="+", default=["DFS", "BFS"],
+                        help=f"disponibles: {', '.join(ESTRATEGIAS)}")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos del pool (por defecto, uno por CPU; 1 = sin pool)")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--csv", help="archivo CSV con el resumen por estrategia")
+    parser.add_argument("--json", help="archivo JSON con el resumen por estrategia")
+    parser.add_argument("--episodios-csv", help="archivo CSV con una fila por episodio y estrategia")
+    parser.add_argument("--trazas", help="archivo de trazas binario (un registro por episodio y estrategia)")
+    parser.add_argument("--sin-clasificar", action="store_true",
+                        help="no cargar el modelo (las flores quedan en 0)")
+    parser.add_argument("--ampliadas", action="store_true",
+                        help="clasificar con la taxonomía ampliada de especies de flores")
+    parser.add_argument("--agrupar-variantes", action="store_true",
+                        help="clasificar una sola vez cada par X_sub/X_sobre (hash perceptual tras CLAHE)")
+    args = parser.parse_args()
+    if not 0 <= args.obstaculos <= args.n * args.n - 2:
+        parser.error(f"--obstaculos debe estar entre 0 y {args.n * args.n - 2} para --n {args.n} "
+                     f"(hacen falta dos celdas libres para inicio y meta)")
+
+    etiquetas = ETIQUETAS_AMPLIADAS if args.ampliadas else CANDIDATE_LABELS
+    imagenes, clasificaciones = cargar_imagenes_y_clasificar(etiquetas, not args.sin_clasificar,
+                                                              args.agrupar_variantes)
+
+    t0 = time.perf_counter()
+    filas, resumen = simular(args.episodios, args.n, args.obstaculos, args.estrategias,
+                             args.procesos, args.semilla, imagenes, clasificaciones,
+                             disposicion=args.disposicion, trazas=args.trazas)
+    print(f"{args.episodios} episodios en {time.perf_counter() - t0:.2f}s")
+    imprimir_resumen(resumen)
+
+    if args.csv:
+        guardar_csv(args.csv, resumen, list(resumen[0].keys()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"parametros": vars(args), "resumen": resumen}, f, indent=2, ensure_ascii=False)
+    if args.episodios_csv:
+        guardar_csv(args.episodios_csv, filas, CAMPOS_EPISODIO)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import struct
+import zlib
+
+import numpy as np
+
+from cuadricula import LIBRE, OBSTACULO, INICIO, META, obstaculos_adyacentes
+
+# Trazas de episodios: cada episodio (mundo, inicio/meta, camino, orden de expansión,
+# obstáculos tocados con su imagen y etiqueta, tiempos por etapa) se guarda como un
+# registro binario comprimido (cabecera JSON + arrays crudos) dentro de un único
+# archivo que solo crece. Un índice aparte
+# (<archivo>.idx, registros de tamaño fijo) permite ir directo a un episodio o filtrar
+# por episodio/estrategia sin leer el resto, y una traza se puede volver a ver en la
+# ventana sin buscar de nuevo ni cargar el modelo.
+
+MAGIA = b"ABTRAZA1"
+
+# Prefijo de cada registro (y de cada parte dentro de él): largo en bytes de lo que sigue
+CABECERA = struct.Struct("<I")
+
+# Arrays de cada registro, en orden, con su tipo (None = uint16/uint32 según el tamaño del mundo)
+ARRAYS = (("obstaculos", np.uint8), ("camino", None), ("orden", None), ("contactos", None),
+          ("scores", np.float32))
+
+# Nivel de zlib (1 = rápido; las trazas se escriben mientras corre la simulación)
+NIVEL_COMPRESION = 1
+
+# Una entrada del índice por registro
+INDICE_DTYPE = np.dtype([("offset", "<u8"), ("largo", "<u4"), ("episodio", "<i8"), ("estrategia", "S16")])
+
+
+def tipo_indices(n):
+    """uint16 si todos los índices planos de un mundo n x n entran, si no uint32."""
+    return np.uint16 if n * n <= 2**16 else np.uint32
+
+
+def armar_traza(mundo, inicio, meta, camino, estrategia, episodio=0, semilla=None, disposicion="",
+                orden=(), obstaculos_busqueda=0, nodos=None, mapa_imagenes=None, clasificaciones=None,
+                tiempos=None):
+    """Registro de un episodio listo para EscritorTrazas.escribir.
+
+    `orden` son las celdas expandidas (índices planos, p. ej. estadisticas["orden_expansion"])
+    y `tiempos` es {etapa: segundos}. Los contactos se calculan como en la animación.
+    """
+    n = mundo.shape[0]
+    tipo = tipo_indices(n)
+    contactos = obstaculos_adyacentes(mundo, camino, meta, n) if camino else []
+    mapa_imagenes = mapa_imagenes or {}
+    clasificaciones = clasificaciones or {}
+    imagenes = [mapa_imagenes.get(pos, "") for pos in contactos]
+    resultados = [clasificaciones.get(ruta) or {} for ruta in imagenes]
+    return {
+        "episodio": int(episodio),
+        "estrategia": estrategia,
+        "semilla": semilla,   # None si el mundo no salió de una semilla conocida (igual queda guardado)
+        "disposicion": disposicion or "",
+        "n": n,
+        "inicio": [int(v) for v in inicio],
+        "meta": [int(v) for v in meta],
+        "obstaculos_busqueda": int(obstaculos_busqueda),
+        "nodos": nodos,
+        "imagenes": imagenes,
+        "etiquetas": [r.get("label") for r in resultados],
+        "tiempos": {etapa: float(t) for etapa, t in (tiempos or {}).items()},
+        "obstaculos": np.packbits(np.asarray(mundo).ravel() == OBSTACULO),
+        "camino": np.array([f * n + c for f, c in camino or []], dtype=tipo),
+        "orden": np.asarray(orden).astype(tipo),
+        "contactos": np.array([f * n + c for f, c in contactos], dtype=tipo),
+        "scores": np.array([r.get("score", np.nan) for r in resultados], dtype=np.float32),
+    }
+
+
+def codificar(traza):
+    """Registro -> bytes: cabecera JSON con los escalares y las listas, y después los arrays crudos."""
+    nombres = dict(ARRAYS)
+    cabecera = json.dumps({k: v for k, v in traza.items() if k not in nombres}, ensure_ascii=False).encode()
+    partes = [CABECERA.pack(len(cabecera)), cabecera]
+    for nombre, _ in ARRAYS:
+        datos = np.ascontiguousarray(traza[nombre]).tobytes()
+        partes += [CABECERA.pack(len(datos)), datos]
+    return zlib.compress(b"".join(partes), NIVEL_COMPRESION)
+
+
+def decodificar(datos):
+    """Bytes de un registro -> dict con el mundo, el camino y los contactos como en el resto del código."""
+    datos = zlib.decompress(datos)
+    (largo,) = CABECERA.unpack_from(datos, 0)
+    traza = json.loads(datos[CABECERA.size:CABECERA.size + largo])
+    posicion = CABECERA.size + largo
+    n = traza["n"]
+    for nombre, tipo in ARRAYS:
+        tipo = np.dtype(tipo or tipo_indices(n))
+        (largo,) = CABECERA.unpack_from(datos, posicion)
+        posicion += CABECERA.size
+        traza[nombre] = np.frombuffer(datos, dtype=tipo, count=largo // tipo.itemsize, offset=posicion)
+        posicion += largo
+
+    bits = np.unpackbits(traza.pop("obstaculos"), count=n * n).reshape(n, n)
+    traza["mundo"] = np.where(bits, OBSTACULO, LIBRE).astype(np.uint8)
+    traza["inicio"] = tuple(traza["inicio"])
+    traza["meta"] = tuple(traza["meta"])
+    traza["camino"] = [divmod(int(i), n) for i in traza["camino"]] or None
+    traza["contactos"] = [divmod(int(i), n) for i in traza["contactos"]]
+    return traza
+
+
+def _entrada(offset, largo, episodio, estrategia):
+    return np.array([(offset, largo, episodio, str(estrategia).encode()[:16])], dtype=INDICE_DTYPE)
+
+
+def _escanear(ruta):
+    """Rehace el índice recorriendo los registros; devuelve (índice, fin del último registro completo)."""
+    entradas = []
+    with open(ruta, "rb") as f:
+        if f.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f"{ruta} no es un archivo de trazas")
+        fin = f.tell()
+        while True:
+            cabecera = f.read(CABECERA.size)
+            if len(cabecera) < CABECERA.size:
+                break
+            (largo,) = CABECERA.unpack(cabecera)
+            datos = f.read(largo)
+            if len(datos) < largo:
+                break   # registro cortado (el proceso se cerró mientras escribía)
+            traza = decodificar(datos)
+            entradas.append(_entrada(fin, largo, traza["episodio"], traza["estrategia"]))
+            fin = f.tell()
+    indice = np.concatenate(entradas) if entradas else np.zeros(0, dtype=INDICE_DTYPE)
+    return indice, fin
+
+
+def cargar_indice(ruta, reparar=False):
+    """Índice del archivo; si falta o no coincide con los datos, se rehace recorriendo los registros.
+
+    Solo el escritor (reparar=True) toca el disco: corta el registro incompleto del final
+    y guarda el índice rehecho. Un lector puede abrir el archivo mientras otro proceso
+    escribe, así que se queda con el índice rehecho en memoria.
+    """
+    ruta_indice = ruta + ".idx"
+    tamano = os.path.getsize(ruta)
+    if os.path.exists(ruta_indice):
+        bytes_indice = os.path.getsize(ruta_indice)
+        # Una entrada a medio escribir al final del índice no cuenta
+        indice = np.fromfile(ruta_indice, dtype=INDICE_DTYPE, count=bytes_indice // INDICE_DTYPE.itemsize)
+        fin = int(indice["offset"][-1]) + CABECERA.size + int(indice["largo"][-1]) if indice.size else len(MAGIA)
+        if fin == tamano and not (reparar and bytes_indice % INDICE_DTYPE.itemsize):
+            return indice
+    indice, fin = _escanear(ruta)
+    if not reparar:
+        return indice
+    if fin != tamano:
+        # Sacar el registro cortado para que lo que se agregue después quede bien enmarcado
+        with open(ruta, "r+b") as f:
+            f.truncate(fin)
+    indice.tofile(ruta_indice)
+    return indice
+
+
+class EscritorTrazas:
+    """Agrega episodios al archivo a medida que terminan (nada queda acumulado en memoria)."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        if not os.path.exists(ruta) or os.path.getsize(ruta) == 0:
+            with open(ruta, "wb") as f:
+                f.write(MAGIA)
+            open(ruta + ".idx", "wb").close()
+        self.registros = len(cargar_indice(ruta, reparar=True))
+        self._datos = open(ruta, "ab")
+        self._indice = open(ruta + ".idx", "ab")
+
+    def escribir(self, traza):
+        datos = codificar(traza)
+        offset = self._datos.tell()
+        self._datos.write(CABECERA.pack(len(datos)))
+        self._datos.write(datos)
+        # Primero los datos: el índice nunca apunta a un registro que no está completo
+        self._datos.flush()
+        self._indice.write(_entrada(offset, len(datos), traza["episodio"], traza["estrategia"]).tobytes())
+        self._indice.flush()
+        self.registros += 1
+
+    def cerrar(self):
+        self._datos.close()
+        self._indice.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+class LectorTrazas:
+    """Acceso directo a cualquier registro a través del índice."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.indice = cargar_indice(ruta)
+        self._archivo = open(ruta, "rb")
+        if self._archivo.read(len(MAGIA)) != MAGIA:
+            raise ValueError(f"{ruta} no es un archivo de trazas")
+
+    def __len__(self):
+        return len(self.indice)
+
+    def leer(self, i):
+        """Registro i (en orden de escritura), decodificado."""
+        entrada = self.indice[i]
+        self._archivo.seek(int(entrada["offset"]) + CABECERA.size)
+        return decodificar(self._archivo.read(int(entrada["largo"])))
+
+    def buscar(self, episodio=None, estrategia=None):
+        """Posiciones de los registros de ese episodio y/o estrategia (solo mira el índice)."""
+        elegidos = np.ones(len(self.indice), dtype=bool)
+        if episodio is not None:
+            elegidos &= self.indice["episodio"] == episodio
+        if estrategia is not None:
+            elegidos &= self.indice["estrategia"] == str(estrategia).encode()[:16]
+        return np.flatnonzero(elegidos)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.leer(i)
+
+    def cerrar(self):
+        self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def reproducir(traza):
+    """Vuelve a animar una traza con mostrar_mundo: ni búsqueda ni modelo, todo sale del registro."""
+    n = traza["n"]
+    # mundo_abejita fija el tamaño de la ventana al importarse
+    os.environ["ABEJITA_N"] = str(n)
+    import pygame
+    import mundo_abejita
+    if mundo_abejita.N != n:
+        raise ValueError(f"La ventana ya se abrió para mundos de {mundo_abejita.N}x{mundo_abejita.N}")
+
+    # Las imágenes y etiquetas de los obstáculos tocados van directo a la tabla de
+    # clasificaciones, así que la ventana nunca le pide nada al modelo
+    mundo_abejita.OBSTACLE_IMAGE_MAP = {pos: ruta for pos, ruta in zip(traza["contactos"], traza["imagenes"]) if ruta}
+    for ruta, etiqueta, score in zip(traza["imagenes"], traza["etiquetas"], traza["scores"].tolist()):
+        if ruta:
+            mundo_abejita.CLASIFICACIONES[ruta] = {"label": etiqueta, "score": score}
+
+    inicio, meta = traza["inicio"], traza["meta"]
+    mundo = traza["mundo"].copy()
+    mundo[inicio] = INICIO
+    mundo[meta] = META
+    pygame.init()
+    pygame.display.set_mode((mundo_abejita.WINDOW_WIDTH, mundo_abejita.WINDOW_HEIGHT))
+    mundo_abejita.mostrar_mundo(mundo, traza["camino"], inicio, meta, n, traza["estrategia"],
+                                traza["obstaculos_busqueda"], traza["tiempos"].get("busqueda", 0.0), offset_x=0)
+
+
+def _es_flor(etiqueta):
+    from clasificador import categoria
+    return categoria(etiqueta).lower() == "flor"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lista o vuelve a ver episodios grabados")
+    parser.add_argument("archivo")
+    parser.add_argument("--episodio", type=int, help="solo los registros de este episodio")
+    parser.add_argument("--estrategia", help="solo los registros de esta estrategia")
+    parser.add_argument("--reproducir", action="store_true",
+                        help="animar el primer registro que coincida (sin buscar ni clasificar)")
+    args = parser.parse_args()
+
+    with LectorTrazas(args.archivo) as lector:
+        elegidos = lector.buscar(args.episodio, args.estrategia)
+        print(f"{len(lector)} registros en {args.archivo}, {len(elegidos)} coinciden")
+        if args.reproducir:
+            if len(elegidos) == 0:
+                raise SystemExit("Ningún registro coincide")
+            reproducir(lector.leer(int(elegidos[0])))
+            return
+        print(f"{'#':>6} {'Episodio':>9} {'Estrategia':<10} {'Pasos':>6} {'Expandidas':>11} "
+              f"{'Contactos':>10} {'Flores':>7}")
+        for i in elegidos:
+            traza = lector.leer(int(i))
+            flores = sum(1 for e in traza["etiquetas"] if e and _es_flor(e))
+            print(f"{i:>6} {traza['episodio']:>9} {traza['estrategia']:<10} "
+                  f"{len(traza['camino'] or []):>6} {len(traza['orden']):>11} "
+                  f"{len(traza['contactos']):>10} {flores:>7}")
+
+
+if __name__ == "__main__":
+    main()
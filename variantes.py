@@ -0,0 +1,188 @@
+import argparse
+import os
+from collections import Counter
+
+import numpy as np
+
+from paquete_imagenes import abrir_paquete, exposicion_de, nombre_base
+from preprocesamiento import CLIP_LIMIT, TILE_GRID, aplicar_clahe
+
+# Agrupación de variantes de exposición: X_sub.jpg y X_sobre.jpg son la misma foto,
+# así que tras CLAHE deberían verse casi iguales. Se compara un hash perceptual de la
+# imagen normalizada y el modelo corre una sola vez por foto (el representante).
+
+# Bits distintos (de 63) que se toleran entre las dos variantes de una misma foto
+DISTANCIA_MAXIMA = 20
+
+# Lado de la imagen reducida sobre la que se calcula la DCT del hash
+LADO_HASH = 32
+
+# Representante de cada ruta agrupada en esta sesión (las que no están se representan a sí mismas)
+_representantes = {}
+
+
+def hash_perceptual(imagen):
+    """pHash: signo de las frecuencias bajas de la DCT respecto a su mediana (63 bits)."""
+    import cv2
+    reducida = cv2.resize(np.ascontiguousarray(imagen), (LADO_HASH, LADO_HASH),
+                          interpolation=cv2.INTER_AREA).astype(np.float32)
+    bajas = cv2.dct(reducida)[:8, :8].ravel()[1:]   # sin la componente continua
+    return bajas > np.median(bajas)
+
+
+def hashes_perceptuales(rutas, clip_limit=CLIP_LIMIT, tile_grid=TILE_GRID):
+    """{ruta: bits} del CLAHE de cada imagen; usa los planos del paquete si está al día."""
+    paquete = abrir_paquete()
+    hashes = {}
+    for ruta in rutas:
+        i = paquete.posicion(ruta) if paquete is not None else None
+        if i is not None:
+            imagen = paquete.plano(i, "clahe")
+        else:
+            imagen = aplicar_clahe(ruta, clip_limit, tile_grid)
+        if imagen is not None:
+            hashes[ruta] = hash_perceptual(imagen)
+    return hashes
+
+
+def _exposicion(ruta):
+    return exposicion_de(os.path.basename(os.path.dirname(ruta)))
+
+
+def agrupar_variantes(rutas, distancia_maxima=DISTANCIA_MAXIMA):
+    """Empareja cada imagen con su variante de la otra exposición y devuelve {ruta: representante}.
+
+    Dos imágenes se agrupan si son de exposiciones distintas, cada una es la más
+    parecida a la otra (vecinos mutuos) y su distancia de Hamming no pasa de
+    distancia_maxima. El representante es la primera del par en el orden de `rutas`.
+    """
+    rutas = list(dict.fromkeys(rutas))
+    hashes = hashes_perceptuales(rutas)
+    rutas = [r for r in rutas if r in hashes]
+    representantes = {r: r for r in rutas}
+    if len(rutas) < 2:
+        _representantes.update(representantes)
+        return representantes
+
+    bits = np.stack([hashes[r] for r in rutas])
+    distancias = (bits[:, None, :] != bits[None, :, :]).sum(axis=2)
+    exposiciones = np.array([_exposicion(r) for r in rutas])
+    # Solo cuentan las imágenes de la otra exposición
+    distancias[exposiciones[:, None] == exposiciones[None, :]] = bits.shape[1] + 1
+    vecino = distancias.argmin(axis=1)
+
+    for i, j in enumerate(vecino):
+        if i < j and vecino[j] == i and distancias[i, j] <= distancia_maxima:
+            representantes[rutas[j]] = rutas[i]
+    _representantes.update(representantes)
+    return representantes
+
+
+def representante(ruta):
+    """Ruta cuya clasificación se usa para esta imagen (ella misma si no se agrupó)."""
+    return _representantes.get(ruta, ruta)
+
+
+def representantes_de(rutas):
+    """{ruta: representante} de esas rutas; las que todavía no se agruparon se agrupan entre sí."""
+    nuevas = [r for r in dict.fromkeys(rutas) if r not in _representantes]
+    if nuevas:
+        agrupar_variantes(nuevas)
+    return {r: representante(r) for r in dict.fromkeys(rutas)}
+
+
+def olvidar(rutas):
+    """Deshace los grupos de esas rutas (cambiaron o ya no están): vuelven a representarse solas."""
+    rutas = set(rutas)
+    for ruta, rep in list(_representantes.items()):
+        if ruta in rutas or rep in rutas:
+            _representantes.pop(ruta, None)
+
+
+def expandir(representantes, tabla_representantes):
+    """Copia a cada ruta el resultado de su representante (marcado con "representante")."""
+    return {ruta: tabla_representantes[rep] if rep == ruta else dict(tabla_representantes[rep], representante=rep)
+            for ruta, rep in representantes.items() if rep in tabla_representantes}
+
+
+def grupos(representantes):
+    """{representante: [rutas del grupo]} a partir del mapeo de agrupar_variantes."""
+    por_representante = {}
+    for ruta, rep in representantes.items():
+        por_representante.setdefault(rep, []).append(ruta)
+    return por_representante
+
+
+def concordancia(representantes, tabla, etiqueta=lambda r: r["label"]):
+    """Qué tanto coinciden las variantes de cada grupo si se clasifican por separado.
+
+    `tabla` es {ruta: resultado} con todas las variantes clasificadas. Devuelve el
+    total de grupos con dos o más variantes, cuántos coinciden y la concordancia de
+    cada exposición con la etiqueta de su representante.
+    """
+    pares = coinciden = 0
+    por_exposicion = Counter()
+    aciertos_exposicion = Counter()
+    desacuerdos = []
+    for rep, miembros in grupos(representantes).items():
+        if len(miembros) < 2 or any(m not in tabla for m in miembros):
+            continue
+        pares += 1
+        etiquetas = {m: etiqueta(tabla[m]) for m in miembros}
+        if len(set(etiquetas.values())) == 1:
+            coinciden += 1
+        else:
+            desacuerdos.append(etiquetas)
+        for m in miembros:
+            por_exposicion[_exposicion(m)] += 1
+            aciertos_exposicion[_exposicion(m)] += etiquetas[m] == etiquetas[rep]
+    return {
+        "grupos": pares,
+        "coinciden": coinciden,
+        "por_exposicion": {e: aciertos_exposicion[e] / n for e, n in por_exposicion.items()},
+        "desacuerdos": desacuerdos,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Agrupa las variantes sub/sobre del dataset y mide su concordancia")
+    parser.add_argument("--distancia", type=int, default=DISTANCIA_MAXIMA,
+                        help="bits distintos tolerados entre variantes")
+    parser.add_argument("--ampliadas", action="store_true",
+                        help="clasificar con la taxonomía ampliada de especies de flores")
+    parser.add_argument("--sin-clasificar", action="store_true",
+                        help="solo agrupar, sin medir la concordancia del modelo")
+    args = parser.parse_args()
+
+    from imagenes import cargar_imagenes_dataset
+    rutas = cargar_imagenes_dataset()
+    representantes = agrupar_variantes(rutas, args.distancia)
+    unicos = len(set(representantes.values()))
+    print(f"{len(representantes)} imágenes -> {unicos} fotos distintas "
+          f"({1 - unicos / len(representantes):.0%} menos inferencias)")
+
+    # Agrupaciones que no coinciden con el nombre de archivo (posibles errores del hash)
+    dudosos = [(r, rep) for r, rep in representantes.items()
+               if r != rep and nombre_base(r) != nombre_base(rep)]
+    if dudosos:
+        print(f"{len(dudosos)} grupos con nombres distintos:")
+        for ruta, rep in dudosos:
+            print(f"  {os.path.basename(rep)} ~ {os.path.basename(ruta)}")
+
+    if args.sin_clasificar:
+        return
+    from clasificador import CANDIDATE_LABELS, ETIQUETAS_AMPLIADAS, categoria, clasificar_imagenes_en_lote
+    etiquetas = ETIQUETAS_AMPLIADAS if args.ampliadas else CANDIDATE_LABELS
+    # Todas las variantes por separado, para ver si CLAHE las deja iguales para el modelo
+    tabla = clasificar_imagenes_en_lote(list(representantes), candidate_labels=etiquetas)
+    for nombre, etiqueta in (("etiqueta", lambda r: r["label"]), ("categoría", lambda r: categoria(r["label"]))):
+        datos = concordancia(representantes, tabla, etiqueta)
+        if not datos["grupos"]:
+            continue
+        por_exposicion = ", ".join(f"{e} {v:.1%}" for e, v in sorted(datos["por_exposicion"].items()))
+        print(f"Concordancia por {nombre}: {datos['coinciden']}/{datos['grupos']} "
+              f"({datos['coinciden'] / datos['grupos']:.1%}); con el representante: {por_exposicion}")
+
+
+if __name__ == "__main__":
+    main()